@@ -0,0 +1,350 @@
+"""
+Офлайн-бенчмарк распознавания: скорость и задержка без микрофона.
+
+WAV-фикстуры (16 кГц, 16 бит, моно) подаются в `Speech2Text` через
+подменённый входной поток вместо sounddevice. Для каждой комбинации
+размера блока и числа параллельных движков измеряются:
+- коэффициент реального времени (RTF, время обработки / длительность аудио);
+- задержка от поступления блока, завершившего фразу, до выдачи текста (p50/p95/p99);
+- процессорное время на секунду аудио;
+- пиковое потребление памяти (RSS).
+
+Запуск:
+    python -m app.bench fixtures/ --blocksizes 20,100,200 --workers 1,2,4 --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Бенчмарку не нужны настройки сервера, но модуль конфигурации их требует
+for _name, _value in (
+    ("STT_USE_TORCH_MODEL_MANAGER_STR", "false"),
+    ("STT_SOUND_DEVICE_INDEX", "0"),
+    ("STT_PORT", "0"),
+    ("STT_HOST", "127.0.0.1"),
+    ("STT_LOG_LEVEL", "warning"),
+):
+    os.environ.setdefault(_name, _value)
+
+import numpy as np
+import vosk
+
+from app.config.config import STT_VOSK_MODEL_PATH
+from app.core.speech_to_text import Speech2Text
+from app.utils.audio_utils import decode_audio
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SAMPLERATE = 16000
+# Тишина после каждой фикстуры, чтобы распознаватель закрыл последнюю фразу
+TAIL_SILENCE_SECONDS = 1.0
+
+
+class WavInputStream:
+    """
+    Подмена `sd.RawInputStream`: отдаёт заранее загруженный PCM блоками в коллбэк
+    из отдельного потока — в реальном времени или так быстро, как успевает движок.
+    """
+
+    def __init__(
+        self,
+        pcm: bytes,
+        finished: threading.Event,
+        realtime: bool = False,
+        ready: Optional[Callable[[], bool]] = None,
+        samplerate: int = SAMPLERATE,
+        blocksize: int = 1600,
+        callback: Optional[Callable] = None,
+        **_: Any,
+    ) -> None:
+        """
+        Инициализация потока.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param finished: событие, выставляемое после отдачи всех блоков
+        :param realtime: отдавать блоки с темпом реального времени
+        :param ready: готов ли движок принять следующий блок (для режима максимальной скорости)
+        :param samplerate: частота дискретизации
+        :param blocksize: размер блока в сэмплах
+        :param callback: аудио-коллбэк движка
+        """
+        self._pcm = pcm
+        self._finished = finished
+        self._realtime = realtime
+        self._ready = ready or (lambda: True)
+        self._samplerate = samplerate
+        self._blocksize = blocksize
+        self._callback = callback
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-input", daemon=True)
+        self.delivered_at: List[float] = []
+
+    def __enter__(self) -> "WavInputStream":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        view = memoryview(self._pcm)
+        step = self._blocksize * 2
+        started = time.perf_counter()
+        for index, offset in enumerate(range(0, len(view), step)):
+            if self._realtime:
+                delay = started + index * self._blocksize / self._samplerate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while not self._ready():
+                    time.sleep(0.0005)
+            if self._stop.is_set():
+                return
+            block = view[offset:offset + step]
+            self.delivered_at.append(time.perf_counter())
+            self._callback(block, len(block) // 2, None, None)
+        self._finished.set()
+
+
+class BenchWorker:
+    """
+    Один движок распознавания с подменённым входом и сбором измерений.
+    """
+
+    def __init__(
+        self,
+        model: vosk.Model,
+        pcm: bytes,
+        blocksize_ms: int,
+        realtime: bool,
+        index: int,
+    ) -> None:
+        """
+        Инициализация рабочего.
+
+        :param model: общая модель Vosk
+        :param pcm: аудиоданные для прогона
+        :param blocksize_ms: размер блока в миллисекундах
+        :param realtime: подавать аудио в реальном времени
+        :param index: номер рабочего
+        """
+        self._pcm = pcm
+        self._realtime = realtime
+        self._finished = threading.Event()
+        self._stream: Optional[WavInputStream] = None
+        self.engine = Speech2Text(
+            samplerate=SAMPLERATE,
+            blocksize_ms=blocksize_ms,
+            model=model,
+            source_id=f"bench-{index}",
+            input_stream=self._open_stream,
+        )
+        self._thread = threading.Thread(target=self._run, name=f"bench-{index}", daemon=True)
+        self.latencies: List[float] = []
+
+    def _open_stream(self, **kwargs: Any) -> WavInputStream:
+        self._stream = WavInputStream(
+            self._pcm,
+            self._finished,
+            realtime=self._realtime,
+            ready=lambda: self.engine.queue_depth < 2,
+            **kwargs,
+        )
+        return self._stream
+
+    def _run(self) -> None:
+        for _ in self.engine.listen():
+            now = time.perf_counter()
+            consumed = self.engine.stats()["audio_queue"]["blocks_out"]
+            self.latencies.append(now - self._stream.delivered_at[consumed - 1])
+
+    def start(self) -> None:
+        """Запускает прослушивание в отдельном потоке."""
+        self._thread.start()
+
+    def wait_drained(self) -> None:
+        """Дожидается, пока движок разберёт всё поданное аудио."""
+        self._finished.wait()
+        while self.engine.queue_depth:
+            time.sleep(0.001)
+
+    def stop(self) -> None:
+        """Останавливает движок и поток прослушивания."""
+        self.engine.close()
+        self._thread.join()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Возвращает пиковое потребление памяти процессом.
+
+    :return: пиковый RSS в мегабайтах или None, если платформа не поддерживается
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_case(
+    model: vosk.Model,
+    pcm: bytes,
+    blocksize_ms: int,
+    workers: int,
+    realtime: bool,
+) -> Dict[str, Any]:
+    """
+    Прогоняет аудио через `workers` параллельных движков с общей моделью.
+
+    :param model: модель Vosk
+    :param pcm: аудиоданные (int16, mono, 16 кГц)
+    :param blocksize_ms: размер блока в миллисекундах
+    :param workers: число параллельных движков
+    :param realtime: подавать аудио в реальном времени
+    :return: результаты измерений
+    """
+    bench_workers = [BenchWorker(model, pcm, blocksize_ms, realtime, i) for i in range(workers)]
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for worker in bench_workers:
+        worker.start()
+    for worker in bench_workers:
+        worker.wait_drained()
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    for worker in bench_workers:
+        worker.stop()
+
+    audio_seconds = workers * len(pcm) / 2 / SAMPLERATE
+    latencies = np.array([value for worker in bench_workers for value in worker.latencies])
+    latency_ms: Dict[str, Any] = {"count": int(latencies.size)}
+    if latencies.size:
+        p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+        latency_ms.update(p50=round(p50, 2), p95=round(p95, 2), p99=round(p99, 2))
+
+    return {
+        "blocksize_ms": blocksize_ms,
+        "workers": workers,
+        "realtime": realtime,
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "rtf": round(wall / audio_seconds, 4),
+        "cpu_seconds_per_audio_second": round(cpu / audio_seconds, 4),
+        "latency_ms": latency_ms,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def load_fixtures(paths: List[str]) -> List[str]:
+    """
+    Собирает список WAV-файлов: файлы берутся как есть, из каталогов — все *.wav.
+
+    :param paths: пути к файлам и каталогам
+    :return: отсортированный список файлов
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".wav")
+            )
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def build_pcm(files: List[str]) -> bytes:
+    """
+    Склеивает фикстуры в один поток, добавляя тишину после каждой.
+
+    :param files: WAV-файлы (16 кГц, 16 бит, моно)
+    :return: PCM-данные
+    """
+    silence = bytes(int(TAIL_SILENCE_SECONDS * SAMPLERATE) * 2)
+    parts = []
+    for path in files:
+        with open(path, "rb") as f:
+            pcm, rate = decode_audio(f.read(), SAMPLERATE)
+        if rate != SAMPLERATE:
+            raise ValueError(f"{path}: нужна частота {SAMPLERATE} Гц, а не {rate}")
+        parts.extend((pcm, silence))
+    return b"".join(parts)
+
+
+def parse_int_list(value: str) -> List[int]:
+    """Разбирает список чисел через запятую."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    """
+    Точка входа: `python -m app.bench`.
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарк распознавания речи на WAV-фикстурах")
+    parser.add_argument("fixtures", nargs="+", help="WAV-файлы или каталоги с ними")
+    parser.add_argument("--model", default=STT_VOSK_MODEL_PATH, help="путь к модели Vosk")
+    parser.add_argument("--blocksizes", type=parse_int_list, default=[20, 50, 100, 200],
+                        help="размеры блока в мс через запятую")
+    parser.add_argument("--workers", type=parse_int_list, default=[1],
+                        help="числа параллельных движков через запятую")
+    parser.add_argument("--realtime", action="store_true",
+                        help="подавать аудио в темпе реального времени, а не с максимальной скоростью")
+    parser.add_argument("--output", help="файл для JSON-отчёта (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    logging.getLogger("stt_logger").setLevel(logging.WARNING)
+    vosk.SetLogLevel(-1)
+
+    files = load_fixtures(args.fixtures)
+    if not files:
+        parser.error("не найдено ни одной WAV-фикстуры")
+    pcm = build_pcm(files)
+
+    model_started = time.perf_counter()
+    model = vosk.Model(args.model)
+    model_load_seconds = time.perf_counter() - model_started
+
+    runs = []
+    for blocksize_ms in args.blocksizes:
+        for workers in args.workers:
+            runs.append(run_case(model, pcm, blocksize_ms, workers, args.realtime))
+            print(f"blocksize={blocksize_ms}ms workers={workers}: rtf={runs[-1]['rtf']}", file=sys.stderr)
+
+    report = {
+        "model": os.path.abspath(args.model),
+        "model_load_seconds": round(model_load_seconds, 3),
+        "fixtures": files,
+        "fixture_seconds": round(len(pcm) / 2 / SAMPLERATE, 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+        "runs": runs,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,12 +23,32 @@ if not STT_USE_TORCH_MODEL_MANAGER_STR:
 STT_USE_TORCH_MODEL_MANAGER = strtobool(STT_USE_TORCH_MODEL_MANAGER_STR)
 
 
-# Аудиоустройство
+# Аудиоустройства: список "устройство[:канал]" через запятую, например "1,2" или "3:0,3:1"
+STT_SOUND_DEVICES = os.getenv("STT_SOUND_DEVICES")
+
+# Источники звука без микрофона: список через запятую — файлы, каналы и PCM по сети, например
+# "file:///data/test.wav?realtime=0,pipe:-,tcp://0.0.0.0:9000?rate=16000,rtp://0.0.0.0:5004"
+STT_AUDIO_SOURCES = [
+    _source.strip() for _source in (os.getenv("STT_AUDIO_SOURCES") or "").split(",") if _source.strip()
+]
+
+# Аудиоустройство (если список STT_SOUND_DEVICES не задан)
 STT_SOUND_DEVICE_INDEX = os.getenv("STT_SOUND_DEVICE_INDEX")
-if not STT_SOUND_DEVICE_INDEX:
-    raise ValueError("Не задан STT_USE_TORCH_MODEL_MANAGER_STR в .env")
+if not STT_SOUND_DEVICE_INDEX and not STT_SOUND_DEVICES and not STT_AUDIO_SOURCES:
+    raise ValueError("Не задан STT_SOUND_DEVICE_INDEX в .env")
+
+if not STT_SOUND_DEVICES:
+    STT_SOUND_DEVICES = STT_SOUND_DEVICE_INDEX or ""
+
+# Источники звука: пары (индекс устройства, номер канала)
+STT_SOUND_SOURCES = []
+for _source in STT_SOUND_DEVICES.split(","):
+    if not _source.strip():
+        continue
+    _device, _, _channel = _source.strip().partition(":")
+    STT_SOUND_SOURCES.append((int(_device), int(_channel or 0)))
 
-STT_SOUND_DEVICE_INDEX = int(STT_SOUND_DEVICE_INDEX)
+STT_SOUND_DEVICE_INDEX = STT_SOUND_SOURCES[0][0] if STT_SOUND_SOURCES else None
 
 # Пути к моделям
 STT_VOSK_MODEL_PATH = os.getenv("STT_VOSK_MODEL_PATH")
@@ -69,3 +89,259 @@ if not STT_LOG_LEVEL:
 STT_URL_TO_TEXT_TRANSMIT = os.getenv("STT_URL_TO_TEXT_TRANSMIT")
 
 STT_LOGS_DIR = os.getenv("STT_LOGS_DIR")
+
+# Формат логов: text или json (одна строка JSON на запись)
+STT_LOG_FORMAT = (os.getenv("STT_LOG_FORMAT") or "text").lower()
+if STT_LOG_FORMAT not in ("text", "json"):
+    raise ValueError(f"STT_LOG_FORMAT должен быть text или json, а не {STT_LOG_FORMAT}")
+
+# Сколько записей может ждать потока вывода логов; при переполнении записи отбрасываются
+STT_LOG_QUEUE_SIZE = os.getenv("STT_LOG_QUEUE_SIZE")
+if not STT_LOG_QUEUE_SIZE:
+    STT_LOG_QUEUE_SIZE = 10000
+STT_LOG_QUEUE_SIZE = int(STT_LOG_QUEUE_SIZE)
+
+# Прореживание частых предупреждений: "логгер=N" через запятую — одно из N с каждого места вызова
+STT_LOG_SAMPLING = {
+    _name.strip(): int(_every)
+    for _name, _, _every in (
+        _item.partition("=") for _item in (os.getenv("STT_LOG_SAMPLING") or "app.core.speech_to_text=20").split(",")
+    )
+    if _name.strip() and _every.strip()
+}
+
+
+# Пул распознавателей для транскрибации загруженных файлов
+STT_TRANSCRIBE_WORKERS = os.getenv("STT_TRANSCRIBE_WORKERS")
+if not STT_TRANSCRIBE_WORKERS:
+    STT_TRANSCRIBE_WORKERS = os.cpu_count() or 1
+STT_TRANSCRIBE_WORKERS = int(STT_TRANSCRIBE_WORKERS)
+
+
+# Потоковое распознавание через WebSocket: сколько аудиокадров держим в очереди соединения
+STT_WS_QUEUE_SIZE = os.getenv("STT_WS_QUEUE_SIZE")
+if not STT_WS_QUEUE_SIZE:
+    STT_WS_QUEUE_SIZE = 32
+STT_WS_QUEUE_SIZE = int(STT_WS_QUEUE_SIZE)
+
+
+# Лента распознанных фраз для подписчиков (SSE / долгий опрос)
+STT_FEED_SIZE = os.getenv("STT_FEED_SIZE")
+if not STT_FEED_SIZE:
+    STT_FEED_SIZE = 1000
+STT_FEED_SIZE = int(STT_FEED_SIZE)
+
+STT_FEED_MAX_WAIT = os.getenv("STT_FEED_MAX_WAIT")
+if not STT_FEED_MAX_WAIT:
+    STT_FEED_MAX_WAIT = 30
+STT_FEED_MAX_WAIT = float(STT_FEED_MAX_WAIT)
+
+
+# Детектор голосовой активности (VAD) перед распознавателем
+STT_VAD_ENABLED = strtobool(os.getenv("STT_VAD_ENABLED") or "false")
+
+STT_VAD_ENERGY_THRESHOLD = os.getenv("STT_VAD_ENERGY_THRESHOLD")
+if not STT_VAD_ENERGY_THRESHOLD:
+    STT_VAD_ENERGY_THRESHOLD = 300
+STT_VAD_ENERGY_THRESHOLD = float(STT_VAD_ENERGY_THRESHOLD)
+
+STT_VAD_ZCR_THRESHOLD = os.getenv("STT_VAD_ZCR_THRESHOLD")
+if not STT_VAD_ZCR_THRESHOLD:
+    STT_VAD_ZCR_THRESHOLD = 0.35
+STT_VAD_ZCR_THRESHOLD = float(STT_VAD_ZCR_THRESHOLD)
+
+STT_VAD_HANGOVER_MS = os.getenv("STT_VAD_HANGOVER_MS")
+if not STT_VAD_HANGOVER_MS:
+    STT_VAD_HANGOVER_MS = 300
+STT_VAD_HANGOVER_MS = int(STT_VAD_HANGOVER_MS)
+
+
+# Захват аудио: длительность блока и ограниченная очередь перед распознавателем
+STT_BLOCKSIZE_MS = os.getenv("STT_BLOCKSIZE_MS")
+if not STT_BLOCKSIZE_MS:
+    STT_BLOCKSIZE_MS = 100
+STT_BLOCKSIZE_MS = int(STT_BLOCKSIZE_MS)
+
+STT_AUDIO_QUEUE_SECONDS = os.getenv("STT_AUDIO_QUEUE_SECONDS")
+if not STT_AUDIO_QUEUE_SECONDS:
+    STT_AUDIO_QUEUE_SECONDS = 5
+STT_AUDIO_QUEUE_SECONDS = float(STT_AUDIO_QUEUE_SECONDS)
+
+# drop_oldest — отбрасывать самое старое аудио, drop_newest — новое
+STT_AUDIO_OVERFLOW_POLICY = os.getenv("STT_AUDIO_OVERFLOW_POLICY") or "drop_oldest"
+
+
+# Опознавание говорящего по образцам голосов (STT_SPK_MODEL_PATH, STT_SAMPLE_VOICES_PATH)
+STT_SPK_ENABLED = strtobool(os.getenv("STT_SPK_ENABLED") or "false")
+
+STT_SPK_THRESHOLD = os.getenv("STT_SPK_THRESHOLD")
+if not STT_SPK_THRESHOLD:
+    STT_SPK_THRESHOLD = 0.5
+STT_SPK_THRESHOLD = float(STT_SPK_THRESHOLD)
+
+# Кэш x-векторов образцов (по умолчанию — .xvectors.json в каталоге образцов)
+STT_SPK_CACHE_PATH = os.getenv("STT_SPK_CACHE_PATH")
+
+
+# Пересылка фраз в STT_URL_TO_TEXT_TRANSMIT: окно сбора пачки, размер пачки и очередь
+STT_FORWARD_BATCH_WINDOW_MS = os.getenv("STT_FORWARD_BATCH_WINDOW_MS")
+if not STT_FORWARD_BATCH_WINDOW_MS:
+    STT_FORWARD_BATCH_WINDOW_MS = 200
+STT_FORWARD_BATCH_WINDOW_MS = int(STT_FORWARD_BATCH_WINDOW_MS)
+
+STT_FORWARD_BATCH_SIZE = os.getenv("STT_FORWARD_BATCH_SIZE")
+if not STT_FORWARD_BATCH_SIZE:
+    STT_FORWARD_BATCH_SIZE = 50
+STT_FORWARD_BATCH_SIZE = int(STT_FORWARD_BATCH_SIZE)
+
+STT_FORWARD_MEMORY_SIZE = os.getenv("STT_FORWARD_MEMORY_SIZE")
+if not STT_FORWARD_MEMORY_SIZE:
+    STT_FORWARD_MEMORY_SIZE = 1000
+STT_FORWARD_MEMORY_SIZE = int(STT_FORWARD_MEMORY_SIZE)
+
+STT_FORWARD_SPOOL_PATH = os.getenv("STT_FORWARD_SPOOL_PATH")
+if not STT_FORWARD_SPOOL_PATH:
+    STT_FORWARD_SPOOL_PATH = os.path.join(CURRENT_DIRECTORY, "..", "spool", "forward_outbox.jsonl")
+
+STT_FORWARD_SPOOL_MAX_MB = os.getenv("STT_FORWARD_SPOOL_MAX_MB")
+if not STT_FORWARD_SPOOL_MAX_MB:
+    STT_FORWARD_SPOOL_MAX_MB = 50
+STT_FORWARD_SPOOL_MAX_MB = int(STT_FORWARD_SPOOL_MAX_MB)
+
+
+# Командный режим: файл грамматик (список фраз или {"имя": [фразы]}) и грамматика по умолчанию
+STT_GRAMMAR_PATH = os.getenv("STT_GRAMMAR_PATH")
+if not STT_GRAMMAR_PATH:
+    STT_GRAMMAR_PATH = os.path.join(CURRENT_DIRECTORY, "..", "models", "grammars", "commands.json")
+
+STT_GRAMMAR_DEFAULT = os.getenv("STT_GRAMMAR_DEFAULT") or None
+
+
+# Разбор времени и длительности в тексте фраз («без десяти пять», «через двадцать минут»)
+STT_TIME_PARSER_ENABLED = strtobool(os.getenv("STT_TIME_PARSER_ENABLED") or "true")
+
+STT_TIME_PARSER_PATH = os.getenv("STT_TIME_PARSER_PATH")
+if not STT_TIME_PARSER_PATH:
+    STT_TIME_PARSER_PATH = os.path.join(CURRENT_DIRECTORY, "..", "models", "time-parser", "time_parser_stoi.json")
+
+
+# Распознавание в отдельных процессах (0 — в потоках основного процесса).
+# Каждый процесс загружает свою копию модели: источники и файлы распределяются по ядрам
+STT_PROCESS_WORKERS = os.getenv("STT_PROCESS_WORKERS")
+if not STT_PROCESS_WORKERS:
+    STT_PROCESS_WORKERS = 0
+STT_PROCESS_WORKERS = int(STT_PROCESS_WORKERS)
+
+
+# Журнал фраз на диске (SQLite) для поиска по времени и словам
+STT_HISTORY_ENABLED = strtobool(os.getenv("STT_HISTORY_ENABLED") or "true")
+
+STT_HISTORY_PATH = os.getenv("STT_HISTORY_PATH")
+if not STT_HISTORY_PATH:
+    STT_HISTORY_PATH = os.path.join(CURRENT_DIRECTORY, "..", "data", "transcripts.sqlite3")
+
+STT_HISTORY_BATCH_WINDOW_MS = os.getenv("STT_HISTORY_BATCH_WINDOW_MS")
+if not STT_HISTORY_BATCH_WINDOW_MS:
+    STT_HISTORY_BATCH_WINDOW_MS = 500
+STT_HISTORY_BATCH_WINDOW_MS = int(STT_HISTORY_BATCH_WINDOW_MS)
+
+
+# Слова с таймингами и уверенностью в результатах; фразы со средней уверенностью ниже порога отбрасываются (0 — не отбрасывать)
+STT_WORDS_ENABLED = strtobool(os.getenv("STT_WORDS_ENABLED") or "true")
+
+STT_MIN_CONFIDENCE = os.getenv("STT_MIN_CONFIDENCE")
+if not STT_MIN_CONFIDENCE:
+    STT_MIN_CONFIDENCE = 0
+STT_MIN_CONFIDENCE = float(STT_MIN_CONFIDENCE)
+
+
+# Предобработка звука: частота и число каналов, в которых открывается устройство
+# ("native" — родные параметры устройства), сведение каналов в моно, АРУ и шумоподавление
+STT_CAPTURE_SAMPLERATE = os.getenv("STT_CAPTURE_SAMPLERATE") or "16000"
+if STT_CAPTURE_SAMPLERATE != "native":
+    STT_CAPTURE_SAMPLERATE = int(STT_CAPTURE_SAMPLERATE)
+
+# 0 — столько каналов, сколько нужно, чтобы взять канал источника
+STT_CAPTURE_CHANNELS = os.getenv("STT_CAPTURE_CHANNELS") or "0"
+if STT_CAPTURE_CHANNELS != "native":
+    STT_CAPTURE_CHANNELS = int(STT_CAPTURE_CHANNELS)
+
+STT_CAPTURE_DOWNMIX = strtobool(os.getenv("STT_CAPTURE_DOWNMIX") or "false")
+
+STT_AGC_ENABLED = strtobool(os.getenv("STT_AGC_ENABLED") or "false")
+
+STT_AGC_TARGET_DBFS = os.getenv("STT_AGC_TARGET_DBFS")
+if not STT_AGC_TARGET_DBFS:
+    STT_AGC_TARGET_DBFS = -20
+STT_AGC_TARGET_DBFS = float(STT_AGC_TARGET_DBFS)
+
+STT_AGC_MAX_GAIN_DB = os.getenv("STT_AGC_MAX_GAIN_DB")
+if not STT_AGC_MAX_GAIN_DB:
+    STT_AGC_MAX_GAIN_DB = 30
+STT_AGC_MAX_GAIN_DB = float(STT_AGC_MAX_GAIN_DB)
+
+STT_NOISE_GATE_ENABLED = strtobool(os.getenv("STT_NOISE_GATE_ENABLED") or "false")
+
+STT_NOISE_GATE_THRESHOLD = os.getenv("STT_NOISE_GATE_THRESHOLD")
+if not STT_NOISE_GATE_THRESHOLD:
+    STT_NOISE_GATE_THRESHOLD = 2.0
+STT_NOISE_GATE_THRESHOLD = float(STT_NOISE_GATE_THRESHOLD)
+
+STT_NOISE_GATE_ATTENUATION_DB = os.getenv("STT_NOISE_GATE_ATTENUATION_DB")
+if not STT_NOISE_GATE_ATTENUATION_DB:
+    STT_NOISE_GATE_ATTENUATION_DB = 20
+STT_NOISE_GATE_ATTENUATION_DB = float(STT_NOISE_GATE_ATTENUATION_DB)
+
+
+# История звука в памяти: последние N секунд каждого источника для выдачи звука фраз (0 — не хранить)
+STT_AUDIO_HISTORY_SECONDS = os.getenv("STT_AUDIO_HISTORY_SECONDS")
+if not STT_AUDIO_HISTORY_SECONDS:
+    STT_AUDIO_HISTORY_SECONDS = 60
+STT_AUDIO_HISTORY_SECONDS = float(STT_AUDIO_HISTORY_SECONDS)
+
+# Сколько звука захватывать перед началом фразы
+STT_AUDIO_PREROLL_MS = os.getenv("STT_AUDIO_PREROLL_MS")
+if not STT_AUDIO_PREROLL_MS:
+    STT_AUDIO_PREROLL_MS = 300
+STT_AUDIO_PREROLL_MS = int(STT_AUDIO_PREROLL_MS)
+
+
+# Слово активации: пока его не услышали, полный словарь модели не работает (пусто — слушать всё).
+# Несколько вариантов — через запятую
+STT_WAKE_WORDS = [
+    _phrase.strip() for _phrase in (os.getenv("STT_WAKE_WORDS") or "").split(",") if _phrase.strip()
+]
+
+STT_WAKE_WINDOW_MS = os.getenv("STT_WAKE_WINDOW_MS")
+if not STT_WAKE_WINDOW_MS:
+    STT_WAKE_WINDOW_MS = 8000
+STT_WAKE_WINDOW_MS = int(STT_WAKE_WINDOW_MS)
+
+STT_WAKE_PREROLL_MS = os.getenv("STT_WAKE_PREROLL_MS")
+if not STT_WAKE_PREROLL_MS:
+    STT_WAKE_PREROLL_MS = 1000
+STT_WAKE_PREROLL_MS = int(STT_WAKE_PREROLL_MS)
+
+
+# Кэш /api/stt/transcribe по содержимому звука: LRU в памяти (0 — выключен)
+# и, если задан путь, каталог на диске с ограничением объёма
+STT_TRANSCRIBE_CACHE_ITEMS = os.getenv("STT_TRANSCRIBE_CACHE_ITEMS")
+if not STT_TRANSCRIBE_CACHE_ITEMS:
+    STT_TRANSCRIBE_CACHE_ITEMS = 256
+STT_TRANSCRIBE_CACHE_ITEMS = int(STT_TRANSCRIBE_CACHE_ITEMS)
+
+STT_TRANSCRIBE_CACHE_PATH = os.getenv("STT_TRANSCRIBE_CACHE_PATH") or None
+
+STT_TRANSCRIBE_CACHE_MAX_MB = os.getenv("STT_TRANSCRIBE_CACHE_MAX_MB")
+if not STT_TRANSCRIBE_CACHE_MAX_MB:
+    STT_TRANSCRIBE_CACHE_MAX_MB = 256
+STT_TRANSCRIBE_CACHE_MAX_MB = int(STT_TRANSCRIBE_CACHE_MAX_MB)
+
+
+# Диагностика на работающем сервисе: /debug/profile и /debug/stages (по умолчанию выключены)
+STT_DEBUG_ENABLED = strtobool(os.getenv("STT_DEBUG_ENABLED") or "false")
+
+STT_PROFILE_MAX_SECONDS = os.getenv("STT_PROFILE_MAX_SECONDS")
+if not STT_PROFILE_MAX_SECONDS:
+    STT_PROFILE_MAX_SECONDS = 60
+STT_PROFILE_MAX_SECONDS = float(STT_PROFILE_MAX_SECONDS)
@@ -0,0 +1,168 @@
+"""
+Ограниченная очередь аудиоблоков между аудио-коллбэком и распознавателем.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import cffi
+import numpy as np
+
+
+# Политики переполнения
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+_ffi = cffi.FFI()
+
+
+def as_waveform(view: memoryview) -> Any:
+    """
+    Оборачивает буфер в указатель cffi без копирования.
+    Vosk принимает `char *` только как bytes или cdata, а bytearray/memoryview — нет.
+
+    :param view: блок аудио
+    :return: cdata `char[]`, ссылающийся на тот же буфер
+    """
+    return _ffi.from_buffer(view)
+
+
+class AudioRingBuffer:
+    """
+    Потокобезопасный кольцевой буфер аудиоблоков фиксированной ёмкости.
+
+    Память под блоки выделяется один раз: `put` копирует данные из буфера
+    PortAudio в свободный слот, а `get` отдаёт `memoryview` на этот слот.
+    В аудиопотоке нет выделений памяти, и сборщику мусора нечего убирать.
+
+    Слот, выданный `get`, принадлежит читателю до следующего `get` или
+    `release`. `put` никогда не блокирует: если распознаватель отстаёт и
+    буфер полон, блок отбрасывается по политике — самый старый
+    (`drop_oldest`, меньше задержка) или новый (`drop_newest`, фраза не
+    рвётся посередине). Каждое переполнение учитывается.
+    """
+
+    def __init__(self, capacity: int, block_bytes: int, policy: str = DROP_OLDEST) -> None:
+        """
+        Инициализация буфера.
+
+        :param capacity: максимальное число блоков в буфере
+        :param block_bytes: размер одного блока в байтах
+        :param policy: политика переполнения (drop_oldest или drop_newest)
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy}")
+        self._capacity = max(1, capacity)
+        self._policy = policy
+        # Лишний слот — тот, что сейчас обрабатывает читатель
+        self._slots: List[bytearray] = [bytearray(block_bytes) for _ in range(self._capacity + 1)]
+        self._views: List[memoryview] = [memoryview(slot) for slot in self._slots]
+        self._samples: List[np.ndarray] = [np.frombuffer(slot, dtype=np.int16) for slot in self._slots]
+        # Момент поступления блока в слот (time.perf_counter)
+        self._stamps: List[float] = [0.0] * (self._capacity + 1)
+        self._free: Deque[int] = deque(range(self._capacity + 1))
+        self._queued: Deque[Tuple[int, int]] = deque()
+        self._held: Optional[int] = None
+        self._not_empty = threading.Condition(threading.Lock())
+        self.overruns = 0
+        self.blocks_in = 0
+        self.blocks_out = 0
+
+    @property
+    def capacity(self) -> int:
+        """Ёмкость буфера в блоках."""
+        return self._capacity
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    @property
+    def held_timestamp(self) -> float:
+        """Момент поступления блока, выданного последним `get` (time.perf_counter)."""
+        return self._stamps[self._held] if self._held is not None else 0.0
+
+    def put(self, data: Any) -> None:
+        """
+        Копирует блок в свободный слот, при переполнении отбрасывая блок по политике.
+
+        :param data: блок аудио — буфер байтов или массив сэмплов int16 (в том числе
+                     строчный срез одного канала многоканального потока)
+        """
+        is_array = isinstance(data, np.ndarray)
+        size = data.nbytes if is_array else len(data)
+        with self._not_empty:
+            self.blocks_in += 1
+            if len(self._queued) >= self._capacity:
+                self.overruns += 1
+                if self._policy == DROP_NEWEST:
+                    return
+                index, _ = self._queued.popleft()
+            else:
+                index = self._free.popleft()
+
+            if size > len(self._slots[index]):
+                # Блок больше ожидаемого — слот расширяется один раз
+                self._slots[index] = bytearray(size)
+                self._views[index] = memoryview(self._slots[index])
+                self._samples[index] = np.frombuffer(self._slots[index], dtype=np.int16)
+            if is_array:
+                self._samples[index][:data.size] = data
+            else:
+                self._views[index][:size] = data
+            self._stamps[index] = time.perf_counter()
+            self._queued.append((index, size))
+            self._not_empty.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """
+        Выдаёт самый старый блок, ожидая его не дольше `timeout` секунд.
+        Предыдущий выданный блок при этом возвращается в буфер.
+
+        :param timeout: время ожидания (None — ждать бесконечно)
+        :return: представление блока (действительно до следующего get) или None по таймауту
+        """
+        with self._not_empty:
+            self._release_held()
+            if not self._queued and not self._not_empty.wait_for(lambda: self._queued, timeout):
+                return None
+            index, size = self._queued.popleft()
+            self._held = index
+            self.blocks_out += 1
+            view = self._views[index]
+            return view if size == len(view) else view[:size]
+
+    def release(self) -> None:
+        """Возвращает в буфер блок, выданный последним вызовом `get`."""
+        with self._not_empty:
+            self._release_held()
+
+    def _release_held(self) -> None:
+        if self._held is not None:
+            self._free.append(self._held)
+            self._held = None
+
+    def clear(self) -> None:
+        """Удаляет все накопленные блоки."""
+        with self._not_empty:
+            self._free.extend(index for index, _ in self._queued)
+            self._queued.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние буфера.
+
+        :return: словарь с глубиной, ёмкостью и числом переполнений
+        """
+        return {
+            "depth": len(self._queued),
+            "capacity": self._capacity,
+            "policy": self._policy,
+            "overruns": self.overruns,
+            "blocks_in": self.blocks_in,
+            "blocks_out": self.blocks_out,
+        }
@@ -0,0 +1,139 @@
+"""
+История звука источника: последние N секунд PCM в памяти для выдачи аудио фраз.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class PcmHistory:
+    """
+    Кольцевой буфер последних `seconds` секунд звука (int16, моно).
+
+    Память выделяется один раз. Сэмплы нумеруются от начала прослушивания,
+    поэтому фраза описывается парой номеров сэмплов и остаётся доступной,
+    пока её звук не вытеснен. Для каждого записанного блока хранится момент
+    записи (`time.perf_counter`), по которому моменты поступления блоков
+    из очереди распознавателя переводятся в номера сэмплов.
+
+    Пишет аудио-коллбэк, читают поток прослушивания и HTTP-запросы.
+    """
+
+    def __init__(self, seconds: float, samplerate: int = 16000, preroll: float = 0.0, min_block_ms: int = 5) -> None:
+        """
+        Выделение буфера.
+
+        :param seconds: сколько секунд звука хранить
+        :param samplerate: частота дискретизации
+        :param preroll: сколько секунд звука захватывать перед началом фразы
+        :param min_block_ms: минимальная длительность блока (определяет размер индекса блоков)
+        """
+        self._samplerate = samplerate
+        self._preroll = int(preroll * samplerate)
+        self._capacity = max(1, int(seconds * samplerate))
+        self._pcm = np.zeros(self._capacity, dtype=np.int16)
+        self._block_capacity = max(16, int(seconds * 1000 / min_block_ms) + 1)
+        self._block_stamps = np.zeros(self._block_capacity, dtype=np.float64)
+        self._block_starts = np.zeros(self._block_capacity, dtype=np.int64)
+        self._blocks = 0
+        self._written = 0
+        self._lock = threading.Lock()
+
+    @property
+    def samplerate(self) -> int:
+        """Частота дискретизации."""
+        return self._samplerate
+
+    @property
+    def written(self) -> int:
+        """Номер следующего сэмпла (всего записано сэмплов)."""
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """Номер самого старого сэмпла, ещё хранящегося в буфере."""
+        return max(0, self._written - self._capacity)
+
+    def write(self, data: Any) -> None:
+        """
+        Дописывает блок звука (из аудио-коллбэка).
+
+        :param data: буфер байтов или массив сэмплов int16 (в том числе со страйдом)
+        """
+        samples = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.int16)
+        count = len(samples)
+        if count > self._capacity:
+            samples = samples[-self._capacity:]
+        with self._lock:
+            start = self._written
+            offset = (start + count - len(samples)) % self._capacity
+            first = min(len(samples), self._capacity - offset)
+            self._pcm[offset:offset + first] = samples[:first]
+            self._pcm[:len(samples) - first] = samples[first:]
+
+            index = self._blocks % self._block_capacity
+            self._block_stamps[index] = time.perf_counter()
+            self._block_starts[index] = start
+            self._blocks += 1
+            self._written = start + count
+
+    def span(self, start_stamp: float, end_stamp: float) -> Optional[Tuple[int, int]]:
+        """
+        Переводит моменты поступления первого и последнего блоков фразы в номера сэмплов.
+
+        :param start_stamp: момент поступления первого блока фразы (time.perf_counter)
+        :param end_stamp: момент поступления блока, завершившего фразу
+        :return: пара (первый сэмпл, сэмпл после последнего) или None, если блоков уже нет
+        """
+        with self._lock:
+            count = min(self._blocks, self._block_capacity)
+            if not count:
+                return None
+            order = (np.arange(count) + self._blocks - count) % self._block_capacity
+            stamps = self._block_stamps[order]
+            starts = self._block_starts[order]
+            written = self._written
+        # Блок попадает в очередь сразу после записи в историю, поэтому его
+        # момент поступления — не раньше момента записи
+        first = int(np.searchsorted(stamps, start_stamp, side="right")) - 1
+        last = int(np.searchsorted(stamps, end_stamp, side="right")) - 1
+        if first < 0 or last < 0:
+            return None
+        start = max(int(starts[first]) - self._preroll, 0)
+        end = int(starts[last + 1]) if last + 1 < count else written
+        return start, end
+
+    def read(self, start: int, end: int) -> Optional[np.ndarray]:
+        """
+        Копирует звук между номерами сэмплов.
+
+        :param start: номер первого сэмпла
+        :param end: номер сэмпла после последнего
+        :return: копия сэмплов или None, если звук уже вытеснен или ещё не записан
+        """
+        with self._lock:
+            if start < self.oldest or end > self._written or start > end:
+                return None
+            out = np.empty(end - start, dtype=np.int16)
+            offset = start % self._capacity
+            first = min(end - start, self._capacity - offset)
+            out[:first] = self._pcm[offset:offset + first]
+            out[first:] = self._pcm[:end - start - first]
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает заполненность буфера.
+
+        :return: словарь с ёмкостью и объёмом хранимого звука в секундах
+        """
+        return {
+            "capacity_seconds": self._capacity / self._samplerate,
+            "stored_seconds": min(self._written, self._capacity) / self._samplerate,
+            "written_seconds": self._written / self._samplerate,
+        }
@@ -0,0 +1,502 @@
+"""
+Источники звука: микрофон, файл, канал (stdin / именованный канал), PCM по TCP/UDP/RTP.
+
+Каждый источник — фабрика входного потока с интерфейсом `sd.RawInputStream`
+(именованные аргументы samplerate, blocksize, device, dtype, channels,
+callback), поэтому `Speech2Text` принимает его как `input_stream`.
+Потоки, отличные от sounddevice, читают данные в отдельном потоке в заранее
+выделенный блок и вызывают аудио-коллбэк так же, как это делает PortAudio.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+import wave
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+except OSError:
+    sd = None
+
+try:
+    import soundfile
+except ImportError:
+    # FLAC и прочие форматы libsndfile недоступны, WAV читается модулем wave
+    soundfile = None
+
+from app.core.logger import get_logger
+
+
+# Размер заголовка RTP без CSRC и расширений
+_RTP_HEADER = 12
+# Таймаут ожидания данных сетевыми источниками (секунды)
+_POLL_TIMEOUT = 0.5
+
+
+class AudioSource:
+    """
+    Источник звука: фабрика входного потока с интерфейсом `sd.RawInputStream`.
+    """
+
+    # Формат задаёт сам источник (файл, заголовок потока), а не запрос на открытие
+    fixed_format = False
+    # Готов ли движок принять следующий блок; задаёт движок, источники без темпа
+    # реального времени ждут, а не переполняют его очередь
+    ready: Optional[Callable[[], bool]] = None
+
+    def __init__(self, name: str) -> None:
+        """
+        :param name: идентификатор источника (для статистики и API)
+        """
+        self.name = name
+
+    def native_format(self) -> Optional[Tuple[int, int]]:
+        """
+        Возвращает родной формат источника.
+
+        :return: пара (частота дискретизации, число каналов) или None, если неизвестен
+        """
+        return None
+
+    def __call__(self, **kwargs: Any) -> Any:
+        """
+        Открывает входной поток.
+
+        :param kwargs: параметры `sd.RawInputStream` (samplerate, blocksize, channels, callback, ...)
+        :return: контекстный менеджер, запускающий поток на входе
+        """
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class SoundDeviceSource(AudioSource):
+    """Аудиоустройство через sounddevice (PortAudio)."""
+
+    def __init__(self, device: int, name: Optional[str] = None) -> None:
+        """
+        :param device: индекс аудиоустройства
+        :param name: идентификатор источника
+        """
+        super().__init__(name or str(device))
+        self.device = device
+
+    def native_format(self) -> Optional[Tuple[int, int]]:
+        info = sd.query_devices(self.device, "input")
+        return int(info["default_samplerate"]), int(info["max_input_channels"])
+
+    def __call__(self, **kwargs: Any) -> Any:
+        if sd is None:
+            raise RuntimeError("sounddevice недоступен: нет PortAudio")
+        kwargs["device"] = self.device
+        return sd.RawInputStream(**kwargs)
+
+
+class BlockReaderStream:
+    """
+    Входной поток поверх функции чтения: заполняет заранее выделенный блок
+    и передаёт его в коллбэк из отдельного потока.
+
+    После конца данных `finished` становится True, и движок, дочитав
+    очередь, завершает прослушивание. Если чтение или коллбэк упали с ошибкой, она
+    сохраняется в `error`: движок, дочитав очередь, поднимает её и
+    открывает источник заново.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[memoryview], int],
+        name: str,
+        samplerate: int,
+        blocksize: int,
+        channels: int,
+        callback: Callable,
+        realtime: bool = False,
+        close: Optional[Callable[[], None]] = None,
+        ready: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        """
+        :param read: читает данные в буфер и возвращает число байтов (0 — конец данных)
+        :param name: имя потока (для логов)
+        :param samplerate: частота дискретизации
+        :param blocksize: размер блока в кадрах
+        :param channels: число каналов
+        :param callback: аудио-коллбэк движка
+        :param realtime: отдавать блоки с темпом реального времени
+        :param close: освобождает ресурсы источника (вызывается при выходе)
+        :param ready: готов ли движок принять следующий блок (без темпа реального времени)
+        """
+        self._read = read
+        self._samplerate = samplerate
+        self._frames = blocksize
+        self._frame_bytes = 2 * channels
+        self._callback = callback
+        self._realtime = realtime
+        self._close = close
+        self._ready = ready
+        self._block = bytearray(blocksize * self._frame_bytes)
+        self._view = memoryview(self._block)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stt-source-{name}", daemon=True)
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.blocks = 0
+
+    @property
+    def active(self) -> bool:
+        """Идёт ли чтение."""
+        return self._thread.is_alive()
+
+    def __enter__(self) -> "BlockReaderStream":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stop.set()
+        if self._close is not None:
+            # Закрытие прерывает чтение, заблокированное на сокете или канале
+            self._close()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        try:
+            self._pump()
+        except Exception as e:
+            # Ошибка чтения (сокет, канал, libsndfile, заменённый файл) или коллбэка
+            # движка: движок поднимет её и откроет источник заново
+            if not self._stop.is_set():
+                self.error = e
+
+    def _pump(self) -> None:
+        started = time.perf_counter()
+        size = len(self._block)
+        while not self._stop.is_set():
+            filled = 0
+            while filled < size:
+                try:
+                    count = self._read(self._view[filled:])
+                except TimeoutError:
+                    # Сетевые источники ждут данных с таймаутом, чтобы замечать остановку
+                    if self._stop.is_set():
+                        return
+                    continue
+                if not count:
+                    break
+                filled += count
+            # Неполный последний кадр отбрасываем
+            filled -= filled % self._frame_bytes
+            if filled:
+                if self._realtime:
+                    delay = started + self.blocks * self._frames / self._samplerate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                elif self._ready is not None:
+                    while not self._ready() and not self._stop.is_set():
+                        time.sleep(0.0005)
+                self.blocks += 1
+                self._callback(self._view[:filled], filled // self._frame_bytes, None, None)
+            if filled < size:
+                break
+        self.finished = True
+
+
+class FileSource(AudioSource):
+    """
+    Аудиофайл: WAV (16 бит) или, если установлен soundfile, FLAC и другие
+    форматы libsndfile. Отдаётся в реальном времени или так быстро, как
+    успевает движок; по окончании может начинаться заново.
+    """
+
+    fixed_format = True
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False, name: Optional[str] = None) -> None:
+        """
+        :param path: путь к файлу
+        :param realtime: отдавать с темпом реального времени
+        :param loop: начинать заново по окончании файла
+        :param name: идентификатор источника
+        """
+        super().__init__(name or f"file:{os.path.basename(path)}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Аудиофайл не найден: {path}")
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+
+    def native_format(self) -> Optional[Tuple[int, int]]:
+        if soundfile is not None:
+            info = soundfile.info(self.path)
+            return int(info.samplerate), int(info.channels)
+        with wave.open(self.path, "rb") as wav:
+            return wav.getframerate(), wav.getnchannels()
+
+    def _open_reader(self) -> Tuple[Callable[[memoryview], int], Callable[[], None]]:
+        if soundfile is not None:
+            sound = soundfile.SoundFile(self.path)
+
+            def read(buffer: memoryview) -> int:
+                samples = np.frombuffer(buffer, dtype=np.int16).reshape(-1, sound.channels)
+                return sound.buffer_read_into(samples, dtype="int16") * sound.channels * 2
+
+            return read, sound.close
+
+        wav = wave.open(self.path, "rb")
+        if wav.getsampwidth() != 2:
+            wav.close()
+            raise ValueError(f"Поддерживается только 16-битный WAV: {self.path}")
+        frame_bytes = 2 * wav.getnchannels()
+
+        def read(buffer: memoryview) -> int:
+            data = wav.readframes(len(buffer) // frame_bytes)
+            buffer[:len(data)] = data
+            return len(data)
+
+        return read, wav.close
+
+    def __call__(self, samplerate: int, blocksize: int, channels: int, callback: Callable, **_: Any) -> Any:
+        native = self.native_format()
+        if native != (samplerate, channels):
+            raise ValueError(
+                f"Файл {self.path}: {native[0]} Гц, каналов {native[1]}; "
+                f"запрошено {samplerate} Гц, каналов {channels}"
+            )
+        state: Dict[str, Any] = {}
+
+        def read(buffer: memoryview) -> int:
+            count = state["read"](buffer)
+            if not count and self.loop:
+                state["close"]()
+                state["read"], state["close"] = self._open_reader()
+                count = state["read"](buffer)
+            return count
+
+        state["read"], state["close"] = self._open_reader()
+        return BlockReaderStream(
+            read, self.name, samplerate, blocksize, channels, callback,
+            realtime=self.realtime, close=lambda: state["close"](), ready=self.ready,
+        )
+
+
+class RawPcmSource(AudioSource):
+    """
+    Сырой PCM (int16, little-endian, чередующиеся каналы) с заданным
+    в настройках форматом. Основа для каналов и сетевых источников.
+    """
+
+    fixed_format = True
+
+    def __init__(self, name: str, samplerate: int = 16000, channels: int = 1) -> None:
+        """
+        :param name: идентификатор источника
+        :param samplerate: частота дискретизации потока
+        :param channels: число каналов потока
+        """
+        super().__init__(name)
+        self.samplerate = samplerate
+        self.channels = channels
+
+    def native_format(self) -> Optional[Tuple[int, int]]:
+        return self.samplerate, self.channels
+
+
+class PipeSource(RawPcmSource):
+    """
+    PCM из stdin ("-") или именованного канала. Когда пишущая сторона
+    именованного канала закрывается, канал открывается снова и ждёт
+    следующего писателя; конец stdin завершает поток.
+    """
+
+    def __init__(self, path: str = "-", samplerate: int = 16000, channels: int = 1) -> None:
+        """
+        :param path: путь к именованному каналу или "-" для stdin
+        :param samplerate: частота дискретизации потока
+        :param channels: число каналов потока
+        """
+        super().__init__("pipe:stdin" if path == "-" else f"pipe:{os.path.basename(path)}", samplerate, channels)
+        self.path = path
+
+    def __call__(self, samplerate: int, blocksize: int, channels: int, callback: Callable, **_: Any) -> Any:
+        if self.path == "-":
+            stream = sys.stdin.buffer
+            return BlockReaderStream(
+                stream.readinto, self.name, samplerate, blocksize, channels, callback, ready=self.ready,
+            )
+
+        reopen = stat.S_ISFIFO(os.stat(self.path).st_mode)
+        state = {"file": open(self.path, "rb", buffering=0)}
+
+        def read(buffer: memoryview) -> int:
+            count = state["file"].readinto(buffer)
+            while not count and reopen:
+                state["file"].close()
+                state["file"] = open(self.path, "rb", buffering=0)
+                count = state["file"].readinto(buffer)
+            return count or 0
+
+        return BlockReaderStream(
+            read, self.name, samplerate, blocksize, channels, callback,
+            close=lambda: state["file"].close(), ready=self.ready,
+        )
+
+
+class TcpSource(RawPcmSource):
+    """
+    PCM по TCP: сервер принимает одно подключение за раз (например, удалённый
+    микрофон), после отключения ждёт следующего.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(self, host: str, port: int, samplerate: int = 16000, channels: int = 1) -> None:
+        """
+        :param host: адрес для прослушивания
+        :param port: порт
+        :param samplerate: частота дискретизации потока
+        :param channels: число каналов потока
+        """
+        super().__init__(f"tcp:{port}", samplerate, channels)
+        self.host = host
+        self.port = port
+
+    def __call__(self, samplerate: int, blocksize: int, channels: int, callback: Callable, **_: Any) -> Any:
+        server = socket.create_server((self.host, self.port))
+        server.settimeout(_POLL_TIMEOUT)
+        state: Dict[str, Any] = {"client": None, "closed": False}
+
+        def read(buffer: memoryview) -> int:
+            while True:
+                client = state["client"]
+                if client is None:
+                    client, address = server.accept()
+                    client.settimeout(_POLL_TIMEOUT)
+                    self._log.info("Источник %s: подключение %s", self.name, address)
+                    state["client"] = client
+                try:
+                    count = client.recv_into(buffer)
+                except TimeoutError:
+                    raise
+                except OSError as e:
+                    if state["closed"]:
+                        raise
+                    # Разрыв соединения клиентом — ждём следующего подключения
+                    self._log.warning("Источник %s: соединение разорвано: %s", self.name, e)
+                    count = 0
+                if count:
+                    return count
+                client.close()
+                state["client"] = None
+
+        def close() -> None:
+            state["closed"] = True
+            if state["client"] is not None:
+                state["client"].close()
+            server.close()
+
+        return BlockReaderStream(
+            read, self.name, samplerate, blocksize, channels, callback, close=close, ready=self.ready,
+        )
+
+
+class UdpSource(RawPcmSource):
+    """
+    PCM по UDP: каждая датаграмма — продолжение потока. В режиме RTP
+    заголовок RTP отбрасывается, а полезная нагрузка L16 (big-endian,
+    RFC 3551) переводится в порядок байтов распознавателя.
+    """
+
+    def __init__(self, host: str, port: int, samplerate: int = 16000, channels: int = 1, rtp: bool = False) -> None:
+        """
+        :param host: адрес для прослушивания
+        :param port: порт
+        :param samplerate: частота дискретизации потока
+        :param channels: число каналов потока
+        :param rtp: датаграммы — пакеты RTP с нагрузкой L16
+        """
+        super().__init__(f"{'rtp' if rtp else 'udp'}:{port}", samplerate, channels)
+        self.host = host
+        self.port = port
+        self.rtp = rtp
+
+    def __call__(self, samplerate: int, blocksize: int, channels: int, callback: Callable, **_: Any) -> Any:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((self.host, self.port))
+        sock.settimeout(_POLL_TIMEOUT)
+        packet = bytearray(65536)
+        packet_view = memoryview(packet)
+        # Остаток датаграммы, не поместившийся в текущий блок
+        pending = {"start": 0, "end": 0}
+
+        def read(buffer: memoryview) -> int:
+            if pending["start"] == pending["end"]:
+                size = sock.recv_into(packet)
+                start, end = self._payload(packet_view, size) if self.rtp else (0, size)
+                if self.rtp:
+                    samples = np.frombuffer(packet, dtype=np.int16, count=(end - start) // 2, offset=start)
+                    samples.byteswap(inplace=True)
+                pending["start"], pending["end"] = start, end
+            count = min(len(buffer), pending["end"] - pending["start"])
+            buffer[:count] = packet_view[pending["start"]:pending["start"] + count]
+            pending["start"] += count
+            return count
+
+        return BlockReaderStream(
+            read, self.name, samplerate, blocksize, channels, callback, close=sock.close, ready=self.ready,
+        )
+
+    @staticmethod
+    def _payload(packet: memoryview, size: int) -> Tuple[int, int]:
+        """Границы нагрузки пакета RTP: после заголовка, CSRC и расширения, без дополнения."""
+        if size < _RTP_HEADER:
+            return size, size
+        start = _RTP_HEADER + 4 * (packet[0] & 0x0F)
+        if packet[0] & 0x10 and size >= start + 4:
+            start += 4 + 4 * int.from_bytes(packet[start + 2:start + 4], "big")
+        end = size - packet[size - 1] if packet[0] & 0x20 else size
+        start = min(start, end)
+        # Нечётный хвост не образует сэмпл L16
+        return start, end - (end - start) % 2
+
+
+def create_source(spec: str) -> AudioSource:
+    """
+    Создаёт источник по описанию из настроек.
+
+    Форматы: индекс аудиоустройства ("1"), `file:///путь.wav?realtime=0&loop=1`,
+    `pipe:-` (stdin) или `pipe:///путь/к/каналу`, `tcp://0.0.0.0:9000`,
+    `udp://0.0.0.0:9000`, `rtp://0.0.0.0:5004`. Для сырого PCM формат
+    задаётся параметрами `?rate=16000&channels=1`.
+
+    :param spec: описание источника
+    :return: источник звука
+    :raises ValueError: если схема не поддерживается
+    """
+    if spec.isdigit():
+        return SoundDeviceSource(int(spec))
+
+    url = urlsplit(spec)
+    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    rate = int(params.get("rate", 16000))
+    channels = int(params.get("channels", 1))
+
+    def flag(name: str, default: bool) -> bool:
+        return params.get(name, str(int(default))).lower() in ("1", "true", "yes")
+
+    if url.scheme == "file":
+        return FileSource(url.path, realtime=flag("realtime", True), loop=flag("loop", False))
+    if url.scheme == "pipe":
+        return PipeSource(url.path or "-", rate, channels)
+    if url.scheme == "tcp":
+        return TcpSource(url.hostname or "0.0.0.0", url.port, rate, channels)
+    if url.scheme in ("udp", "rtp"):
+        return UdpSource(url.hostname or "0.0.0.0", url.port, rate, channels, rtp=url.scheme == "rtp")
+    raise ValueError(f"Неизвестный источник звука: {spec}")
@@ -0,0 +1,336 @@
+"""
+Пересылка распознанных фраз во внешний сервис (STT_URL_TO_TEXT_TRANSMIT).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from app.core.logger import get_logger
+from app.core.transcript_feed import TranscriptFeed
+
+
+class SpooledOutbox:
+    """
+    Исходящая очередь: в памяти, а при переполнении — в файле на диске (JSON lines).
+
+    Пока в файле есть неотправленные записи, новые тоже пишутся в файл,
+    чтобы сохранить порядок. Чтение двухфазное: `peek` отдаёт пачку, `ack`
+    удаляет её после успешной доставки. При остановке содержимое памяти
+    сбрасывается в файл и будет отправлено после перезапуска (доставка
+    «хотя бы один раз»).
+
+    Методы синхронные и работают с файлом; вызывать их нужно из одного
+    потока (`TranscriptForwarder` вызывает их в своём потоке ввода-вывода).
+    """
+
+    def __init__(
+        self,
+        memory_size: int = 1000,
+        spool_path: Optional[str] = None,
+        spool_max_bytes: int = 50 * 1024 * 1024,
+    ) -> None:
+        """
+        Инициализация очереди.
+
+        :param memory_size: сколько записей держать в памяти
+        :param spool_path: файл для записей, не поместившихся в память (None — без диска)
+        :param spool_max_bytes: сколько байт неотправленных записей держать в файле; сверх этого записи теряются
+        """
+        self._memory: Deque[Dict[str, Any]] = deque()
+        self._memory_size = memory_size
+        self._spool_path = spool_path
+        self._spool_max_bytes = spool_max_bytes
+        self._spool_offset = 0
+        self._spool_count = 0
+        # Размер неотправленной части файла (после `_spool_offset`)
+        self._spool_bytes = 0
+        self._peeked_sizes: List[int] = []
+        self.dropped = 0
+
+        if spool_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+            if os.path.exists(spool_path):
+                with open(spool_path, "rb") as f:
+                    self._spool_count = sum(1 for _ in f)
+                self._spool_bytes = os.path.getsize(spool_path)
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._spool_count
+
+    @property
+    def spooled(self) -> int:
+        """Число записей, ожидающих отправки в файле."""
+        return self._spool_count
+
+    def put(self, items: Iterable[Dict[str, Any]]) -> None:
+        """
+        Добавляет записи в конец очереди.
+
+        :param items: записи для отправки
+        """
+        spill = []
+        for item in items:
+            if not spill and not self._spool_count and len(self._memory) < self._memory_size:
+                self._memory.append(item)
+            else:
+                spill.append(item)
+        if spill:
+            self._append_to_spool(spill)
+
+    def _append_to_spool(self, items: List[Dict[str, Any]]) -> None:
+        if not self._spool_path:
+            self.dropped += len(items)
+            return
+        with open(self._spool_path, "ab") as f:
+            for item in items:
+                line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+                if self._spool_bytes + len(line) > self._spool_max_bytes:
+                    self.dropped += 1
+                    continue
+                f.write(line)
+                self._spool_bytes += len(line)
+                self._spool_count += 1
+
+    def peek(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Возвращает до `limit` записей из начала очереди, не удаляя их.
+
+        :param limit: максимальное число записей
+        :return: список записей
+        """
+        items = list(islice(self._memory, limit))
+        self._peeked_sizes = []
+        if len(items) < limit and self._spool_count:
+            with open(self._spool_path, "rb") as f:
+                f.seek(self._spool_offset)
+                for line in islice(f, limit - len(items)):
+                    self._peeked_sizes.append(len(line))
+                    items.append(json.loads(line))
+        return items
+
+    def ack(self, count: int) -> None:
+        """
+        Удаляет из начала очереди `count` записей, полученных последним `peek`.
+
+        :param count: число доставленных записей
+        """
+        from_memory = min(count, len(self._memory))
+        for _ in range(from_memory):
+            self._memory.popleft()
+
+        from_spool = min(count - from_memory, len(self._peeked_sizes))
+        if from_spool:
+            acked = sum(self._peeked_sizes[:from_spool])
+            self._spool_offset += acked
+            self._spool_bytes -= acked
+            self._spool_count -= from_spool
+            if not self._spool_count:
+                # Файл полностью отправлен — начинаем его заново
+                open(self._spool_path, "wb").close()
+                self._spool_offset = 0
+                self._spool_bytes = 0
+            elif self._spool_offset > max(self._spool_bytes, 1024 * 1024):
+                self._compact()
+        self._peeked_sizes = []
+
+    def _compact(self) -> None:
+        """Переписывает файл без отправленного начала, чтобы он не рос без предела."""
+        tmp = f"{self._spool_path}.tmp"
+        with open(self._spool_path, "rb") as src, open(tmp, "wb") as dst:
+            src.seek(self._spool_offset)
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(tmp, self._spool_path)
+        self._spool_offset = 0
+
+    def persist(self) -> None:
+        """
+        Сохраняет все неотправленные записи в файл (при остановке сервиса).
+        Записи из памяти оказываются перед уже лежащими в файле.
+        """
+        if not self._spool_path or not (self._memory or self._spool_offset):
+            return
+        rest = b""
+        if self._spool_count:
+            with open(self._spool_path, "rb") as f:
+                f.seek(self._spool_offset)
+                rest = f.read()
+        memory = list(self._memory)
+        self._memory.clear()
+        open(self._spool_path, "wb").close()
+        self._spool_offset = 0
+        self._spool_count = 0
+        self._spool_bytes = 0
+        self._append_to_spool(memory)
+        with open(self._spool_path, "ab") as f:
+            f.write(rest)
+        self._spool_count += rest.count(b"\n")
+        self._spool_bytes += len(rest)
+
+
+class TranscriptForwarder:
+    """
+    Фоновая пересылка фраз из ленты во внешний сервис.
+
+    Фразы забираются из `TranscriptFeed` по курсору (как любым подписчиком)
+    и складываются в `SpooledOutbox`, поэтому поток распознавания ничего
+    не ждёт. Отправитель собирает фразы за короткое окно в пачку и шлёт её
+    одним POST через общую keep-alive сессию aiohttp. При ошибках пачка
+    повторяется с экспоненциальной паузой, а новые фразы копятся в очереди.
+
+    Тело запроса: `{"text": "<фразы через пробел>", "items": [<записи ленты>]}`.
+
+    Очередь работает с файлом, поэтому все её вызовы идут в отдельном потоке
+    ввода-вывода (по одному, в порядке вызова) и не задерживают цикл событий.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        url: str,
+        feed: TranscriptFeed,
+        batch_window: float = 0.2,
+        batch_size: int = 50,
+        outbox: Optional[SpooledOutbox] = None,
+        timeout: float = 10.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        """
+        Инициализация пересылки.
+
+        :param url: адрес внешнего сервиса
+        :param feed: лента распознанных фраз
+        :param batch_window: сколько секунд собирать пачку после первой фразы
+        :param batch_size: максимальное число фраз в пачке
+        :param outbox: исходящая очередь (по умолчанию — только в памяти)
+        :param timeout: таймаут одного запроса в секундах
+        :param max_backoff: максимальная пауза между повторами в секундах
+        """
+        self._url = url
+        self._feed = feed
+        self._batch_window = batch_window
+        self._batch_size = batch_size
+        self._outbox = outbox if outbox is not None else SpooledOutbox()
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-forward-io")
+        self._has_items = asyncio.Event()
+        self.delivered = 0
+        self.failed_attempts = 0
+
+    async def start(self) -> None:
+        """Открывает сессию и запускает фоновые задачи."""
+        self._session = aiohttp.ClientSession(
+            timeout=self._timeout,
+            connector=aiohttp.TCPConnector(limit=1, keepalive_timeout=60),
+        )
+        if len(self._outbox):
+            self._has_items.set()
+        self._tasks = [
+            asyncio.create_task(self._collect(self._feed.last_seq)),
+            asyncio.create_task(self._send_loop()),
+        ]
+        self._log.info("Пересылка фраз запущена: %s", self._url)
+
+    async def stop(self) -> None:
+        """Останавливает задачи, сохраняет неотправленное и закрывает сессию."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._outbox_call(self._outbox.persist)
+        self._io.shutdown(wait=True)
+        if self._session is not None:
+            await self._session.close()
+        self._log.info("Пересылка фраз остановлена, в очереди: %d", len(self._outbox))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики пересылки.
+
+        :return: словарь со счётчиками
+        """
+        return {
+            "pending": len(self._outbox),
+            "spooled": self._outbox.spooled,
+            "delivered": self.delivered,
+            "failed_attempts": self.failed_attempts,
+            "dropped": self._outbox.dropped,
+        }
+
+    async def _outbox_call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Вызывает метод исходящей очереди в потоке ввода-вывода.
+
+        :param method: метод `SpooledOutbox`
+        :param args: аргументы вызова
+        :return: результат вызова
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._io, method, *args)
+
+    async def _collect(self, cursor: int) -> None:
+        """Перекладывает новые фразы из ленты в исходящую очередь."""
+        while True:
+            items = await self._feed.wait(cursor, timeout=60)
+            if items:
+                await self._outbox_call(self._outbox.put, items)
+                cursor = items[-1]["seq"]
+                self._has_items.set()
+
+    async def _send_loop(self) -> None:
+        """Собирает пачки и доставляет их с повторами."""
+        backoff = 0.5
+        while True:
+            await self._has_items.wait()
+            await asyncio.sleep(self._batch_window)
+
+            batch = await self._outbox_call(self._outbox.peek, self._batch_size)
+            if not batch:
+                self._has_items.clear()
+                continue
+
+            if await self._post(batch):
+                await self._outbox_call(self._outbox.ack, len(batch))
+                self.delivered += len(batch)
+                backoff = 0.5
+                if not len(self._outbox):
+                    self._has_items.clear()
+            else:
+                self.failed_attempts += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+
+    async def _post(self, batch: List[Dict[str, Any]]) -> bool:
+        """
+        Отправляет пачку фраз.
+
+        :param batch: записи ленты
+        :return: True, если пачку можно считать обработанной
+        """
+        payload = {"text": " ".join(item["text"] for item in batch), "items": batch}
+        try:
+            async with self._session.post(self._url, json=payload) as resp:
+                if resp.status < 300:
+                    return True
+                if 400 <= resp.status < 500 and resp.status not in (408, 429):
+                    # Сервис отверг данные — повтор не поможет
+                    self._log.error("Пачка из %d фраз отклонена: HTTP %d", len(batch), resp.status)
+                    return True
+                self._log.warning("Ошибка пересылки фраз: HTTP %d", resp.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._log.warning("Ошибка пересылки фраз: %s", e)
+        return False
@@ -0,0 +1,191 @@
+"""
+Командный режим: распознавание по ограниченной грамматике (списку фраз).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import vosk
+
+from app.core.logger import get_logger
+
+
+# Слово, которым Vosk обозначает речь вне грамматики
+UNKNOWN_WORD = "[unk]"
+
+
+class Grammar:
+    """
+    Скомпилированная грамматика: нормализованный список фраз и его хэш.
+    """
+
+    __slots__ = ("name", "digest", "phrases", "spec")
+
+    def __init__(self, name: str, phrases: Sequence[str], add_unknown: bool = True) -> None:
+        """
+        Инициализация грамматики.
+
+        :param name: имя грамматики
+        :param phrases: допустимые фразы
+        :param add_unknown: добавить "[unk]", чтобы посторонняя речь не подгонялась под команды
+        """
+        normalized = sorted({" ".join(phrase.lower().split()) for phrase in phrases} - {""})
+        if add_unknown:
+            normalized.append(UNKNOWN_WORD)
+        self.name = name
+        self.phrases: Tuple[str, ...] = tuple(normalized)
+        # Строка в формате, который принимает KaldiRecognizer
+        self.spec = json.dumps(normalized, ensure_ascii=False)
+        self.digest = hashlib.sha256(self.spec.encode("utf-8")).hexdigest()
+
+    def __repr__(self) -> str:
+        return f"Grammar({self.name!r}, phrases={len(self.phrases)}, digest={self.digest[:12]})"
+
+
+def strip_unknown(text: str) -> str:
+    """
+    Убирает из текста слова вне грамматики.
+
+    :param text: результат распознавания в командном режиме
+    :return: текст без "[unk]"
+    """
+    return " ".join(word for word in text.split() if word != UNKNOWN_WORD)
+
+
+class GrammarRegistry:
+    """
+    Именованные грамматики из JSON-файла и заранее собранные распознаватели для них.
+
+    Файл — либо список фраз (грамматика с именем `commands`), либо объект
+    `{"имя": [фразы]}`. Граф распознавателя строится при создании
+    `KaldiRecognizer` с грамматикой, поэтому готовые распознаватели
+    хранятся в пуле по хэшу содержимого грамматики: одинаковые списки фраз
+    под разными именами компилируются один раз, а перечитывание файла
+    без изменений ничего не пересобирает.
+    """
+
+    _log = get_logger(__name__)
+
+    DEFAULT_NAME = "commands"
+
+    def __init__(self, model: vosk.Model, path: Optional[str] = None, max_idle: int = 4) -> None:
+        """
+        Инициализация реестра.
+
+        :param model: загруженная модель Vosk
+        :param path: JSON-файл с грамматиками (None — реестр пуст)
+        :param max_idle: сколько свободных распознавателей держать на одну грамматику и частоту
+        """
+        self._model = model
+        self._path = path
+        self._max_idle = max_idle
+        self._lock = threading.Lock()
+        self._grammars: Dict[str, Grammar] = {}
+        self._free: Dict[Tuple[str, int], List[vosk.KaldiRecognizer]] = {}
+        self.compiled = 0
+        if path:
+            self.load(path)
+
+    @property
+    def names(self) -> List[str]:
+        """Имена загруженных грамматик."""
+        return sorted(self._grammars)
+
+    def get(self, name: str) -> Grammar:
+        """
+        Возвращает грамматику по имени.
+
+        :param name: имя грамматики
+        :return: грамматика
+        :raises KeyError: если грамматики с таким именем нет
+        """
+        return self._grammars[name]
+
+    def load(self, path: str) -> None:
+        """
+        Загружает грамматики из файла, заменяя прежний набор целиком.
+
+        :param path: JSON-файл со списком фраз или объектом `{"имя": [фразы]}`
+        :raises ValueError: если файл имеет неверный формат
+        """
+        if not os.path.exists(path):
+            self._log.info("Файл грамматик не найден, командный режим недоступен: %s", path)
+            return
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {self.DEFAULT_NAME: data}
+        if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+            raise ValueError(f"Файл грамматик должен содержать список фраз или объект со списками: {path}")
+
+        self._grammars = {name: Grammar(name, phrases) for name, phrases in data.items()}
+        self._path = path
+        self._log.info(
+            "Загружено грамматик: %d (%s)",
+            len(self._grammars),
+            ", ".join(f"{g.name}: {len(g.phrases)}" for g in self._grammars.values()),
+        )
+
+    def reload(self) -> None:
+        """Перечитывает файл грамматик; неизменённые грамматики не пересобираются."""
+        if self._path:
+            self.load(self._path)
+
+    def precompile(self, samplerate: int = 16000) -> None:
+        """
+        Заранее собирает по одному распознавателю на каждую грамматику,
+        чтобы первое переключение в командный режим не ждало сборки графа.
+
+        :param samplerate: частота дискретизации аудио
+        """
+        for grammar in self._grammars.values():
+            with self._lock:
+                if self._free.get((grammar.digest, samplerate)):
+                    continue
+            self.release(grammar, samplerate, self.recognizer(grammar, samplerate))
+
+    def recognizer(self, grammar: Grammar, samplerate: int = 16000) -> vosk.KaldiRecognizer:
+        """
+        Выдаёт распознаватель для грамматики: готовый из пула или собранный заново.
+
+        :param grammar: грамматика
+        :param samplerate: частота дискретизации аудио
+        :return: распознаватель Vosk
+        """
+        with self._lock:
+            free = self._free.get((grammar.digest, samplerate))
+            if free:
+                return free.pop()
+        self.compiled += 1
+        return vosk.KaldiRecognizer(self._model, samplerate, grammar.spec)
+
+    def release(self, grammar: Grammar, samplerate: int, rec: vosk.KaldiRecognizer) -> None:
+        """
+        Возвращает распознаватель в пул.
+
+        :param grammar: грамматика, с которой он собран
+        :param samplerate: частота дискретизации аудио
+        :param rec: распознаватель
+        """
+        rec.Reset()
+        with self._lock:
+            free = self._free.setdefault((grammar.digest, samplerate), [])
+            if len(free) < self._max_idle:
+                free.append(rec)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """
+        Возвращает описание загруженных грамматик.
+
+        :return: словарь {имя: {digest, phrases}}
+        """
+        return {
+            name: {"digest": grammar.digest, "phrases": len(grammar.phrases)}
+            for name, grammar in sorted(self._grammars.items())
+        }
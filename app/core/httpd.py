@@ -5,35 +5,360 @@ HTTP-сервер на FastAPI для STT с поддержкой GET и POST.
 from __future__ import annotations
 
 import asyncio
+import json
 import os
-from typing import Dict
+from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+import vosk
 
-from app.config.config import STT_DOC_ROOT, STT_VOSK_MODEL_PATH, STT_SOUND_DEVICE_INDEX
+from app.config.config import (
+    STT_AGC_ENABLED,
+    STT_AGC_MAX_GAIN_DB,
+    STT_AGC_TARGET_DBFS,
+    STT_AUDIO_HISTORY_SECONDS,
+    STT_AUDIO_OVERFLOW_POLICY,
+    STT_AUDIO_PREROLL_MS,
+    STT_AUDIO_SOURCES,
+    STT_AUDIO_QUEUE_SECONDS,
+    STT_BLOCKSIZE_MS,
+    STT_CAPTURE_CHANNELS,
+    STT_CAPTURE_DOWNMIX,
+    STT_CAPTURE_SAMPLERATE,
+    STT_DEBUG_ENABLED,
+    STT_DOC_ROOT,
+    STT_FEED_MAX_WAIT,
+    STT_FEED_SIZE,
+    STT_FORWARD_BATCH_SIZE,
+    STT_FORWARD_BATCH_WINDOW_MS,
+    STT_FORWARD_MEMORY_SIZE,
+    STT_FORWARD_SPOOL_MAX_MB,
+    STT_FORWARD_SPOOL_PATH,
+    STT_GRAMMAR_DEFAULT,
+    STT_GRAMMAR_PATH,
+    STT_HISTORY_BATCH_WINDOW_MS,
+    STT_HISTORY_ENABLED,
+    STT_HISTORY_PATH,
+    STT_MIN_CONFIDENCE,
+    STT_NOISE_GATE_ATTENUATION_DB,
+    STT_NOISE_GATE_ENABLED,
+    STT_NOISE_GATE_THRESHOLD,
+    STT_PROCESS_WORKERS,
+    STT_PROFILE_MAX_SECONDS,
+    STT_SAMPLE_VOICES_PATH,
+    STT_SPK_CACHE_PATH,
+    STT_SPK_ENABLED,
+    STT_SPK_MODEL_PATH,
+    STT_SPK_THRESHOLD,
+    STT_TIME_PARSER_ENABLED,
+    STT_TIME_PARSER_PATH,
+    STT_VOSK_MODEL_PATH,
+    STT_SOUND_SOURCES,
+    STT_TRANSCRIBE_CACHE_ITEMS,
+    STT_TRANSCRIBE_CACHE_MAX_MB,
+    STT_TRANSCRIBE_CACHE_PATH,
+    STT_TRANSCRIBE_WORKERS,
+    STT_URL_TO_TEXT_TRANSMIT,
+    STT_VAD_ENABLED,
+    STT_VAD_ENERGY_THRESHOLD,
+    STT_VAD_HANGOVER_MS,
+    STT_VAD_ZCR_THRESHOLD,
+    STT_WAKE_PREROLL_MS,
+    STT_WAKE_WINDOW_MS,
+    STT_WAKE_WORDS,
+    STT_WORDS_ENABLED,
+    STT_WS_QUEUE_SIZE,
+)
+from app.core.audio_history import PcmHistory
+from app.core.audio_source import AudioSource, SoundDeviceSource, create_source
+from app.core.forwarder import SpooledOutbox, TranscriptForwarder
+from app.core.grammar import GrammarRegistry
+from app.core.logger import logging_stats
+from app.core.metrics import LAG_BUCKETS, Histogram, format_histogram, format_metric
+from app.core.model_manager import ModelManager
+from app.core.preprocess import AudioPreprocessor, AutoGain
+from app.core.process_backend import ProcessBackend
+from app.core.profiler import format_collapsed, sample_stacks
+from app.core.recognizer_pool import RecognizerPool
+from app.core.speaker_id import SpeakerIdentifier
 from app.core.speech_to_text import Speech2Text
-from app.utils.stt_utils import is_listening_active, pop_all_messages
+from app.core.stream_session import StreamSession
+from app.core.stt_result import SttResult
+from app.core.time_parser import TimeParser
+from app.core.transcribe_cache import TranscribeCache, model_fingerprint
+from app.core.transcript_feed import TranscriptFeed
+from app.core.transcript_store import TranscriptStore
+from app.core.vad import EnergyVad, VoiceActivityDetector
+from app.core.wake_word import WakeWordGate
+from app.utils.audio_utils import MAX_SAMPLERATE, MIN_SAMPLERATE, decode_audio, encode_wav
+from app.utils.stt_utils import is_listening_active, pop_all_messages, set_event_loop, start_listening
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """
+    Запускает и останавливает фоновые задачи сервера: загрузку модели
+    (сервер отвечает сразу, `/health` сообщает `LOADING`) и пересылку фраз.
+    """
+    set_event_loop(asyncio.get_running_loop())
+    if stt_model is None and not model_manager.loading:
+        model_manager.load(STT_VOSK_MODEL_PATH, on_model_loaded)
+    if forwarder is not None:
+        await forwarder.start()
+    if transcript_store is not None:
+        await transcript_store.start()
+    try:
+        yield
+    finally:
+        if forwarder is not None:
+            await forwarder.stop()
+        if transcript_store is not None:
+            await transcript_store.stop()
+        if process_backend is not None:
+            process_backend.close()
 
 
-app = FastAPI(title="STT API Server")
+app = FastAPI(title="STT API Server", lifespan=lifespan)
 
 # Подключаем статические файлы
 print(f"STT_DOC_ROOT={STT_DOC_ROOT}")
 app.mount("/static", StaticFiles(directory=STT_DOC_ROOT), name="static")
 
-# Инициализация
-stt_engine = Speech2Text(
-    model_path=STT_VOSK_MODEL_PATH,
-    samplerate=16000,
-    sound_device_index=STT_SOUND_DEVICE_INDEX,
-)
+
+def create_vad() -> Optional[VoiceActivityDetector]:
+    """
+    Создаёт детектор речи по настройкам (у каждого источника свой).
+
+    :return: детектор или None, если VAD выключен
+    """
+    if not STT_VAD_ENABLED:
+        return None
+    return EnergyVad(
+        energy_threshold=STT_VAD_ENERGY_THRESHOLD,
+        zcr_threshold=STT_VAD_ZCR_THRESHOLD,
+        samplerate=16000,
+        hangover_ms=STT_VAD_HANGOVER_MS,
+    )
+
+
+def create_wake() -> Optional[WakeWordGate]:
+    """
+    Создаёт ожидание слова активации по настройкам (у каждого источника своё).
+
+    :return: ожидание слова активации или None, если слушать нужно всё
+    """
+    if not STT_WAKE_WORDS:
+        return None
+    return WakeWordGate(
+        STT_WAKE_WORDS,
+        samplerate=16000,
+        window_ms=STT_WAKE_WINDOW_MS,
+        preroll_ms=STT_WAKE_PREROLL_MS,
+    )
+
+
+def create_preprocessor(source: AudioSource, channel: int) -> Optional[AudioPreprocessor]:
+    """
+    Создаёт предобработку звука для источника по настройкам.
+
+    :param source: источник звука
+    :param channel: номер канала устройства
+    :return: конвейер предобработки или None, если источник отдаёт нужный формат
+    """
+    rate, channels = STT_CAPTURE_SAMPLERATE, STT_CAPTURE_CHANNELS
+    if source.fixed_format:
+        # Формат файла или сетевого потока не выбирается при открытии
+        rate, channels = source.native_format()
+    elif rate == "native" or channels == "native":
+        native_rate, native_channels = source.native_format()
+        rate = native_rate if rate == "native" else rate
+        channels = native_channels if channels == "native" else channels
+    channels = max(channels, channel + 1)
+    downmix = STT_CAPTURE_DOWNMIX and channels > 1
+
+    if rate == 16000 and channels == channel + 1 and not downmix and not (STT_AGC_ENABLED or STT_NOISE_GATE_ENABLED):
+        return None
+    return AudioPreprocessor(
+        input_rate=rate,
+        output_rate=16000,
+        channels=channels,
+        channel=None if downmix else channel,
+        block_frames=max(1, rate * STT_BLOCKSIZE_MS // 1000),
+        agc=AutoGain(STT_AGC_TARGET_DBFS, STT_AGC_MAX_GAIN_DB) if STT_AGC_ENABLED else None,
+        noise_gate=STT_NOISE_GATE_ENABLED,
+        noise_gate_threshold=STT_NOISE_GATE_THRESHOLD,
+        noise_gate_attenuation_db=STT_NOISE_GATE_ATTENUATION_DB,
+    )
+
+
+def create_engine(source: AudioSource, channel: int = 0) -> Speech2Text:
+    """
+    Создаёт движок распознавания для одного источника звука на общей модели.
+
+    :param source: источник звука (микрофон, файл, канал или сетевой поток)
+    :param channel: номер канала устройства
+    :return: движок распознавания
+    """
+    device = source.device if isinstance(source, SoundDeviceSource) else 0
+    return Speech2Text(
+        samplerate=16000,
+        sound_device_index=device,
+        vad=create_vad(),
+        blocksize_ms=STT_BLOCKSIZE_MS,
+        queue_seconds=STT_AUDIO_QUEUE_SECONDS,
+        overflow_policy=STT_AUDIO_OVERFLOW_POLICY,
+        model=stt_model,
+        channel=channel,
+        speaker_id=speaker_id,
+        grammars=grammars,
+        time_parser=time_parser,
+        backend=process_backend,
+        words=STT_WORDS_ENABLED,
+        min_confidence=STT_MIN_CONFIDENCE,
+        preprocessor=create_preprocessor(source, channel),
+        history=PcmHistory(STT_AUDIO_HISTORY_SECONDS, 16000, STT_AUDIO_PREROLL_MS / 1000)
+        if STT_AUDIO_HISTORY_SECONDS > 0 else None,
+        wake=create_wake(),
+        source_id=f"{device}:{channel}" if isinstance(source, SoundDeviceSource) else source.name,
+        input_stream=source,
+    )
+
+
+# Модель загружается в фоне после старта сервера (см. lifespan) и может быть заменена на ходу
+model_manager = ModelManager()
+stt_model: Optional[vosk.Model] = None
+speaker_id: Optional[SpeakerIdentifier] = None
+grammars: Optional[GrammarRegistry] = None
+recognizer_pool: Optional[RecognizerPool] = None
+process_backend: Optional[ProcessBackend] = None
+stt_engines: Dict[str, Speech2Text] = {}
+# Отпечаток текущей модели — часть ключа кэша распознавания файлов
+model_digest: Optional[str] = None
+
+# Разбор времени в тексте фраз: словарь индексируется один раз при старте
+time_parser = TimeParser(STT_TIME_PARSER_PATH) if STT_TIME_PARSER_ENABLED else None
+
+
+def on_model_loaded(model: vosk.Model, path: str) -> None:
+    """
+    Готовит сервис к новой модели (вызывается в потоке загрузки).
+
+    При первой загрузке создаёт движки и запускает прослушивание. При замене
+    движки получают заранее собранные распознаватели и переключаются на них
+    сами на границе фразы, а пул для файлов и реестр грамматик заменяются
+    целиком: запросы, начатые со старой моделью, с ней и завершаются.
+
+    :param model: загруженная модель Vosk
+    :param path: путь к модели
+    """
+    global stt_model, speaker_id, grammars, recognizer_pool, process_backend, model_digest
+
+    # Грамматики командного режима собираются заранее, чтобы переключение было мгновенным
+    new_grammars = GrammarRegistry(model, STT_GRAMMAR_PATH)
+    new_grammars.precompile(16000)
+
+    if STT_SPK_ENABLED:
+        if speaker_id is None:
+            speaker_id = SpeakerIdentifier(
+                model,
+                spk_model_path=STT_SPK_MODEL_PATH,
+                voices_path=STT_SAMPLE_VOICES_PATH,
+                cache_path=STT_SPK_CACHE_PATH,
+                threshold=STT_SPK_THRESHOLD,
+            )
+        else:
+            speaker_id.set_model(model)
+
+    # Рабочие процессы загружают модель сами; при замене переходят на неё на границе фразы
+    if STT_PROCESS_WORKERS > 0:
+        if process_backend is None:
+            process_backend = ProcessBackend(
+                path,
+                workers=STT_PROCESS_WORKERS,
+                spk_model_path=STT_SPK_MODEL_PATH if STT_SPK_ENABLED else None,
+                words=STT_WORDS_ENABLED,
+            )
+        else:
+            process_backend.load_model(path)
+
+    for engine in stt_engines.values():
+        engine.swap_model(model, new_grammars)
+
+    # Пул распознавателей для файлов и буферов (модель общая с движками)
+    # Отпечаток хранится в самом пуле: пул и ключ кэша его результатов меняются вместе
+    digest = model_fingerprint(path)
+    old_pool = recognizer_pool
+    recognizer_pool = RecognizerPool(model, size=STT_TRANSCRIBE_WORKERS, digest=digest)
+    grammars = new_grammars
+    stt_model = model
+    model_digest = digest
+    if old_pool is not None:
+        old_pool.close()
+
+    if not stt_engines:
+        sources = [(SoundDeviceSource(device), channel) for device, channel in STT_SOUND_SOURCES]
+        sources += [(create_source(spec), 0) for spec in STT_AUDIO_SOURCES]
+        for source, channel in sources:
+            engine = create_engine(source, channel)
+            if STT_GRAMMAR_DEFAULT:
+                engine.set_grammar(grammars.get(STT_GRAMMAR_DEFAULT))
+            stt_engines[engine.source_id] = engine
+        # Запускаем прослушивание (по потоку на каждый источник звука)
+        for engine in stt_engines.values():
+            start_listening(engine, message_queue, feed=transcript_feed)
+
+
+def require_model() -> None:
+    """
+    Проверяет, что модель загружена.
+
+    :raises HTTPException: 503, пока модель загружается
+    """
+    if stt_model is None:
+        raise HTTPException(status_code=503, detail=f"Модель распознавания не готова: {model_manager.state}")
+
 
 # Асинхронная очередь для хранения распознанных фраз
 message_queue = asyncio.Queue()
 
+# Лента фраз для подписчиков: чтение не удаляет сообщения
+transcript_feed = TranscriptFeed(maxlen=STT_FEED_SIZE)
+
+# Отставание подписчиков ленты на момент чтения (в фразах)
+feed_consumer_lag = Histogram(LAG_BUCKETS)
+
+# Пересылка фраз во внешний сервис пачками (если задан адрес)
+forwarder = TranscriptForwarder(
+    STT_URL_TO_TEXT_TRANSMIT,
+    transcript_feed,
+    batch_window=STT_FORWARD_BATCH_WINDOW_MS / 1000,
+    batch_size=STT_FORWARD_BATCH_SIZE,
+    outbox=SpooledOutbox(
+        memory_size=STT_FORWARD_MEMORY_SIZE,
+        spool_path=STT_FORWARD_SPOOL_PATH,
+        spool_max_bytes=STT_FORWARD_SPOOL_MAX_MB * 1024 * 1024,
+    ),
+) if STT_URL_TO_TEXT_TRANSMIT else None
+
+# Журнал фраз на диске: пишется пачками из ленты, переживает перезапуск
+transcript_store = TranscriptStore(
+    STT_HISTORY_PATH,
+    transcript_feed,
+    batch_window=STT_HISTORY_BATCH_WINDOW_MS / 1000,
+) if STT_HISTORY_ENABLED else None
+
+# Кэш распознавания файлов: повторно присланный звук не декодируется заново
+transcribe_cache = TranscribeCache(
+    memory_items=STT_TRANSCRIBE_CACHE_ITEMS,
+    disk_path=STT_TRANSCRIBE_CACHE_PATH,
+    disk_max_bytes=STT_TRANSCRIBE_CACHE_MAX_MB * 1024 * 1024,
+) if STT_TRANSCRIBE_CACHE_ITEMS > 0 else None
+
 # Глобальная переменная для хранения последнего распознанного текста
 latest_transcript = ""
 
@@ -43,6 +368,22 @@ class TextRequest(BaseModel):
     text: str
 
 
+# Переключение командного режима (None — полный словарь)
+class GrammarRequest(BaseModel):
+    grammar: Optional[str] = None
+
+
+# Заглушение источников (None — до явного возобновления; без source — все источники)
+class MuteRequest(BaseModel):
+    seconds: Optional[float] = None
+    source: Optional[str] = None
+
+
+# Загрузка другой модели Vosk
+class ModelRequest(BaseModel):
+    path: str
+
+
 @app.get("/")
 async def read_root():
     """
@@ -59,12 +400,195 @@ async def read_root():
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """
-    Проверка работоспособности сервиса.
+    Проверка работоспособности сервиса. Пока модель загружается после
+    старта, сервис отвечает `LOADING`.
 
-    :return: статус сервиса
+    :return: статус сервиса и состояние модели
     """
-    status = "OK" if stt_engine.healthcheck() == "OK" and is_listening_active() else "NOT OK"
-    return {"server_status": "ok", "service": status}
+    if stt_model is None:
+        status = "LOADING" if model_manager.loading else "NOT OK"
+    else:
+        engines_ok = all(engine.healthcheck() == "OK" for engine in stt_engines.values())
+        status = "OK" if engines_ok and is_listening_active() else "NOT OK"
+    return {"server_status": "ok", "service": status, "model": model_manager.state}
+
+
+@app.get("/api/stt/stats")
+async def get_stats() -> Dict[str, Any]:
+    """
+    Возвращает счётчики работы движков распознавания (в том числе VAD)
+    по каждому источнику звука и счётчики пересылки фраз.
+
+    :return: статистика движков
+    """
+    stats: Dict[str, Any] = {
+        "model": model_manager.stats(),
+        "sources": {source: engine.stats() for source, engine in stt_engines.items()},
+    }
+    if forwarder is not None:
+        stats["forwarder"] = forwarder.stats()
+    if transcript_store is not None:
+        stats["history"] = transcript_store.stats()
+    if process_backend is not None:
+        stats["process_backend"] = process_backend.stats()
+    if transcribe_cache is not None:
+        stats["transcribe_cache"] = transcribe_cache.stats()
+    stats["logging"] = logging_stats()
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Метрики в формате Prometheus: счётчики аудиоблоков, глубина очередей,
+    длительность AcceptWaveform, задержка распознавания и отставание подписчиков.
+
+    :return: текст в формате Prometheus
+    """
+    engines = list(stt_engines.items())
+    queues = [({"source": source}, engine.stats()["audio_queue"]) for source, engine in engines]
+
+    parts = [
+        format_metric(
+            "stt_audio_blocks_received_total", "counter", "Аудиоблоки, полученные от устройства",
+            [(labels, queue["blocks_in"]) for labels, queue in queues],
+        ),
+        format_metric(
+            "stt_audio_blocks_dropped_total", "counter", "Аудиоблоки, отброшенные при переполнении очереди",
+            [(labels, queue["overruns"]) for labels, queue in queues],
+        ),
+        format_metric(
+            "stt_audio_input_overflows_total", "counter", "Переполнения входного буфера PortAudio",
+            [(labels, queue["input_overflows"]) for labels, queue in queues],
+        ),
+        format_metric(
+            "stt_audio_queue_depth", "gauge", "Аудиоблоки, ожидающие распознавателя",
+            [(labels, queue["depth"]) for labels, queue in queues],
+        ),
+        format_histogram(
+            "stt_accept_waveform_seconds", "Длительность вызова AcceptWaveform",
+            [({"source": source}, engine.accept_seconds) for source, engine in engines],
+        ),
+        format_histogram(
+            "stt_preprocess_stage_seconds", "Длительность этапов предобработки звука",
+            [
+                ({"source": source, "stage": stage}, histogram)
+                for source, engine in engines if engine.preprocessor is not None
+                for stage, histogram in engine.preprocessor.stage_seconds.items()
+                if histogram.count
+            ],
+        ),
+        format_histogram(
+            "stt_audio_to_text_latency_seconds", "Время от поступления блока, завершившего фразу, до выдачи текста",
+            [({"source": source}, engine.latency_seconds) for source, engine in engines],
+        ),
+        format_histogram(
+            "stt_stage_seconds", "Длительность этапов обработки фразы",
+            [
+                ({"source": source, "stage": stage}, histogram)
+                for source, engine in engines
+                for stage, histogram in engine.stage_seconds.items()
+                if histogram.count
+            ],
+        ),
+        format_metric(
+            "stt_phrases_total", "counter", "Распознанные фразы",
+            [({"source": source}, engine.phrases_total) for source, engine in engines],
+        ),
+        format_metric(
+            "stt_phrases_low_confidence_total", "counter", "Фразы, отброшенные из-за низкой уверенности",
+            [({"source": source}, engine.low_confidence_total) for source, engine in engines],
+        ),
+        format_metric(
+            "stt_recognizer_restarts_total", "counter", "Перезапуски захвата после ошибки",
+            [({"source": source}, engine.restarts_total) for source, engine in engines],
+        ),
+        format_metric(
+            "stt_message_queue_depth", "gauge", "Фразы, не забранные через /api/stt/latest",
+            [({}, message_queue.qsize())],
+        ),
+        format_histogram(
+            "stt_feed_consumer_lag_phrases", "Отставание подписчиков ленты на момент чтения",
+            [({}, feed_consumer_lag)],
+        ),
+        format_metric(
+            "stt_listening_active", "gauge", "Идёт ли прослушивание",
+            [({}, int(is_listening_active()))],
+        ),
+        format_metric(
+            "stt_model_ready", "gauge", "Загружена ли модель распознавания",
+            [({}, int(stt_model is not None))],
+        ),
+        format_metric(
+            "stt_model_loads_total", "counter", "Успешные загрузки модели (включая горячие замены)",
+            [({}, model_manager.loads)],
+        ),
+    ]
+    if forwarder is not None:
+        forward = forwarder.stats()
+        parts += [
+            format_metric(
+                "stt_forward_pending", "gauge", "Фразы, ожидающие пересылки",
+                [({}, forward["pending"])],
+            ),
+            format_metric(
+                "stt_forward_delivered_total", "counter", "Фразы, доставленные во внешний сервис",
+                [({}, forward["delivered"])],
+            ),
+            format_metric(
+                "stt_forward_failed_attempts_total", "counter", "Неудачные попытки пересылки пачки",
+                [({}, forward["failed_attempts"])],
+            ),
+            format_metric(
+                "stt_forward_dropped_total", "counter", "Фразы, потерянные при переполнении очереди пересылки",
+                [({}, forward["dropped"])],
+            ),
+        ]
+    if process_backend is not None:
+        backend = process_backend.stats()
+        parts += [
+            format_metric(
+                "stt_process_workers_alive", "gauge", "Живые рабочие процессы распознавания",
+                [({}, backend["alive"])],
+            ),
+            format_metric(
+                "stt_process_worker_restarts_total", "counter", "Перезапуски упавших рабочих процессов",
+                [({}, backend["restarts"])],
+            ),
+            format_metric(
+                "stt_process_jobs_pending", "gauge", "Файлы, ожидающие распознавания в рабочих процессах",
+                [({}, backend["jobs_pending"])],
+            ),
+        ]
+    logs = logging_stats()
+    parts += [
+        format_metric(
+            "stt_log_queue_depth", "gauge", "Записи лога, ожидающие потока вывода",
+            [({}, logs["queue_depth"])],
+        ),
+        format_metric(
+            "stt_log_records_dropped_total", "counter", "Записи лога, отброшенные при переполнении очереди",
+            [({}, logs["dropped"])],
+        ),
+        format_metric(
+            "stt_log_records_sampled_out_total", "counter", "Предупреждения, отброшенные прореживанием",
+            [({"logger": name}, count) for name, count in logs["sampled_out"].items()],
+        ),
+    ]
+    if transcribe_cache is not None:
+        cache = transcribe_cache.stats()
+        parts += [
+            format_metric(
+                "stt_transcribe_cache_hits_total", "counter", "Файлы, распознанные из кэша",
+                [({"tier": "memory"}, cache["memory_hits"]), ({"tier": "disk"}, cache["disk_hits"]),
+                 ({"tier": "inflight"}, cache["coalesced"])],
+            ),
+            format_metric(
+                "stt_transcribe_cache_misses_total", "counter", "Файлы, которых не было в кэше",
+                [({}, cache["misses"])],
+            ),
+        ]
+    return PlainTextResponse("\n".join(parts) + "\n", media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/stt/latest")
@@ -90,8 +614,472 @@ async def post_text(request: TextRequest) -> Dict[str, str]:
     global latest_transcript
     text = request.text.strip()
 
+    result = SttResult(text)
+    if time_parser is not None:
+        result.time, result.duration = time_parser.parse(text)
+    fields = result.to_dict()
+    fields.pop("text")
+
     # Добавляем в очередь
     await message_queue.put(text)
+    transcript_feed.publish(text, **fields)
     latest_transcript = text
 
-    return {"status": "received", "text": text}
\ No newline at end of file
+    return {"status": "received", "text": text}
+
+
+@app.get("/api/stt/feed")
+async def get_feed(cursor: int = 0, timeout: float = 0, limit: int = 100) -> Dict[str, Any]:
+    """
+    Долгий опрос ленты фраз. Ничего не удаляет: каждый клиент передаёт
+    свой курсор — номер последней полученной фразы (`seq`).
+
+    :param cursor: номер последней полученной фразы (0 — с начала буфера)
+    :param timeout: сколько секунд ждать новых фраз, если их пока нет
+    :param limit: максимальное число фраз в ответе
+    :return: JSON с фразами, новым курсором и числом потерянных фраз
+    """
+    timeout = min(max(timeout, 0), STT_FEED_MAX_WAIT)
+    feed_consumer_lag.observe(max(0, transcript_feed.last_seq - cursor))
+    items = await transcript_feed.wait(cursor, timeout, limit)
+    return {
+        "items": items,
+        "cursor": items[-1]["seq"] if items else max(cursor, 0),
+        "missed": transcript_feed.missed(cursor),
+    }
+
+
+@app.get("/api/stt/events")
+async def stream_events(
+    cursor: Optional[int] = None,
+    last_event_id: Optional[int] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Лента фраз в формате Server-Sent Events. Без курсора отдаёт только новые
+    фразы; при переподключении браузер сам передаёт `Last-Event-ID`.
+
+    :param cursor: номер фразы, после которой начать
+    :param last_event_id: заголовок Last-Event-ID
+    :return: поток событий `transcript`
+    """
+    if last_event_id is not None:
+        cursor = last_event_id
+    elif cursor is None:
+        cursor = transcript_feed.last_seq
+
+    async def events(position: int) -> AsyncGenerator[str, None]:
+        while True:
+            items = await transcript_feed.wait(position, STT_FEED_MAX_WAIT)
+            feed_consumer_lag.observe(max(0, transcript_feed.last_seq - position))
+            if not items:
+                # Комментарий-пульс не даёт прокси закрыть соединение
+                yield ": keep-alive\n\n"
+                continue
+            for item in items:
+                position = item["seq"]
+                data = json.dumps(item, ensure_ascii=False)
+                yield f"id: {position}\nevent: transcript\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    Разбирает момент времени из параметра запроса.
+
+    :param value: unix-время в секундах или дата в формате ISO 8601
+    :return: unix-время или None, если параметр не задан
+    :raises HTTPException: 400, если значение не распознано
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Неверный формат времени: {value}")
+
+
+@app.get("/api/stt/history")
+async def get_history(
+    start: Optional[str] = Query(default=None, alias="from"),
+    end: Optional[str] = Query(default=None, alias="to"),
+    q: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """
+    Поиск по журналу фраз: за интервал времени и/или по словам.
+    Фразы попадают в журнал с задержкой до STT_HISTORY_BATCH_WINDOW_MS.
+
+    :param start: начало интервала (unix-время или ISO 8601)
+    :param end: конец интервала (unix-время или ISO 8601)
+    :param q: слова, которые должны встретиться во фразе
+    :param source: идентификатор источника звука
+    :param limit: максимальное число фраз в ответе
+    :return: JSON с фразами от новых к старым
+    """
+    if transcript_store is None:
+        raise HTTPException(status_code=404, detail="Журнал фраз выключен (STT_HISTORY_ENABLED)")
+    items = await transcript_store.query_async(
+        start=parse_time(start),
+        end=parse_time(end),
+        text=q,
+        source=source,
+        limit=min(max(limit, 0), 1000),
+    )
+    return {"items": items}
+
+
+@app.get("/api/stt/sources/{source}/audio")
+async def get_source_audio(source: str, start: int, end: int) -> Response:
+    """
+    Звук источника из истории в памяти между номерами сэмплов
+    (поля `audio_start` и `audio_end` фразы).
+
+    :param source: идентификатор источника звука
+    :param start: номер первого сэмпла
+    :param end: номер сэмпла после последнего
+    :return: WAV-файл (16 бит, моно, частота распознавателя)
+    """
+    engine = stt_engines.get(source)
+    if engine is None:
+        raise HTTPException(status_code=404, detail=f"Неизвестный источник: {source}")
+    if engine.history is None:
+        raise HTTPException(status_code=404, detail="История звука выключена (STT_AUDIO_HISTORY_SECONDS)")
+    samples = engine.phrase_audio(start, end)
+    if samples is None:
+        raise HTTPException(status_code=410, detail="Звук уже вытеснен из истории или ещё не записан")
+    return Response(encode_wav(samples.tobytes(), engine.samplerate), media_type="audio/wav")
+
+
+@app.get("/api/stt/feed/{seq}/audio")
+async def get_phrase_audio(seq: int) -> Response:
+    """
+    Звук фразы из ленты по её номеру.
+
+    :param seq: номер фразы в ленте
+    :return: WAV-файл со звуком фразы
+    """
+    items = transcript_feed.since(seq - 1, 1)
+    if not items or items[0]["seq"] != seq:
+        raise HTTPException(status_code=404, detail=f"Фраза {seq} вытеснена из ленты или ещё не появилась")
+    item = items[0]
+    if item.get("audio_start") is None or item.get("source") not in stt_engines:
+        raise HTTPException(status_code=404, detail=f"Для фразы {seq} нет звука")
+    return await get_source_audio(item["source"], item["audio_start"], item["audio_end"])
+
+
+@app.get("/api/stt/speakers")
+async def get_speakers() -> Dict[str, Any]:
+    """
+    Возвращает имена говорящих, для которых загружены образцы голосов.
+
+    :return: JSON со списком имён
+    """
+    if not STT_SPK_ENABLED:
+        raise HTTPException(status_code=404, detail="Опознавание говорящих выключено (STT_SPK_ENABLED)")
+    require_model()
+    return {"speakers": speaker_id.speakers}
+
+
+@app.post("/api/stt/speakers/{label}")
+async def enroll_speaker(label: str, request: Request) -> Dict[str, Any]:
+    """
+    Добавляет образец голоса говорящего. Тело запроса — WAV-файл (16 бит, моно).
+
+    :param label: имя говорящего
+    :param request: запрос с WAV-файлом в теле
+    :return: подтверждение и список говорящих
+    """
+    if not STT_SPK_ENABLED:
+        raise HTTPException(status_code=404, detail="Опознавание говорящих выключено (STT_SPK_ENABLED)")
+    require_model()
+
+    data = await request.body()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, speaker_id.enroll, label, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "enrolled", "speakers": speaker_id.speakers}
+
+
+@app.get("/api/stt/grammars")
+async def get_grammars() -> Dict[str, Any]:
+    """
+    Возвращает загруженные грамматики командного режима и режим каждого источника.
+
+    :return: JSON с грамматиками (хэш и число фраз) и грамматикой по источникам
+    """
+    return {
+        "grammars": grammars.stats() if grammars is not None else {},
+        "sources": {
+            source: engine.grammar.name if engine.grammar is not None else None
+            for source, engine in stt_engines.items()
+        },
+    }
+
+
+@app.post("/api/stt/grammars/reload")
+async def reload_grammars() -> Dict[str, Any]:
+    """
+    Перечитывает файл грамматик. Источники в командном режиме остаются
+    на прежних грамматиках до следующего переключения.
+
+    :return: JSON с загруженными грамматиками
+    """
+    require_model()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, grammars.reload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"grammars": grammars.stats()}
+
+
+@app.post("/api/stt/sources/{source}/grammar")
+async def set_source_grammar(source: str, request: GrammarRequest) -> Dict[str, Any]:
+    """
+    Переключает источник звука в командный режим или обратно на полный словарь.
+
+    :param source: идентификатор источника ("устройство:канал")
+    :param request: объект с полем `grammar` (имя грамматики или null)
+    :return: подтверждение с новым режимом
+    """
+    require_model()
+    engine = stt_engines.get(source)
+    if engine is None:
+        raise HTTPException(status_code=404, detail=f"Неизвестный источник: {source}")
+    try:
+        grammar = grammars.get(request.grammar) if request.grammar else None
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Неизвестная грамматика: {request.grammar}")
+    engine.set_grammar(grammar)
+    return {"source": source, "grammar": request.grammar}
+
+
+def select_engines(source: Optional[str]) -> Dict[str, Speech2Text]:
+    """
+    Выбирает движки по идентификатору источника.
+
+    :param source: идентификатор источника или None для всех источников
+    :return: словарь источник → движок
+    :raises HTTPException: 404, если источник неизвестен
+    """
+    require_model()
+    if source is None:
+        return dict(stt_engines)
+    engine = stt_engines.get(source)
+    if engine is None:
+        raise HTTPException(status_code=404, detail=f"Неизвестный источник: {source}")
+    return {source: engine}
+
+
+@app.post("/api/stt/mute")
+async def mute(request: MuteRequest) -> Dict[str, Any]:
+    """
+    Заглушает источники, не закрывая входные потоки: например, на время,
+    пока говорит синтезатор речи. Возобновление занимает миллисекунды.
+
+    :param request: объект с полями `seconds` (через сколько секунд возобновить,
+                    null — до /api/stt/unmute) и `source` (null — все источники)
+    :return: заглушённые источники
+    """
+    if request.seconds is not None and request.seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds должно быть больше нуля")
+    engines = select_engines(request.source)
+    for engine in engines.values():
+        engine.pause(request.seconds)
+    return {"muted": list(engines), "seconds": request.seconds}
+
+
+@app.post("/api/stt/unmute")
+async def unmute(source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Возобновляет прослушивание заглушённых источников.
+
+    :param source: идентификатор источника (без него — все источники)
+    :return: возобновлённые источники
+    """
+    engines = select_engines(source)
+    for engine in engines.values():
+        engine.continue_listen()
+    return {"unmuted": list(engines)}
+
+
+@app.post("/api/stt/transcribe")
+async def transcribe(request: Request, samplerate: int = 16000) -> Dict[str, Any]:
+    """
+    Распознаёт загруженный WAV-файл или сырой PCM (int16, mono).
+    Тело запроса передаётся как есть (application/octet-stream или audio/wav).
+
+    :param request: запрос с аудиоданными в теле
+    :param samplerate: частота дискретизации для сырого PCM
+    :return: JSON с полным текстом, списком фраз и длительностью аудио
+    """
+    require_model()
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Пустое тело запроса")
+
+    try:
+        pcm, rate = decode_audio(data, samplerate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    backend = process_backend
+    generation = backend.model_generation if backend is not None else 0
+    digest = model_digest if backend is not None else recognizer_pool.digest
+    # Отпечаток модели пула, которым файл распознан на самом деле
+    decoded_by: Dict[str, Optional[str]] = {}
+
+    async def decode() -> Dict[str, Any]:
+        if backend is not None:
+            return await backend.transcribe_async(pcm, rate)
+        # Пул берётся в момент распознавания: пул, прочитанный до ожиданий выше,
+        # мог быть закрыт заменой модели
+        pool = recognizer_pool
+        decoded_by["digest"] = pool.digest
+        return await pool.transcribe_async(pcm, rate)
+
+    def same_model() -> bool:
+        # Модель сменилась, пока файл ждал распознавания, — результат не запоминаем
+        if backend is not None:
+            return backend.model_generation == generation
+        return decoded_by.get("digest") == digest
+
+    # Пока рабочие процессы переходят на новую модель, неизвестно, какая из моделей распознает файл
+    if transcribe_cache is None or (backend is not None and backend.swapping):
+        return await decode()
+    # Хэш большого файла считается в потоке, чтобы не задерживать цикл событий
+    key = await asyncio.get_running_loop().run_in_executor(None, transcribe_cache.key, pcm, rate, digest)
+    return await transcribe_cache.get_or_compute(key, decode, same_model)
+
+
+# Одновременно работает только один профилировщик
+profile_lock = asyncio.Lock()
+
+
+def require_debug() -> None:
+    """
+    Проверяет, что диагностические эндпоинты включены.
+
+    :raises HTTPException: 404, если STT_DEBUG_ENABLED выключен
+    """
+    if not STT_DEBUG_ENABLED:
+        raise HTTPException(status_code=404, detail="Диагностика выключена (STT_DEBUG_ENABLED)")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(seconds: float = 5.0, hz: float = 100.0) -> PlainTextResponse:
+    """
+    Снимает стеки всех потоков (захват, прослушивание, цикл событий, пулы)
+    в течение `seconds` секунд без остановки распознавания.
+
+    :param seconds: длительность профилирования
+    :param hz: частота выборки
+    :return: свёрнутые стеки (`поток;функция;... число`) для flamegraph.pl или speedscope
+    """
+    require_debug()
+    if not 0 < seconds <= STT_PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds должно быть от 0 до {STT_PROFILE_MAX_SECONDS:g}")
+    if not 1 <= hz <= 1000:
+        raise HTTPException(status_code=400, detail="hz должно быть от 1 до 1000")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="Профилирование уже идёт")
+    async with profile_lock:
+        # Выборка идёт в отдельном потоке, цикл событий тоже попадает в профиль
+        stacks, samples = await asyncio.get_running_loop().run_in_executor(None, sample_stacks, seconds, 1 / hz)
+    return PlainTextResponse(format_collapsed(stacks), headers={"X-Profile-Samples": str(samples)})
+
+
+@app.get("/debug/stages")
+async def debug_stages() -> Dict[str, Any]:
+    """
+    Разбивка задержки распознавания по этапам для каждого источника:
+    средние по гистограммам этапов и значения для последней фразы.
+
+    :return: JSON с этапами по источникам
+    """
+    require_debug()
+    return {
+        source: {
+            "stages": {
+                stage: {"count": histogram.count, "mean": histogram.sum / histogram.count if histogram.count else None}
+                for stage, histogram in {
+                    **engine.stage_seconds, "accept": engine.accept_seconds, "total": engine.latency_seconds,
+                }.items()
+            },
+            "last_phrase": engine.last_phrase_timings,
+        }
+        for source, engine in stt_engines.items()
+    }
+
+
+@app.get("/api/admin/model")
+async def get_model() -> Dict[str, Any]:
+    """
+    Возвращает состояние модели распознавания: путь, загрузка, время загрузки.
+
+    :return: JSON с состоянием модели
+    """
+    return model_manager.stats()
+
+
+@app.post("/api/admin/model", status_code=202)
+async def load_model(request: ModelRequest) -> Dict[str, Any]:
+    """
+    Загружает другую модель Vosk в фоне и заменяет ею текущую без перезапуска.
+    Движки переключаются на границе фразы, аудио во время замены не теряется.
+    Ход загрузки — `GET /api/admin/model`.
+
+    :param request: объект с полем `path` (путь к модели)
+    :return: подтверждение начала загрузки
+    """
+    try:
+        started = model_manager.load(request.path, on_model_loaded)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=409, detail="Модель уже загружается")
+    return {"status": "loading", "path": request.path}
+
+
+@app.websocket("/api/stt/stream")
+async def stream_recognition(
+    websocket: WebSocket,
+    samplerate: int = 16000,
+    grammar: Optional[str] = None,
+) -> None:
+    """
+    Потоковое распознавание: принимает бинарные кадры PCM (int16, mono)
+    и отправляет промежуточные и итоговые результаты в формате Vosk.
+
+    :param websocket: WebSocket-соединение
+    :param samplerate: частота дискретизации входящего аудио
+    :param grammar: имя грамматики для командного режима (по умолчанию — полный словарь)
+    """
+    if stt_model is None:
+        await websocket.close(code=1013, reason="model is loading")
+        return
+    if not MIN_SAMPLERATE <= samplerate <= MAX_SAMPLERATE:
+        await websocket.close(code=1008, reason="unsupported samplerate")
+        return
+    if grammar and grammar not in grammars.names:
+        await websocket.close(code=1008, reason="unknown grammar")
+        return
+    await websocket.accept()
+    session = StreamSession(
+        stt_model,
+        samplerate,
+        queue_size=STT_WS_QUEUE_SIZE,
+        grammars=grammars,
+        grammar=grammars.get(grammar) if grammar else None,
+    )
+    await session.run(websocket)
\ No newline at end of file
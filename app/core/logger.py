@@ -1,12 +1,23 @@
 """
 Модуль настройки логгера приложения.
+
+Потоки захвата и распознавания не пишут в файл и консоль сами: записи
+кладутся в ограниченную очередь, а выводит их отдельный поток
+(`QueueListener`). Медленный диск, ротация файла или заблокированный
+stdout не задерживают распознавание; если очередь переполнена, запись
+отбрасывается и учитывается в счётчике.
 """
 
+import atexit
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict
 
-from app.config.config import STT_LOGS_DIR
+from app.config.config import STT_LOG_FORMAT, STT_LOG_QUEUE_SIZE, STT_LOG_SAMPLING, STT_LOGS_DIR
 
 
 # Определяем путь к каталогу логов
@@ -14,29 +25,118 @@ LOGS_DIR = STT_LOGS_DIR or os.path.join(os.path.dirname(os.path.dirname(__file__
 os.makedirs(LOGS_DIR, exist_ok=True)
 LOG_FILE_PATH = os.path.join(LOGS_DIR, "stt.log")
 
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну строку JSON (для сборщиков логов)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Кладёт записи в ограниченную очередь, не блокируя вызывающий поток.
+
+    Сообщение форматируется уже в потоке вывода: в горячем потоке остаётся
+    только постановка записи в очередь. Поэтому аргументы записи не должны меняться после
+    вызова логгера (в приложении это строки, числа и флаги статуса потока).
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает одну из `every` записей уровня WARNING с каждого места
+    вызова (файл и строка), чтобы частые предупреждения (переполнение
+    входного буфера и т.п.) не забивали лог. Прошедшая фильтр запись получает
+    поле `suppressed` — сколько записей с того же места отброшено до неё.
+    Ошибки и информационные сообщения (распознанный текст) проходят всегда.
+    """
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self._every = max(1, every)
+        self._counters: Dict[Any, "itertools.count[int]"] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        counter = self._counters.get(site)
+        if counter is None:
+            counter = self._counters[site] = itertools.count()
+        seen = next(counter)
+        if seen % self._every:
+            self.suppressed += 1
+            return False
+        record.suppressed = self._every - 1 if seen else 0
+        return True
+
+
 # Создаём форматтер
-formatter = logging.Formatter(
-    fmt="%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+if STT_LOG_FORMAT == "json":
+    formatter: logging.Formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S")
+else:
+    formatter = logging.Formatter(
+        fmt="%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
 
 # Создаём ротационный хендлер (до 5 файлов по 10 МБ)
 handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=10 * 1024 * 1024, backupCount=5)
 handler.setFormatter(formatter)
 
-# Настраиваем корневой логгер
-logger = logging.getLogger("stt_logger")
-logger.setLevel(logging.INFO)
-logger.addHandler(handler)
-
 # Добавляем вывод в консоль
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+
+# Оба вывода работают в потоке QueueListener, логгер только ставит записи в очередь
+queue_handler = DroppingQueueHandler(queue.Queue(maxsize=STT_LOG_QUEUE_SIZE))
+listener = QueueListener(queue_handler.queue, handler, console_handler, respect_handler_level=True)
+listener.start()
+# При выходе дописываем накопленные записи
+atexit.register(listener.stop)
+
+# Настраиваем корневой логгер
+logger = logging.getLogger("stt_logger")
+logger.setLevel(logging.INFO)
+logger.addHandler(queue_handler)
 
 # Отключаем передачу логов выше (избегаем дублирования)
 logger.propagate = False
 
+# Прореживание по логгерам: имя логгера (без префикса stt_logger.) → фильтр
+_sampling: Dict[str, SamplingFilter] = {
+    name: SamplingFilter(every) for name, every in STT_LOG_SAMPLING.items()
+}
+
 
 def get_logger(name: str) -> logging.Logger:
     """
@@ -45,4 +145,22 @@ def get_logger(name: str) -> logging.Logger:
     :param name: имя модуля или компонента
     :return: экземпляр логгера
     """
-    return logger.getChild(name)
\ No newline at end of file
+    child = logger.getChild(name)
+    sampling = _sampling.get(name)
+    if sampling is not None and sampling not in child.filters:
+        child.addFilter(sampling)
+    return child
+
+
+def logging_stats() -> Dict[str, Any]:
+    """
+    Возвращает состояние очереди логов и счётчики отброшенных записей.
+
+    :return: словарь со счётчиками
+    """
+    return {
+        "queue_depth": queue_handler.queue.qsize(),
+        "queue_size": STT_LOG_QUEUE_SIZE,
+        "dropped": queue_handler.dropped,
+        "sampled_out": {name: sampling.suppressed for name, sampling in _sampling.items()},
+    }
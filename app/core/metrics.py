@@ -0,0 +1,118 @@
+"""
+Лёгкие метрики в формате Prometheus (text exposition 0.0.4).
+
+Счётчики горячего пути — обычные поля объектов, а гистограммы делают
+один бинарный поиск и два сложения на наблюдение, поэтому их можно
+держать включёнными в потоке захвата. Текст собирается только при
+запросе `/metrics`.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+# Границы корзин по умолчанию (секунды)
+ACCEPT_WAVEFORM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Этапы обработки фразы: от коллбэка захвата до выдачи в цикл событий
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Отставание подписчиков ленты (в фразах)
+LAG_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+Labels = Dict[str, str]
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин.
+    """
+
+    __slots__ = ("_bounds", "_counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        """
+        Инициализация гистограммы.
+
+        :param buckets: верхние границы корзин по возрастанию
+        """
+        self._bounds = tuple(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Учитывает одно наблюдение.
+
+        :param value: наблюдаемое значение
+        """
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Возвращает накопленные счётчики корзин, включая +Inf.
+
+        :return: список пар (граница, число наблюдений не больше неё)
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def format_metric(
+    name: str,
+    kind: str,
+    documentation: str,
+    samples: Iterable[Tuple[Labels, float]],
+) -> str:
+    """
+    Форматирует счётчик или gauge.
+
+    :param name: имя метрики
+    :param kind: тип ("counter" или "gauge")
+    :param documentation: описание метрики
+    :param samples: пары (метки, значение)
+    :return: текст метрики
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    return "\n".join(lines)
+
+
+def format_histogram(
+    name: str,
+    documentation: str,
+    samples: Iterable[Tuple[Labels, Histogram]],
+) -> str:
+    """
+    Форматирует гистограмму.
+
+    :param name: имя метрики
+    :param documentation: описание метрики
+    :param samples: пары (метки, гистограмма)
+    :return: текст метрики
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} histogram"]
+    for labels, histogram in samples:
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return "\n".join(lines)
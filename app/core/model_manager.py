@@ -0,0 +1,125 @@
+"""
+Фоновая загрузка и горячая замена модели Vosk.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import vosk
+
+from app.core.logger import get_logger
+
+
+# Состояния загрузки
+IDLE = "idle"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelManager:
+    """
+    Загружает модель Vosk в отдельном потоке, не блокируя HTTP-сервер.
+
+    После загрузки вызывается `on_loaded(model, path)` — в том же фоновом
+    потоке, чтобы подготовка распознавателей для новой модели тоже не
+    занимала ни цикл событий, ни потоки прослушивания. Текущей модель
+    становится только после успешного `on_loaded`; если загрузка новой
+    модели не удалась, продолжает работать прежняя.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(self) -> None:
+        """Инициализация без модели: загрузка запускается методом `load`."""
+        self._lock = threading.Lock()
+        self._model: Optional[vosk.Model] = None
+        self._path: Optional[str] = None
+        self._loading_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.loads = 0
+
+    @property
+    def model(self) -> Optional[vosk.Model]:
+        """Текущая модель (None, пока первая загрузка не завершилась)."""
+        return self._model
+
+    @property
+    def loading(self) -> bool:
+        """Идёт ли загрузка модели."""
+        return self._loading_path is not None
+
+    @property
+    def state(self) -> str:
+        """Состояние: idle, loading, ready или failed."""
+        if self._loading_path is not None:
+            return LOADING
+        if self._model is not None:
+            return READY
+        return FAILED if self.error else IDLE
+
+    def load(self, path: str, on_loaded: Callable[[vosk.Model, str], None]) -> bool:
+        """
+        Запускает загрузку модели в фоновом потоке.
+
+        :param path: путь к модели Vosk
+        :param on_loaded: подготовка сервиса к новой модели (вызывается в фоновом потоке)
+        :return: False, если другая загрузка ещё не завершилась
+        :raises FileNotFoundError: если модели нет по указанному пути
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Модель не найдена по пути: {path}")
+        with self._lock:
+            if self._loading_path is not None:
+                return False
+            self._loading_path = path
+
+        threading.Thread(
+            target=self._run,
+            args=(path, on_loaded),
+            name="stt-model-loader",
+            daemon=True,
+        ).start()
+        return True
+
+    def _run(self, path: str, on_loaded: Callable[[vosk.Model, str], None]) -> None:
+        self._log.info("Загрузка модели: %s", path)
+        started = time.perf_counter()
+        try:
+            model = vosk.Model(path)
+            on_loaded(model, path)
+        except Exception as e:
+            self._log.exception("Не удалось загрузить модель %s: %s", path, e)
+            self.error = str(e)
+        else:
+            self._model = model
+            self._path = path
+            self.error = None
+            self.load_seconds = time.perf_counter() - started
+            self.loaded_at = time.time()
+            self.loads += 1
+            self._log.info("Модель загружена за %.1f с: %s", self.load_seconds, path)
+        finally:
+            self._loading_path = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние загрузки.
+
+        :return: словарь с путём к текущей модели, состоянием и временем загрузки
+        """
+        return {
+            "state": self.state,
+            "path": self._path,
+            "loading_path": self._loading_path,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "loaded_at": self.loaded_at,
+            "loads": self.loads,
+            "error": self.error,
+        }
@@ -0,0 +1,393 @@
+"""
+Предобработка звука перед распознавателем: сведение каналов, передискретизация,
+автоматическая регулировка усиления и спектральное шумоподавление.
+"""
+
+from __future__ import annotations
+
+from math import gcd
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.core.metrics import Histogram
+
+
+# Границы корзин длительности этапов предобработки (секунды)
+PREPROCESS_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+
+# Полная шкала int16
+_FULL_SCALE = 32768.0
+
+
+class PolyphaseResampler:
+    """
+    Потоковая передискретизация в рациональное число раз (L/M) многофазным
+    КИХ-фильтром (окно Кайзера, sinc).
+
+    История входа хранится между блоками, поэтому на стыках блоков нет
+    щелчков. Для выхода каждого блока по заранее вычисленным индексам
+    собираются окна входа и строки фильтра нужных фаз; всё это пишется
+    в буферы, выделенные при создании. Для блоков постоянной длины
+    индексы повторяются и кэшируются.
+    """
+
+    def __init__(
+        self,
+        input_rate: int,
+        output_rate: int,
+        max_block: int,
+        zero_crossings: int = 16,
+        rolloff: float = 0.9,
+    ) -> None:
+        """
+        Проектирование фильтра и выделение буферов.
+
+        :param input_rate: частота входа
+        :param output_rate: частота выхода
+        :param max_block: максимальная длина входного блока в сэмплах
+        :param zero_crossings: число нулей sinc с каждой стороны (длина фильтра)
+        :param rolloff: частота среза относительно частоты Найквиста меньшей из частот
+        """
+        divisor = gcd(input_rate, output_rate)
+        self._up = output_rate // divisor
+        self._down = input_rate // divisor
+        self._max_block = max_block
+
+        if self._up == self._down:
+            # Частоты совпадают: фильтр из одного единичного коэффициента
+            length, taps = 1, np.ones(1)
+        else:
+            ratio = max(self._up, self._down)
+            length = 2 * zero_crossings * ratio + 1
+            cutoff = rolloff * 0.5 / ratio
+            n = np.arange(length) - (length - 1) / 2
+            taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0) * self._up
+        # Фаза p: коэффициенты taps[p], taps[p + L], ... в обратном порядке, чтобы
+        # умножать на окно входа от старых сэмплов к новым
+        self._taps = -(-length // self._up)
+        padded = np.zeros(self._taps * self._up)
+        padded[:length] = taps
+        self._phases = np.ascontiguousarray(padded.reshape(self._taps, self._up).T[:, ::-1], dtype=np.float32)
+
+        history = self._taps - 1
+        self._buffer = np.zeros(history + max_block, dtype=np.float32)
+        self._windows = sliding_window_view(self._buffer, self._taps)
+        self._max_out = max_block * self._up // self._down + 1
+        self._gathered = np.empty((self._max_out, self._taps), dtype=np.float32)
+        self._coefs = np.empty((self._max_out, self._taps), dtype=np.float32)
+        self._out = np.empty(self._max_out, dtype=np.float32)
+        # Положение следующего выходного сэмпла относительно начала блока (в единицах 1/L входа)
+        self._position = 0
+        self._plans: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def max_output(self) -> int:
+        """Максимальная длина выхода для одного блока."""
+        return self._max_out
+
+    def input_block(self, frames: int) -> np.ndarray:
+        """
+        Возвращает участок внутреннего буфера, куда нужно записать новый блок входа.
+
+        :param frames: длина блока в сэмплах
+        :return: массив float32 длиной `frames`
+        """
+        start = self._taps - 1
+        return self._buffer[start:start + frames]
+
+    def _plan(self, frames: int) -> Tuple[np.ndarray, np.ndarray]:
+        key = (self._position, frames)
+        plan = self._plans.get(key)
+        if plan is None:
+            end = frames * self._up
+            positions = np.arange(self._position, end, self._down)
+            plan = (positions // self._up, positions % self._up)
+            if len(self._plans) > 64:
+                self._plans.clear()
+            self._plans[key] = plan
+        return plan
+
+    def process(self, frames: int) -> np.ndarray:
+        """
+        Передискретизирует блок, записанный в `input_block(frames)`.
+
+        :param frames: длина блока в сэмплах
+        :return: выход (представление внутреннего буфера, действительно до следующего вызова)
+        """
+        indices, phases = self._plan(frames)
+        count = len(indices)
+        gathered = self._gathered[:count]
+        coefs = self._coefs[:count]
+        np.take(self._windows, indices, axis=0, out=gathered)
+        np.take(self._phases, phases, axis=0, out=coefs)
+        np.multiply(gathered, coefs, out=gathered)
+        out = np.sum(gathered, axis=1, out=self._out[:count])
+
+        self._position += count * self._down - frames * self._up
+        # История для следующего блока — последние taps-1 сэмплов входа
+        history = self._taps - 1
+        if history:
+            self._buffer[:history] = self._buffer[frames:frames + history]
+        return out
+
+
+class AutoGain:
+    """
+    Автоматическая регулировка усиления: подтягивает среднеквадратичный
+    уровень речи к целевому. Усиление снижается быстро (атака) и растёт
+    медленно (восстановление); в тишине не меняется, чтобы не поднимать шум.
+    """
+
+    def __init__(
+        self,
+        target_dbfs: float = -20.0,
+        max_gain_db: float = 30.0,
+        floor_dbfs: float = -60.0,
+        attack: float = 0.5,
+        release: float = 0.05,
+    ) -> None:
+        """
+        Инициализация регулятора.
+
+        :param target_dbfs: целевой уровень (дБ относительно полной шкалы)
+        :param max_gain_db: максимальное усиление в дБ
+        :param floor_dbfs: блоки тише этого уровня считаются тишиной
+        :param attack: доля шага к нужному усилению при его снижении
+        :param release: доля шага к нужному усилению при его росте
+        """
+        self._target = _FULL_SCALE * 10 ** (target_dbfs / 20)
+        self._max_gain = 10 ** (max_gain_db / 20)
+        self._floor = _FULL_SCALE * 10 ** (floor_dbfs / 20)
+        self._attack = attack
+        self._release = release
+        self.gain = 1.0
+
+    def process(self, samples: np.ndarray) -> None:
+        """
+        Усиливает блок на месте.
+
+        :param samples: блок float32
+        """
+        if len(samples):
+            rms = float(np.sqrt(np.dot(samples, samples) / len(samples)))
+            if rms > self._floor:
+                wanted = min(self._target / rms, self._max_gain)
+                step = self._attack if wanted < self.gain else self._release
+                self.gain += step * (wanted - self.gain)
+        samples *= self.gain
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает текущее усиление.
+
+        :return: словарь с усилением в дБ
+        """
+        return {"gain_db": round(20 * float(np.log10(self.gain)), 2)}
+
+
+class SpectralGate:
+    """
+    Спектральное шумоподавление: оценивает уровень шума в каждой полосе
+    частот (слежение за минимумом) и приглушает полосы, где сигнал не
+    превышает шум в `threshold` раз. Блок обрабатывается одним БПФ без
+    перекрытия, маска сглаживается между блоками.
+    """
+
+    def __init__(
+        self,
+        block: int,
+        threshold: float = 2.0,
+        attenuation_db: float = 20.0,
+        noise_rise: float = 0.02,
+        smoothing: float = 0.5,
+    ) -> None:
+        """
+        Инициализация шумоподавителя.
+
+        :param block: размер блока (длина БПФ)
+        :param threshold: во сколько раз сигнал в полосе должен превышать шум
+        :param attenuation_db: ослабление полос с шумом в дБ
+        :param noise_rise: скорость подъёма оценки шума (вниз она следует сразу)
+        :param smoothing: доля маски предыдущего блока в текущей
+        """
+        self._block = block
+        bins = block // 2 + 1
+        self._threshold = threshold
+        self._floor = 10 ** (-attenuation_db / 20)
+        self._noise_rise = noise_rise
+        self._smoothing = smoothing
+        self._spectrum = np.empty(bins, dtype=np.complex64)
+        self._magnitude = np.empty(bins, dtype=np.float32)
+        self._noise: Optional[np.ndarray] = None
+        self._mask = np.ones(bins, dtype=np.float32)
+        self._new_mask = np.empty(bins, dtype=np.float32)
+        self._frame = np.empty(block, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> None:
+        """
+        Подавляет шум в блоке на месте.
+
+        :param samples: блок float32 (не длиннее размера БПФ)
+        """
+        count = len(samples)
+        frame = self._frame
+        frame[:count] = samples
+        frame[count:] = 0
+        spectrum = np.fft.rfft(frame, out=self._spectrum)
+        magnitude = np.abs(spectrum, out=self._magnitude)
+
+        if self._noise is None:
+            self._noise = magnitude.copy()
+        noise = self._noise
+        # Минимум — сразу, рост — медленно: речь не успевает стать «шумом»
+        np.minimum(noise, magnitude, out=noise)
+        noise += self._noise_rise * (magnitude - noise)
+
+        mask = self._new_mask
+        np.greater(magnitude, self._threshold * noise, out=mask)
+        mask *= 1 - self._floor
+        mask += self._floor
+        self._mask *= self._smoothing
+        self._mask += (1 - self._smoothing) * mask
+
+        spectrum *= self._mask
+        samples[:] = np.fft.irfft(spectrum, n=self._block, out=frame)[:count]
+
+
+class AudioPreprocessor:
+    """
+    Конвейер предобработки между аудио-коллбэком и кольцевым буфером.
+
+    Принимает блок в родном формате устройства (int16, любая частота и
+    число каналов) и выдаёт моно int16 с частотой распознавателя:
+    сведение каналов (или выбор одного) → передискретизация → АРУ →
+    шумоподавление. Все буферы выделяются при создании, этапы работают
+    на месте векторными операциями NumPy. Длительность каждого этапа
+    учитывается в гистограммах `stage_seconds`.
+    """
+
+    def __init__(
+        self,
+        input_rate: int,
+        output_rate: int = 16000,
+        channels: int = 1,
+        channel: Optional[int] = None,
+        block_frames: int = 1600,
+        agc: Optional[AutoGain] = None,
+        noise_gate: bool = False,
+        noise_gate_threshold: float = 2.0,
+        noise_gate_attenuation_db: float = 20.0,
+    ) -> None:
+        """
+        Инициализация конвейера.
+
+        :param input_rate: частота дискретизации устройства
+        :param output_rate: частота дискретизации распознавателя
+        :param channels: число каналов, в котором открывается устройство
+        :param channel: канал, который нужно взять (None — свести все каналы)
+        :param block_frames: размер входного блока в кадрах
+        :param agc: регулятор усиления (None — без АРУ)
+        :param noise_gate: включить спектральное шумоподавление
+        :param noise_gate_threshold: порог шумоподавления (см. `SpectralGate`)
+        :param noise_gate_attenuation_db: ослабление шума в дБ
+        """
+        self._input_rate = input_rate
+        self._output_rate = output_rate
+        self._channels = max(1, channels)
+        self._channel = channel
+        self._block_frames = block_frames
+        # Запас на блоки длиннее заявленного (PortAudio иногда отдаёт больше)
+        max_block = 2 * block_frames
+        self._resampler = PolyphaseResampler(input_rate, output_rate, max_block)
+        self._agc = agc
+        out_block = -(-block_frames * output_rate // input_rate)
+        self._gate = SpectralGate(
+            out_block, noise_gate_threshold, noise_gate_attenuation_db,
+        ) if noise_gate else None
+        self._out = np.empty(self._resampler.max_output, dtype=np.int16)
+        self.stage_seconds: Dict[str, Histogram] = {
+            stage: Histogram(PREPROCESS_BUCKETS)
+            for stage in ("downmix", "resample", "agc", "noise_gate")
+        }
+
+    @property
+    def input_rate(self) -> int:
+        """Частота дискретизации, в которой открывается устройство."""
+        return self._input_rate
+
+    @property
+    def channels(self) -> int:
+        """Число каналов, в котором открывается устройство."""
+        return self._channels
+
+    @property
+    def block_frames(self) -> int:
+        """Размер входного блока в кадрах."""
+        return self._block_frames
+
+    def process(self, indata: Any) -> np.ndarray:
+        """
+        Обрабатывает блок с устройства.
+
+        :param indata: буфер PortAudio (int16, чередующиеся каналы)
+        :return: моно int16 с частотой распознавателя (действительно до следующего вызова)
+        """
+        timings = self.stage_seconds
+        started = perf_counter()
+        samples = np.frombuffer(indata, dtype=np.int16).reshape(-1, self._channels)
+        frames = len(samples)
+        mono = self._resampler.input_block(frames)
+        if self._channel is not None:
+            mono[:] = samples[:, self._channel]
+        elif self._channels == 1:
+            mono[:] = samples[:, 0]
+        else:
+            np.mean(samples, axis=1, dtype=np.float32, out=mono)
+        now = perf_counter()
+        timings["downmix"].observe(now - started)
+
+        started = now
+        out = self._resampler.process(frames)
+        now = perf_counter()
+        timings["resample"].observe(now - started)
+
+        if self._agc is not None:
+            started = now
+            self._agc.process(out)
+            now = perf_counter()
+            timings["agc"].observe(now - started)
+
+        if self._gate is not None:
+            started = now
+            self._gate.process(out)
+            now = perf_counter()
+            timings["noise_gate"].observe(now - started)
+
+        np.clip(out, -_FULL_SCALE, _FULL_SCALE - 1, out=out)
+        result = self._out[:len(out)]
+        np.copyto(result, out, casting="unsafe")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает параметры конвейера и среднюю длительность этапов.
+
+        :return: словарь со статистикой
+        """
+        stats: Dict[str, Any] = {
+            "input_rate": self._input_rate,
+            "output_rate": self._output_rate,
+            "channels": self._channels,
+            "channel": self._channel,
+            "stages_ms": {
+                stage: round(histogram.sum / histogram.count * 1000, 3)
+                for stage, histogram in self.stage_seconds.items()
+                if histogram.count
+            },
+        }
+        if self._agc is not None:
+            stats["agc"] = self._agc.stats()
+        return stats
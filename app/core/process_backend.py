@@ -0,0 +1,884 @@
+"""
+Распознавание в отдельных процессах: аудио через разделяемую память, результаты через очередь.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import vosk
+
+from app.core.audio_buffer import DROP_NEWEST, as_waveform
+from app.core.logger import get_logger
+from app.core.vad import VoiceActivityDetector
+from app.core.wake_word import WakeWordGate
+
+
+# Как часто рабочий процесс присылает счётчики потоков (секунды)
+STATS_INTERVAL = 1.0
+# Сколько секунд непрерывной речи ждать границы фразы при замене модели
+SWAP_TIMEOUT = 10.0
+# Сколько байт файла распознавать за раз между проходами по буферам источников
+JOB_STEP_BYTES = 8000
+# Как часто проверять, живы ли рабочие процессы (секунды)
+HEALTH_INTERVAL = 1.0
+# Не чаще, чем раз в столько секунд, перезапускать упавший рабочий процесс
+RESPAWN_DELAY = 5.0
+
+
+class SharedAudioRing:
+    """
+    Кольцевой буфер аудиоблоков в разделяемой памяти: один писатель (аудио-коллбэк
+    в основном процессе) и один читатель (рабочий процесс).
+
+    Раскладка памяти: счётчики `head`/`tail` (int64), метки времени блоков
+    (float64, `time.perf_counter` — общий для процессов монотонный таймер),
+    длины блоков (int32) и сами слоты. Писатель меняет только `head`,
+    читатель — только `tail`, поэтому блокировки не нужны. Читатель
+    распознаёт блок прямо в слоте и лишь затем сдвигает `tail`.
+
+    Писатель не может забрать слот у читателя, поэтому при переполнении
+    отбрасывается новый блок (`drop_newest`).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, slot_bytes: int, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._capacity = capacity
+        self._slot_bytes = slot_bytes
+        buf = shm.buf
+        offset = 0
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 16
+        self._stamps = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self._lengths = np.ndarray((capacity,), dtype=np.int32, buffer=buf, offset=offset)
+        offset += 4 * capacity
+        offset += -offset % 8
+        self._data = np.ndarray((capacity, slot_bytes), dtype=np.uint8, buffer=buf, offset=offset)
+        self._samples = self._data.view(np.int16)
+        self._views = [memoryview(self._data[i]) for i in range(capacity)]
+        self.overruns = 0
+
+    @staticmethod
+    def _size(capacity: int, slot_bytes: int) -> int:
+        header = 16 + 8 * capacity + 4 * capacity
+        return header + (-header % 8) + capacity * slot_bytes
+
+    @classmethod
+    def create(cls, capacity: int, slot_bytes: int) -> "SharedAudioRing":
+        """
+        Выделяет разделяемую память под буфер.
+
+        :param capacity: число слотов
+        :param slot_bytes: размер слота в байтах
+        :return: буфер (сторона писателя)
+        """
+        shm = shared_memory.SharedMemory(create=True, size=cls._size(capacity, slot_bytes))
+        ring = cls(shm, capacity, slot_bytes, owner=True)
+        ring._counters[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, slot_bytes: int) -> "SharedAudioRing":
+        """
+        Подключается к буферу, созданному другим процессом.
+
+        :param name: имя разделяемой памяти
+        :param capacity: число слотов
+        :param slot_bytes: размер слота в байтах
+        :return: буфер (сторона читателя)
+        """
+        return cls(shared_memory.SharedMemory(name=name), capacity, slot_bytes, owner=False)
+
+    @property
+    def name(self) -> str:
+        """Имя разделяемой памяти."""
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        """Ёмкость буфера в блоках."""
+        return self._capacity
+
+    @property
+    def slot_bytes(self) -> int:
+        """Размер слота в байтах."""
+        return self._slot_bytes
+
+    def __len__(self) -> int:
+        return int(self._counters[0] - self._counters[1])
+
+    def put(self, data: Any) -> bool:
+        """
+        Копирует блок в свободный слот (сторона писателя).
+
+        :param data: буфер байтов или массив сэмплов int16 (в том числе со страйдом)
+        :return: False, если буфер полон и блок отброшен
+        """
+        head = int(self._counters[0])
+        if head - int(self._counters[1]) >= self._capacity:
+            self.overruns += 1
+            return False
+        index = head % self._capacity
+        if isinstance(data, np.ndarray):
+            count = min(len(data), self._slot_bytes // 2)
+            self._samples[index, :count] = data[:count]
+            size = count * 2
+        else:
+            source = np.frombuffer(data, dtype=np.uint8)
+            size = min(len(source), self._slot_bytes)
+            self._data[index, :size] = source[:size]
+        self._lengths[index] = size
+        self._stamps[index] = time.perf_counter()
+        # Блок становится виден читателю только после записи данных
+        self._counters[0] = head + 1
+        return True
+
+    def peek(self) -> Optional[Tuple[memoryview, float]]:
+        """
+        Возвращает самый старый блок, не освобождая слот (сторона читателя).
+
+        :return: пара (данные блока, момент поступления) или None, если буфер пуст
+        """
+        tail = int(self._counters[1])
+        if tail >= int(self._counters[0]):
+            return None
+        index = tail % self._capacity
+        return self._views[index][:int(self._lengths[index])], float(self._stamps[index])
+
+    def advance(self) -> None:
+        """Освобождает слот, прочитанный `peek` (сторона читателя)."""
+        self._counters[1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики буфера (сторона писателя).
+
+        :return: словарь со счётчиками
+        """
+        head, tail = int(self._counters[0]), int(self._counters[1])
+        return {
+            "depth": head - tail,
+            "capacity": self._capacity,
+            "policy": DROP_NEWEST,
+            "overruns": self.overruns,
+            "blocks_in": head,
+            "blocks_out": tail,
+        }
+
+    def close(self) -> None:
+        """Отключается от разделяемой памяти; владелец также удаляет её."""
+        self._views = []
+        self._counters = self._stamps = self._lengths = self._data = self._samples = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class _WorkerStream:
+    """Состояние одного источника звука внутри рабочего процесса."""
+
+    __slots__ = (
+        "ring", "samplerate", "vad", "grammar", "rec", "in_speech", "accept_seconds", "blocks", "swap_deadline",
+        "phrase_start", "wake", "close_phrase",
+    )
+
+    def __init__(
+        self, ring: SharedAudioRing, samplerate: int, vad: Optional[VoiceActivityDetector],
+        wake: Optional[WakeWordGate],
+    ) -> None:
+        self.ring = ring
+        self.samplerate = samplerate
+        self.vad = vad
+        self.wake = wake
+        self.grammar: Optional[str] = None
+        self.rec: Any = None
+        self.in_speech = False
+        self.accept_seconds = 0.0
+        self.blocks = 0
+        # Ненулевой срок — распознаватель ждёт замены на новую модель
+        self.swap_deadline = 0.0
+        # Момент поступления первого блока незаконченной фразы (0 — фразы нет)
+        self.phrase_start = 0.0
+        # Закрыть фразу, как только буфер опустеет (источник заглушён)
+        self.close_phrase = False
+
+
+class _WorkerJob:
+    """Задание на распознавание буфера, которое рабочий процесс выполняет порциями."""
+
+    __slots__ = ("job_id", "shm", "size", "samplerate", "model", "rec", "offset", "phrases")
+
+    def __init__(
+        self, job_id: int, shm: shared_memory.SharedMemory, size: int, samplerate: int, model: Any, rec: Any,
+    ) -> None:
+        self.job_id = job_id
+        self.shm = shm
+        self.size = size
+        self.samplerate = samplerate
+        # Модель, которой распознаётся задание: замена модели ждёт его окончания
+        self.model = model
+        self.rec = rec
+        self.offset = 0
+        self.phrases: List[str] = []
+
+
+class _Worker:
+    """
+    Цикл рабочего процесса: своя модель Vosk, распознаватели закреплённых
+    за процессом источников и разовые задания на распознавание буферов.
+    """
+
+    def __init__(
+        self, model_path: str, spk_model_path: Optional[str], words: bool, control: Any, work: Any, results: Any,
+    ) -> None:
+        vosk.SetLogLevel(-1)
+        self._model = vosk.Model(model_path)
+        self._spk_model = vosk.SpkModel(spk_model_path) if spk_model_path else None
+        self._words = words
+        self._control = control
+        self._work = work
+        self._results = results
+        self._streams: Dict[str, _WorkerStream] = {}
+        # Задания выполняются по очереди порциями вперемешку с живыми источниками
+        self._jobs: Deque[_WorkerJob] = deque()
+        self._loaded_model: Optional[vosk.Model] = None
+        self._swapping = False
+        self._stats_at = time.monotonic()
+
+    def _recognizer(self, samplerate: int, grammar: Optional[str] = None) -> Any:
+        if grammar is None:
+            rec = vosk.KaldiRecognizer(self._model, samplerate)
+        else:
+            rec = vosk.KaldiRecognizer(self._model, samplerate, grammar)
+        if self._spk_model is not None:
+            rec.SetSpkModel(self._spk_model)
+        if self._words:
+            rec.SetWords(True)
+            rec.SetPartialWords(True)
+        return rec
+
+    def _rebuild(self, stream: _WorkerStream) -> None:
+        """Создаёт распознаватели источника на текущей модели."""
+        stream.rec = self._recognizer(stream.samplerate, stream.grammar)
+        if stream.wake is not None:
+            stream.wake.bind(vosk.KaldiRecognizer(self._model, stream.samplerate, stream.wake.grammar.spec))
+
+    def run(self) -> None:
+        while True:
+            # Разрешения семафора лишь будят процесс; после пробуждения буферы
+            # просматриваются целиком, поэтому лишние разрешения сбрасываем
+            while self._work.acquire(False):
+                pass
+            if not self._handle_control():
+                break
+            processed = self._drain()
+            busy = processed
+            if self._jobs:
+                self._step_job()
+                busy = True
+            try:
+                if self._loaded_model is not None:
+                    self._start_swap()
+                self._close_phrases()
+                if self._swapping:
+                    self._finish_swap(idle=not processed)
+                now = time.monotonic()
+                if now - self._stats_at >= STATS_INTERVAL:
+                    self._stats_at = now
+                    self._send_stats()
+            except Exception as e:
+                self._report(None, e)
+            if not busy:
+                self._work.acquire(timeout=0.1)
+        for stream in self._streams.values():
+            stream.ring.close()
+        for job in self._jobs:
+            job.shm.close()
+
+    def _handle_control(self) -> bool:
+        while True:
+            try:
+                command, *args = self._control.get_nowait()
+            except queue.Empty:
+                return True
+            if command == "stop":
+                return False
+            try:
+                getattr(self, f"_cmd_{command}")(*args)
+            except Exception as e:
+                # Ошибка одной команды не должна останавливать процесс с чужими источниками
+                self._report(args[0] if args else None, e, command)
+
+    def _report(self, key: Any, error: Exception, command: Optional[str] = None) -> None:
+        """Сообщает основному процессу об ошибке, после которой рабочий процесс продолжает работу."""
+        message = f"{type(error).__name__}: {error}"
+        self._results.put(("error", key, f"{command}: {message}" if command else message, None))
+
+    def _cmd_open(self, stream_id: str, ring_name: str, capacity: int, slot_bytes: int,
+                  samplerate: int, vad: Optional[VoiceActivityDetector], wake: Optional[WakeWordGate]) -> None:
+        stream = _WorkerStream(SharedAudioRing.attach(ring_name, capacity, slot_bytes), samplerate, vad, wake)
+        self._rebuild(stream)
+        self._streams[stream_id] = stream
+
+    def _cmd_close(self, stream_id: str) -> None:
+        stream = self._streams.pop(stream_id, None)
+        if stream is not None:
+            stream.ring.close()
+
+    def _cmd_grammar(self, stream_id: str, grammar: Optional[str]) -> None:
+        stream = self._streams[stream_id]
+        stream.grammar = grammar
+        stream.rec = self._recognizer(stream.samplerate, grammar)
+        stream.in_speech = False
+        stream.phrase_start = 0.0
+
+    def _cmd_end_phrase(self, stream_id: str) -> None:
+        self._streams[stream_id].close_phrase = True
+
+    def _cmd_model(self, model_path: str) -> None:
+        # Загрузка модели отпускает GIL — распознавание продолжается старой моделью
+        def load() -> None:
+            self._loaded_model = vosk.Model(model_path)
+            self._work.release()
+
+        threading.Thread(target=load, name="stt-worker-model-loader", daemon=True).start()
+
+    def _cmd_transcribe(self, job_id: int, shm_name: str, size: int, samplerate: int) -> None:
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+        except Exception as e:
+            self._results.put(("job", job_id, None, f"{type(e).__name__}: {e}"))
+            return
+        try:
+            rec = vosk.KaldiRecognizer(self._model, samplerate)
+        except Exception as e:
+            shm.close()
+            self._results.put(("job", job_id, None, f"{type(e).__name__}: {e}"))
+            return
+        self._jobs.append(_WorkerJob(job_id, shm, size, samplerate, self._model, rec))
+
+    def _step_job(self) -> None:
+        """
+        Распознаёт очередную порцию первого задания. Задания чередуются по кругу,
+        а между порциями `run` разбирает буферы источников: длинный файл
+        не задерживает живой звук.
+        """
+        job = self._jobs.popleft()
+        try:
+            end = min(job.offset + JOB_STEP_BYTES, job.size)
+            if job.offset < end and job.rec.AcceptWaveform(as_waveform(job.shm.buf[job.offset:end])):
+                job.phrases.append(json.loads(job.rec.Result())["text"])
+            job.offset = end
+            if end < job.size:
+                self._jobs.append(job)
+                return
+            job.phrases.append(json.loads(job.rec.FinalResult())["text"])
+        except Exception as e:
+            # Задание завершается ошибкой, а процесс продолжает обслуживать источники
+            job.shm.close()
+            self._results.put(("job", job.job_id, None, f"{type(e).__name__}: {e}"))
+            return
+        job.shm.close()
+        phrases = [text for text in job.phrases if text.strip()]
+        self._results.put(("job", job.job_id, {
+            "text": " ".join(phrases),
+            "phrases": phrases,
+            "duration": job.size / 2 / job.samplerate,
+        }, None))
+
+    def _drain(self) -> bool:
+        """Распознаёт все накопившиеся блоки, по блоку от каждого источника за проход."""
+        processed = False
+        while True:
+            progressed = False
+            for stream_id, stream in self._streams.items():
+                block = stream.ring.peek()
+                if block is None:
+                    continue
+                data, stamp = block
+                try:
+                    result = self._recognize(stream, data, stamp)
+                except Exception as e:
+                    # Блок пропускается, источник продолжает распознаваться
+                    self._report(stream_id, e)
+                    result = None
+                stream.ring.advance()
+                if result is not None:
+                    self._results.put(("result", stream_id, result, (stream.phrase_start or stamp, stamp)))
+                    stream.phrase_start = 0.0
+                    if stream.swap_deadline:
+                        # Фраза закрыта — естественная граница для замены модели
+                        self._rebuild(stream)
+                        stream.swap_deadline = 0.0
+                progressed = True
+            if not progressed:
+                return processed
+            processed = True
+
+    def _recognize(self, stream: _WorkerStream, data: memoryview, stamp: float) -> Optional[str]:
+        stream.blocks += 1
+        if stream.vad is not None:
+            if not stream.vad.is_speech(data):
+                if not stream.in_speech:
+                    return None
+                stream.in_speech = False
+                stream.vad.reset()
+                return stream.rec.FinalResult()
+            stream.in_speech = True
+
+        if stream.wake is not None and not stream.wake.awake:
+            preroll = stream.wake.listen(data)
+            if preroll is None:
+                return None
+            data = preroll
+
+        if not stream.phrase_start:
+            stream.phrase_start = stamp
+        started = time.perf_counter()
+        is_final = stream.rec.AcceptWaveform(as_waveform(data))
+        stream.accept_seconds += time.perf_counter() - started
+        if stream.wake is not None and stream.wake.elapse(data):
+            stream.in_speech = False
+            if stream.vad is not None:
+                stream.vad.reset()
+            return stream.rec.Result() if is_final else stream.rec.FinalResult()
+        return stream.rec.Result() if is_final else None
+
+    def _close_phrases(self) -> None:
+        """Закрывает фразы заглушённых источников, звук которых уже разобран."""
+        for stream_id, stream in self._streams.items():
+            if not stream.close_phrase or len(stream.ring):
+                continue
+            stream.close_phrase = False
+            stream.in_speech = False
+            if stream.vad is not None:
+                stream.vad.reset()
+            final = stream.rec.FinalResult()
+            if json.loads(final).get("text"):
+                stamp = time.perf_counter()
+                self._results.put(("result", stream_id, final, (stream.phrase_start or stamp, stamp)))
+            stream.phrase_start = 0.0
+
+    def _start_swap(self) -> None:
+        """Делает загруженную модель текущей; источники переходят на неё по одному."""
+        self._model, self._loaded_model = self._loaded_model, None
+        deadline = time.monotonic() + SWAP_TIMEOUT
+        for stream in self._streams.values():
+            stream.swap_deadline = deadline
+        self._swapping = True
+
+    def _finish_swap(self, idle: bool) -> None:
+        """
+        Переводит на новую модель источники, у которых сейчас граница фразы:
+        нет аудио, VAD не слышит речь или истёк срок ожидания.
+        """
+        now = time.monotonic()
+        # Замена не подтверждается, пока не распознаны задания на прежней модели
+        pending = any(job.model is not self._model for job in self._jobs)
+        for stream_id, stream in self._streams.items():
+            if not stream.swap_deadline:
+                continue
+            vad_pause = stream.vad is not None and not stream.in_speech
+            if not (idle or vad_pause or now >= stream.swap_deadline):
+                pending = True
+                continue
+            # Закрываем фразу прежней моделью, чтобы не потерять её аудио
+            final = stream.rec.FinalResult()
+            if json.loads(final).get("text"):
+                stamp = time.perf_counter()
+                self._results.put(("result", stream_id, final, (stream.phrase_start or stamp, stamp)))
+            stream.phrase_start = 0.0
+            self._rebuild(stream)
+            stream.in_speech = False
+            stream.swap_deadline = 0.0
+        if not pending:
+            self._swapping = False
+            self._results.put(("model", os.getpid(), None, None))
+
+    def _send_stats(self) -> None:
+        for stream_id, stream in self._streams.items():
+            stats = {"blocks": stream.blocks, "accept_seconds": stream.accept_seconds}
+            if stream.vad is not None:
+                stats["vad"] = stream.vad.stats()
+            if stream.wake is not None:
+                stats["wake"] = stream.wake.stats()
+            self._results.put(("stats", stream_id, stats, None))
+
+
+def _worker_main(
+    model_path: str, spk_model_path: Optional[str], words: bool, control: Any, work: Any, results: Any,
+) -> None:
+    """Точка входа рабочего процесса."""
+    _Worker(model_path, spk_model_path, words, control, work, results).run()
+
+
+class BackendStream:
+    """
+    Источник звука, закреплённый за рабочим процессом: буфер аудио и очередь результатов.
+    """
+
+    def __init__(self, stream_id: str, ring: SharedAudioRing, worker: int, work: Any, open_args: Tuple) -> None:
+        self.stream_id = stream_id
+        self.ring = ring
+        self.worker = worker
+        self._work = work
+        # Аргументы команды "open" и текущая грамматика — чтобы открыть источник в новом процессе
+        self.open_args = open_args
+        self.grammar: Optional[str] = None
+        # Тройки (результат Vosk в JSON, моменты поступления блока, завершившего фразу,
+        # и первого блока фразы)
+        self.results: "queue.Queue[Tuple[str, float, float]]" = queue.Queue()
+        self.remote_stats: Dict[str, Any] = {}
+
+    def put(self, data: Any) -> None:
+        """
+        Передаёт блок аудио рабочему процессу (вызывается из аудио-коллбэка).
+
+        :param data: буфер байтов или массив сэмплов int16
+        """
+        if self.ring.put(data):
+            self._work.release()
+
+    def rebind(self, worker: int, work: Any) -> None:
+        """
+        Закрепляет источник за новым рабочим процессом (после перезапуска прежнего).
+
+        :param worker: номер процесса
+        :param work: семафор, будящий процесс
+        """
+        self.worker = worker
+        self._work = work
+
+
+class ProcessBackend:
+    """
+    Пул рабочих процессов распознавания.
+
+    Каждый процесс загружает свою копию модели и обслуживает закреплённые
+    за ним источники звука (по кругу) и задания на распознавание файлов.
+    Аудио передаётся через `SharedAudioRing` без сериализации, обратно
+    идут только строки JSON от Vosk. Декодирование не конкурирует за GIL
+    с HTTP-сервером и потоками захвата, а источники распределяются по
+    всем ядрам. Цена — память: модель загружена в каждом процессе.
+
+    Если рабочий процесс завершился, его задания завершаются ошибкой, а сам
+    процесс перезапускается (не чаще раза в `RESPAWN_DELAY` секунд) и заново
+    открывает закреплённые за ним источники.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        model_path: str,
+        workers: int = 1,
+        spk_model_path: Optional[str] = None,
+        words: bool = True,
+    ) -> None:
+        """
+        Запуск рабочих процессов.
+
+        :param model_path: путь к модели Vosk
+        :param workers: число рабочих процессов
+        :param spk_model_path: путь к модели говорящих (None — без x-векторов)
+        :param words: включать в результаты слова с таймингами и уверенностью
+        """
+        # spawn: рабочие процессы не наследуют потоки и состояние PortAudio основного процесса
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._model_path = model_path
+        self._spk_model_path = spk_model_path
+        self._words = words
+        self._controls: List[Any] = []
+        self._works: List[Any] = []
+        self._processes: List[Any] = []
+        self._started_at: List[float] = []
+        for index in range(max(1, workers)):
+            self._controls.append(None)
+            self._works.append(None)
+            self._processes.append(None)
+            self._started_at.append(0.0)
+            self._spawn(index)
+
+        self._streams: Dict[str, BackendStream] = {}
+        # Задание → (future с результатом, номер процесса, которому оно отдано)
+        self._jobs: Dict[int, Tuple[Future, int]] = {}
+        self._job_ids = itertools.count(1)
+        self._next_worker = itertools.count()
+        self._lock = threading.Lock()
+        self._closing = False
+        # Номера процессов, ещё не перешедших на модель последнего `load_model`
+        self._swap_waiting: set = set()
+        self.model_generation = 0
+        self.model_swaps = 0
+        self.restarts = 0
+        self._dispatcher = threading.Thread(target=self._dispatch, name="stt-backend-results", daemon=True)
+        self._dispatcher.start()
+        self._log.info("Запущено рабочих процессов распознавания: %d", len(self._processes))
+
+    @property
+    def workers(self) -> int:
+        """Число рабочих процессов."""
+        return len(self._processes)
+
+    def _spawn(self, index: int) -> None:
+        """Запускает рабочий процесс с номером `index` на текущей модели."""
+        control, work = self._ctx.Queue(), self._ctx.Semaphore(0)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._model_path, self._spk_model_path, self._words, control, work, self._results),
+            name=f"stt-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._controls[index] = control
+        self._works[index] = work
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def _send(self, worker: int, *command: Any) -> None:
+        self._controls[worker].put(command)
+        self._works[worker].release()
+
+    def _pick_worker(self) -> int:
+        return next(self._next_worker) % len(self._processes)
+
+    def open_stream(
+        self,
+        stream_id: str,
+        samplerate: int,
+        block_bytes: int,
+        capacity: int,
+        vad: Optional[VoiceActivityDetector] = None,
+        wake: Optional[WakeWordGate] = None,
+    ) -> BackendStream:
+        """
+        Закрепляет источник звука за рабочим процессом.
+
+        :param stream_id: идентификатор источника
+        :param samplerate: частота дискретизации аудио
+        :param block_bytes: размер аудиоблока в байтах
+        :param capacity: ёмкость буфера в блоках
+        :param vad: детектор речи (копия работает в рабочем процессе)
+        :param wake: слово активации (копия работает в рабочем процессе)
+        :return: источник с буфером аудио и очередью результатов
+        """
+        worker = self._pick_worker()
+        ring = SharedAudioRing.create(capacity, block_bytes)
+        open_args = (stream_id, ring.name, capacity, block_bytes, samplerate, vad, wake)
+        stream = BackendStream(stream_id, ring, worker, self._works[worker], open_args)
+        with self._lock:
+            self._streams[stream_id] = stream
+        self._send(worker, "open", *open_args)
+        return stream
+
+    def close_stream(self, stream: BackendStream) -> None:
+        """
+        Открепляет источник и освобождает его буфер.
+
+        :param stream: источник
+        """
+        with self._lock:
+            self._streams.pop(stream.stream_id, None)
+        self._send(stream.worker, "close", stream.stream_id)
+        stream.ring.close()
+
+    def set_grammar(self, stream: BackendStream, grammar: Optional[str]) -> None:
+        """
+        Переключает грамматику распознавателя источника.
+
+        :param stream: источник
+        :param grammar: грамматика в формате Vosk (JSON-список фраз) или None
+        """
+        stream.grammar = grammar
+        self._send(stream.worker, "grammar", stream.stream_id, grammar)
+
+    def end_phrase(self, stream: BackendStream) -> None:
+        """
+        Просит рабочий процесс закрыть фразу источника, когда тот разберёт уже переданный звук.
+
+        :param stream: источник
+        """
+        self._send(stream.worker, "end_phrase", stream.stream_id)
+
+    def load_model(self, model_path: str) -> None:
+        """
+        Загружает другую модель во всех рабочих процессах; источники переходят
+        на неё на границе фразы.
+
+        :param model_path: путь к модели Vosk
+        """
+        # Перезапущенный процесс сразу загрузит новую модель
+        self._model_path = model_path
+        with self._lock:
+            self.model_generation += 1
+            self._swap_waiting = set(range(len(self._processes)))
+        for worker in range(len(self._processes)):
+            self._send(worker, "model", model_path)
+
+    @property
+    def swapping(self) -> bool:
+        """
+        Идёт ли замена модели: пока не все процессы подтвердили переход,
+        задания могут распознаваться как прежней, так и новой моделью.
+        """
+        return bool(self._swap_waiting)
+
+    def transcribe(self, pcm: bytes, samplerate: int = 16000) -> Dict[str, Any]:
+        """
+        Распознаёт PCM-буфер в рабочем процессе.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации аудио
+        :return: словарь с полным текстом, списком фраз и длительностью
+        """
+        return self.submit(pcm, samplerate).result()
+
+    async def transcribe_async(self, pcm: bytes, samplerate: int = 16000) -> Dict[str, Any]:
+        """
+        Распознаёт PCM-буфер в рабочем процессе, не блокируя цикл событий.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации аудио
+        :return: результат `transcribe`
+        """
+        return await asyncio.wrap_future(self.submit(pcm, samplerate))
+
+    def submit(self, pcm: bytes, samplerate: int = 16000) -> Future:
+        """
+        Ставит буфер в очередь на распознавание.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации аудио
+        :return: future с результатом `transcribe`
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(pcm)))
+        shm.buf[:len(pcm)] = pcm
+        future: Future = Future()
+        # Память освобождается, когда рабочий процесс прислал результат
+        future.add_done_callback(lambda _: (shm.close(), shm.unlink()))
+        job_id = next(self._job_ids)
+        worker = self._pick_worker()
+        with self._lock:
+            self._jobs[job_id] = (future, worker)
+        self._send(worker, "transcribe", job_id, shm.name, len(pcm), samplerate)
+        return future
+
+    def _check_workers(self) -> None:
+        """
+        Находит завершившиеся рабочие процессы: их задания завершаются ошибкой,
+        а процессы перезапускаются и заново открывают свои источники.
+        """
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._closing:
+                continue
+            with self._lock:
+                lost = [job_id for job_id, (_, worker) in self._jobs.items() if worker == index]
+                futures = [self._jobs.pop(job_id)[0] for job_id in lost]
+            for future in futures:
+                future.set_exception(RuntimeError(f"Рабочий процесс {process.name} завершился"))
+            if futures:
+                self._log.warning("Задания упавшего процесса %s завершены ошибкой: %d", process.name, len(futures))
+            if now - self._started_at[index] < RESPAWN_DELAY:
+                continue
+            self._log.error("Рабочий процесс %s завершился (код %s), перезапускаем", process.name, process.exitcode)
+            self._spawn(index)
+            self.restarts += 1
+            with self._lock:
+                # Новый процесс сразу запущен на текущей модели
+                self._swap_waiting.discard(index)
+            with self._lock:
+                streams = [stream for stream in self._streams.values() if stream.worker == index]
+            for stream in streams:
+                stream.rebind(index, self._works[index])
+                self._send(index, "open", *stream.open_args)
+                if stream.grammar is not None:
+                    self._send(index, "grammar", stream.stream_id, stream.grammar)
+
+    def _dispatch(self) -> None:
+        """Разбирает результаты рабочих процессов по источникам и заданиям."""
+        checked_at = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now - checked_at >= HEALTH_INTERVAL:
+                checked_at = now
+                self._check_workers()
+            try:
+                kind, key, payload, stamp = self._results.get(timeout=HEALTH_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "stop":
+                return
+            if kind == "job":
+                with self._lock:
+                    job = self._jobs.pop(key, None)
+                if job is None:
+                    continue
+                # Для заданий последнее поле — текст ошибки
+                if stamp is not None:
+                    job[0].set_exception(RuntimeError(stamp))
+                else:
+                    job[0].set_result(payload)
+            elif kind == "error":
+                self._log.error("Ошибка в рабочем процессе (%s): %s", key, payload)
+            elif kind == "model":
+                self.model_swaps += 1
+                with self._lock:
+                    for index, process in enumerate(self._processes):
+                        if process.pid == key:
+                            self._swap_waiting.discard(index)
+            else:
+                stream = self._streams.get(key)
+                if stream is None:
+                    continue
+                if kind == "result":
+                    start, end = stamp
+                    stream.results.put((payload, end, start))
+                elif kind == "stats":
+                    stream.remote_stats = payload
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние пула.
+
+        :return: словарь с числом процессов, живых процессов и заданий в работе
+        """
+        return {
+            "workers": len(self._processes),
+            "alive": sum(process.is_alive() for process in self._processes),
+            "restarts": self.restarts,
+            "streams": len(self._streams),
+            "jobs_pending": len(self._jobs),
+        }
+
+    def close(self) -> None:
+        """Останавливает рабочие процессы и освобождает буферы."""
+        self._closing = True
+        for worker in range(len(self._processes)):
+            self._send(worker, "stop")
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(("stop", None, None, None))
+        for stream in list(self._streams.values()):
+            stream.ring.close()
+        self._streams.clear()
+        self._log.info("Рабочие процессы распознавания остановлены")
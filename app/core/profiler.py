@@ -0,0 +1,62 @@
+"""
+Выборочный профилировщик всех потоков процесса для диагностики на работающем сервисе.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter, sleep
+from typing import Dict, Tuple
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Tuple[Counter, int]:
+    """
+    Снимает стеки всех потоков (кроме вызывающего) раз в `interval` секунд.
+
+    Потоки не останавливаются и не трассируются: `sys._current_frames`
+    только читает их текущие кадры под GIL, поэтому профилировать можно
+    на работающем сервисе, не прерывая распознавание. Вызовы Vosk
+    отпускают GIL и видны как кадр, из которого они сделаны.
+
+    :param seconds: длительность профилирования
+    :param interval: период выборки в секундах
+    :return: пары (счётчик свёрнутых стеков, число выборок)
+    """
+    own = threading.get_ident()
+    names: Dict[int, str] = {}
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        frames = sys._current_frames()
+        if not names.keys() >= frames.keys():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                # Первая строка функции, а не текущая: кадры одной функции сливаются в один
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(stack))] += 1
+        del frames
+        samples += 1
+        sleep(interval)
+    return stacks, samples
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """
+    Форматирует стеки в свёрнутом виде (`поток;функция;... число`) для flamegraph.pl,
+    speedscope и аналогов.
+
+    :param stacks: счётчик свёрнутых стеков
+    :return: текст, по стеку на строку, от частых к редким
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,132 @@
+"""
+Пул распознавателей Vosk для транскрибации файлов и буферов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, List, Optional
+
+import vosk
+
+from app.core.logger import get_logger
+
+
+class RecognizerPool:
+    """
+    Ограниченный пул распознавателей поверх одной общей модели Vosk.
+
+    Модель загружается один раз, а каждый рабочий поток получает свой
+    `KaldiRecognizer`. Вызовы Vosk отпускают GIL, поэтому потоки пула
+    декодируют параллельно на разных ядрах.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        model: vosk.Model,
+        size: int = 1,
+        chunk_frames: int = 4000,
+        max_rates: int = 4,
+        digest: Optional[str] = None,
+    ) -> None:
+        """
+        Инициализация пула.
+
+        :param model: загруженная модель Vosk (общая для всех распознавателей)
+        :param size: максимальное число одновременно работающих распознавателей
+        :param chunk_frames: размер порции сэмплов, подаваемой в распознаватель
+        :param max_rates: для скольких частот дискретизации хранить свободные распознаватели
+        :param digest: отпечаток модели (`model_fingerprint`) для ключей кэша распознавания
+        """
+        self._model = model
+        self._digest = digest
+        self._size = max(1, size)
+        self._chunk_bytes = chunk_frames * 2
+        self._max_rates = max(1, max_rates)
+        # Свободные распознаватели по частотам; давно не встречавшиеся частоты вытесняются
+        self._free: "OrderedDict[int, List[vosk.KaldiRecognizer]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._size,
+            thread_name_prefix="stt-pool",
+        )
+
+    @property
+    def digest(self) -> Optional[str]:
+        """Отпечаток модели пула: результаты пула кэшируются под ним."""
+        return self._digest
+
+    @property
+    def size(self) -> int:
+        """Максимальное число одновременно работающих распознавателей."""
+        return self._size
+
+    @contextmanager
+    def acquire(self, samplerate: int) -> Generator[vosk.KaldiRecognizer, None, None]:
+        """
+        Выдаёт свободный распознаватель для указанной частоты и возвращает его в пул.
+
+        :param samplerate: частота дискретизации аудио
+        :yields: распознаватель Vosk
+        """
+        with self._slots:
+            with self._lock:
+                free = self._free.get(samplerate)
+                rec = free.pop() if free else None
+            if rec is None:
+                rec = vosk.KaldiRecognizer(self._model, samplerate)
+            try:
+                yield rec
+            finally:
+                rec.Reset()
+                with self._lock:
+                    self._free.setdefault(samplerate, []).append(rec)
+                    self._free.move_to_end(samplerate)
+                    while len(self._free) > self._max_rates:
+                        self._free.popitem(last=False)
+
+    def transcribe(self, pcm: bytes, samplerate: int = 16000) -> Dict[str, Any]:
+        """
+        Распознаёт PCM-буфер целиком.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации аудио
+        :return: словарь с полным текстом, списком фраз и длительностью
+        """
+        phrases = []
+        with self.acquire(samplerate) as rec:
+            for start in range(0, len(pcm), self._chunk_bytes):
+                if rec.AcceptWaveform(pcm[start:start + self._chunk_bytes]):
+                    phrases.append(json.loads(rec.Result())["text"])
+            phrases.append(json.loads(rec.FinalResult())["text"])
+
+        phrases = [text for text in phrases if text.strip()]
+        return {
+            "text": " ".join(phrases),
+            "phrases": phrases,
+            "duration": len(pcm) / 2 / samplerate,
+        }
+
+    async def transcribe_async(self, pcm: bytes, samplerate: int = 16000) -> Dict[str, Any]:
+        """
+        Распознаёт PCM-буфер в потоке пула, не блокируя цикл событий.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации аудио
+        :return: результат `transcribe`
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.transcribe, pcm, samplerate)
+
+    def close(self) -> None:
+        """Останавливает рабочие потоки пула."""
+        self._executor.shutdown(wait=False)
+        self._log.info("Пул распознавателей остановлен")
@@ -0,0 +1,223 @@
+"""
+Опознавание говорящего по x-вектору модели vosk-model-spk.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import vosk
+
+from app.core.logger import get_logger
+from app.utils.audio_utils import decode_audio
+
+
+class SpeakerIdentifier:
+    """
+    Сопоставляет x-вектор фразы с образцами голосов.
+
+    Образцы лежат в каталоге `voices_path`: либо `<имя>.wav`, либо
+    `<имя>/*.wav`. Их x-векторы считаются один раз и кэшируются на диске
+    по хэшу содержимого файла, поэтому при перезапуске пересчитываются
+    только новые образцы. Опознавание — одно умножение нормированной
+    матрицы образцов на вектор фразы.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        model: vosk.Model,
+        spk_model_path: str,
+        voices_path: str,
+        cache_path: Optional[str] = None,
+        threshold: float = 0.5,
+    ) -> None:
+        """
+        Инициализация и загрузка образцов голосов.
+
+        :param model: модель Vosk (нужна для расчёта x-векторов образцов)
+        :param spk_model_path: путь к модели vosk-model-spk
+        :param voices_path: каталог с образцами голосов
+        :param cache_path: файл кэша x-векторов (по умолчанию внутри voices_path)
+        :param threshold: минимальная косинусная близость для опознавания
+        """
+        if not os.path.exists(spk_model_path):
+            raise FileNotFoundError(f"Модель говорящих не найдена по пути: {spk_model_path}")
+
+        self._model = model
+        self._spk_model = vosk.SpkModel(spk_model_path)
+        self._voices_path = voices_path
+        self._cache_path = cache_path or os.path.join(voices_path, ".xvectors.json")
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._cache: Dict[str, List[float]] = self._load_cache()
+        # Метки и нормированная матрица образцов заменяются целиком, читателям блокировка не нужна
+        self._references: Tuple[List[str], np.ndarray] = ([], np.empty((0, 0), dtype=np.float32))
+        self._load_voices()
+
+    @property
+    def spk_model(self) -> vosk.SpkModel:
+        """Модель говорящих для подключения к распознавателям."""
+        return self._spk_model
+
+    def set_model(self, model: vosk.Model) -> None:
+        """
+        Меняет модель Vosk для расчёта x-векторов новых образцов (при горячей замене).
+        x-векторы зависят только от модели говорящих, поэтому кэш остаётся в силе.
+
+        :param model: новая модель Vosk
+        """
+        self._model = model
+
+    @property
+    def speakers(self) -> List[str]:
+        """Имена говорящих, для которых есть образцы."""
+        return sorted(set(self._references[0]))
+
+    def _load_cache(self) -> Dict[str, List[float]]:
+        if not os.path.exists(self._cache_path):
+            return {}
+        try:
+            with open(self._cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self._log.warning("Кэш x-векторов не прочитан, будет пересчитан: %s", e)
+            return {}
+
+    def _save_cache(self) -> None:
+        tmp_path = self._cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self._cache_path)
+
+    def _voice_files(self) -> List[Tuple[str, str]]:
+        """Возвращает пары (имя говорящего, путь к WAV) из каталога образцов."""
+        if not os.path.isdir(self._voices_path):
+            self._log.warning("Каталог образцов голосов не найден: %s", self._voices_path)
+            return []
+
+        files = []
+        for name in sorted(os.listdir(self._voices_path)):
+            path = os.path.join(self._voices_path, name)
+            if os.path.isdir(path):
+                files.extend(
+                    (name, os.path.join(path, file_name))
+                    for file_name in sorted(os.listdir(path))
+                    if file_name.lower().endswith(".wav")
+                )
+            elif name.lower().endswith(".wav"):
+                files.append((os.path.splitext(name)[0], path))
+        return files
+
+    def _load_voices(self) -> None:
+        labels = []
+        vectors = []
+        computed = 0
+        for label, path in self._voice_files():
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            vector = self._cache.get(digest)
+            if vector is None:
+                vector = self.compute_xvector(*decode_audio(data))
+                if vector is None:
+                    self._log.warning("Образец слишком короткий для x-вектора: %s", path)
+                    continue
+                self._cache[digest] = vector
+                computed += 1
+            labels.append(label)
+            vectors.append(vector)
+
+        if computed:
+            self._save_cache()
+        self._set_references(labels, vectors)
+        self._log.info(
+            "Загружено образцов голосов: %d (говорящих: %d, рассчитано заново: %d)",
+            len(labels), len(set(labels)), computed,
+        )
+
+    def _set_references(self, labels: List[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not labels:
+            self._references = ([], np.empty((0, 0), dtype=np.float32))
+            return
+        matrix = np.array(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._references = (labels, matrix)
+
+    def compute_xvector(self, pcm: bytes, samplerate: int) -> Optional[List[float]]:
+        """
+        Считает x-вектор записи: среднее по фразам, взвешенное числом кадров.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации
+        :return: x-вектор или None, если запись слишком короткая
+        """
+        rec = vosk.KaldiRecognizer(self._model, samplerate)
+        rec.SetSpkModel(self._spk_model)
+        results = []
+        chunk = 8000
+        for start in range(0, len(pcm), chunk):
+            if rec.AcceptWaveform(pcm[start:start + chunk]):
+                results.append(json.loads(rec.Result()))
+        results.append(json.loads(rec.FinalResult()))
+
+        segments = [(r["spk"], r.get("spk_frames", 1)) for r in results if "spk" in r]
+        if not segments:
+            return None
+        vectors = np.asarray([vector for vector, _ in segments], dtype=np.float32)
+        weights = np.asarray([frames for _, frames in segments], dtype=np.float32)
+        return (weights @ vectors / weights.sum()).tolist()
+
+    def enroll(self, label: str, data: bytes) -> None:
+        """
+        Добавляет образец голоса: сохраняет WAV в каталог образцов и обновляет матрицу.
+
+        :param label: имя говорящего
+        :param data: WAV-файл (16 бит, моно)
+        :raises ValueError: если аудио не подходит или слишком короткое
+        """
+        if not label or "/" in label or "\\" in label or label.startswith("."):
+            raise ValueError(f"Недопустимое имя говорящего: {label!r}")
+
+        vector = self.compute_xvector(*decode_audio(data))
+        if vector is None:
+            raise ValueError("Образец слишком короткий для x-вектора")
+
+        digest = hashlib.sha256(data).hexdigest()
+        speaker_dir = os.path.join(self._voices_path, label)
+        os.makedirs(speaker_dir, exist_ok=True)
+        with open(os.path.join(speaker_dir, f"{digest[:16]}.wav"), "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            self._cache[digest] = vector
+            self._save_cache()
+            labels, matrix = self._references
+            vectors = np.vstack([matrix, [vector]]) if labels else [vector]
+            self._set_references(labels + [label], vectors)
+        self._log.info("Добавлен образец голоса: %s", label)
+
+    def identify(self, xvector: Optional[Sequence[float]]) -> Tuple[Optional[str], Optional[float]]:
+        """
+        Находит ближайший образец голоса.
+
+        :param xvector: x-вектор фразы (поле `spk` результата Vosk)
+        :return: пара (имя говорящего или None, косинусная близость)
+        """
+        labels, matrix = self._references
+        if xvector is None or not labels:
+            return None, None
+
+        vector = np.asarray(xvector, dtype=np.float32)
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        score = float(scores[best] / np.linalg.norm(vector))
+        if score < self._threshold:
+            return None, score
+        return labels[best], score
@@ -7,13 +7,31 @@ import json
 import queue
 import sys
 import os
-from time import sleep
-from typing import Generator
+from time import perf_counter, sleep
+from typing import Any, Callable, ContextManager, Dict, Generator, Optional, Tuple
 
-import sounddevice as sd
+import numpy as np
 import vosk
 
+try:
+    import sounddevice as sd
+except OSError:
+    # Нет PortAudio (сервер без звуковой карты): захват возможен только
+    # через подменённый input_stream, например в бенчмарке
+    sd = None
+
+from app.core.audio_buffer import DROP_OLDEST, AudioRingBuffer, as_waveform
+from app.core.audio_history import PcmHistory
+from app.core.grammar import UNKNOWN_WORD, Grammar, GrammarRegistry, strip_unknown
 from app.core.logger import get_logger
+from app.core.metrics import ACCEPT_WAVEFORM_BUCKETS, LATENCY_BUCKETS, STAGE_BUCKETS, Histogram
+from app.core.preprocess import AudioPreprocessor
+from app.core.process_backend import BackendStream, ProcessBackend
+from app.core.speaker_id import SpeakerIdentifier
+from app.core.stt_result import SttResult, SttWord
+from app.core.time_parser import TimeParser
+from app.core.vad import VoiceActivityDetector
+from app.core.wake_word import WakeWordGate
 
 
 class Speech2Text:
@@ -29,6 +47,23 @@ class Speech2Text:
         model_path: str = "model",
         samplerate: int = 16000,
         sound_device_index: int = 0,
+        vad: Optional[VoiceActivityDetector] = None,
+        blocksize_ms: int = 100,
+        queue_seconds: float = 5.0,
+        overflow_policy: str = DROP_OLDEST,
+        model: Optional[vosk.Model] = None,
+        channel: int = 0,
+        source_id: Optional[str] = None,
+        input_stream: Optional[Callable[..., ContextManager]] = None,
+        speaker_id: Optional[SpeakerIdentifier] = None,
+        grammars: Optional[GrammarRegistry] = None,
+        time_parser: Optional[TimeParser] = None,
+        backend: Optional[ProcessBackend] = None,
+        words: bool = True,
+        min_confidence: float = 0.0,
+        preprocessor: Optional[AudioPreprocessor] = None,
+        history: Optional[PcmHistory] = None,
+        wake: Optional[WakeWordGate] = None,
     ) -> None:
         """
         Инициализация движка распознавания речи.
@@ -36,21 +71,273 @@ class Speech2Text:
         :param model_path: путь к модели Vosk
         :param samplerate: частота дискретизации аудио
         :param sound_device_index: индекс аудиоустройства
+        :param vad: опциональный детектор речи, отсекающий тишину
+        :param blocksize_ms: длительность одного аудиоблока в миллисекундах
+        :param queue_seconds: сколько секунд аудио может ждать распознавателя
+        :param overflow_policy: что отбрасывать при переполнении очереди
+        :param model: уже загруженная модель Vosk (тогда model_path не используется)
+        :param channel: номер канала устройства, который нужно распознавать
+        :param source_id: идентификатор источника для пометки результатов
+        :param input_stream: фабрика входного потока с интерфейсом
+                             `sd.RawInputStream` (по умолчанию — он сам)
+        :param speaker_id: опциональное опознавание говорящего по образцам голосов
+        :param grammars: реестр грамматик для командного режима
+        :param time_parser: опциональный разбор времени и длительности в тексте фраз
+        :param backend: пул рабочих процессов; если задан, распознавание идёт в нём,
+                        а аудио передаётся через разделяемую память
+        :param words: передавать в результатах слова с таймингами и уверенностью
+        :param min_confidence: фразы со средней уверенностью ниже порога отбрасываются
+                               (0 — не отбрасывать; требует words)
+        :param preprocessor: предобработка звука; если задана, устройство открывается
+                             в её формате (частота, каналы), а канал выбирает она
+        :param history: история звука источника; если задана, в результатах
+                        отмечается положение звука фразы в ней
+        :param wake: слово активации; если задано, полный словарь модели слушает
+                     только окно после него
         """
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Модель не найдена по пути: {model_path}")
+        if model is None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Модель не найдена по пути: {model_path}")
+            model = vosk.Model(model_path)
 
-        self._model = vosk.Model(model_path)
-        self._rec = vosk.KaldiRecognizer(self._model, samplerate)
-        self._q = queue.Queue()
+        self._model = model
         self._samplerate = samplerate
+        self._wake = wake
+        self._speaker_id = speaker_id
+        self._time_parser = time_parser
+        self._backend = backend
+        self._remote: Optional[BackendStream] = None
+        self._words = words
+        self._min_confidence = min_confidence
+        self._full_rec = self._new_recognizer()
+        self._rec = self._full_rec
+        if wake is not None:
+            wake.bind(self._new_spotter())
+        # Командный режим: текущая грамматика и распознаватели по хэшу грамматики
+        self._grammars = grammars
+        self._grammar: Optional[Grammar] = None
+        self._grammar_recs: Dict[str, vosk.KaldiRecognizer] = {}
+        self._next_grammar: Optional[Tuple[Optional[Grammar]]] = None
+        # Горячая замена модели: подготовленные распознаватели и крайний срок замены
+        self._next_model: Optional[Tuple[Any, ...]] = None
+        self._swap_deadline = 0.0
+        self.model_swaps_total = 0
+        self._blocksize = max(1, samplerate * blocksize_ms // 1000)
+        self._q = AudioRingBuffer(
+            capacity=int(queue_seconds * 1000 / blocksize_ms),
+            block_bytes=self._blocksize * 2,
+            policy=overflow_policy,
+        )
+        self._input_overflows = 0
         self._sound_device_index = sound_device_index
+        self._channel = channel
+        self._source_id = source_id or f"{sound_device_index}:{channel}"
+        self._input_stream = input_stream
+        if hasattr(input_stream, "ready"):
+            # Источники без темпа реального времени не обгоняют распознаватель
+            input_stream.ready = lambda: self.queue_depth < 2
         self._is_active = True
+        # Заглушение: до какого момента (perf_counter) отбрасывать звук; 0 — не заглушён
+        self._muted_until = 0.0
+        self._muted_blocks = 0
+        # Закрыть фразу, как только распознаватель разберёт звук до заглушения
+        self._close_phrase = False
+        self._vad = vad
+        self._in_speech = False
+        self._preprocessor = preprocessor
+        self._history = history
+        # Момент поступления первого блока незаконченной фразы
+        self._phrase_start: Optional[float] = None
+
+        # Метрики горячего пути
+        self.accept_seconds = Histogram(ACCEPT_WAVEFORM_BUCKETS)
+        self.latency_seconds = Histogram(LATENCY_BUCKETS)
+        # Этапы задержки фразы: коллбэк захвата, ожидание в очереди, завершение фразы
+        # в Kaldi, разбор JSON, постобработка и передача в цикл событий
+        self.stage_seconds: Dict[str, Histogram] = {
+            stage: Histogram(STAGE_BUCKETS)
+            for stage in ("callback", "queue_wait", "finalize", "parse", "postprocess", "deliver")
+        }
+        # Последние значения этапов; для фразы — значения блока, который её завершил
+        self._stage_last: Dict[str, Optional[float]] = dict.fromkeys((*self.stage_seconds, "accept"))
+        self.last_phrase_timings: Optional[Dict[str, float]] = None
+        self.phrases_total = 0
+        self.low_confidence_total = 0
+        self.restarts_total = 0
+
+    @property
+    def model(self) -> vosk.Model:
+        """Загруженная модель Vosk (может использоваться другими распознавателями)."""
+        return self._model
+
+    @property
+    def source_id(self) -> str:
+        """Идентификатор источника звука (по умолчанию "устройство:канал")."""
+        return self._source_id
+
+    @property
+    def queue_depth(self) -> int:
+        """Число аудиоблоков, ожидающих распознавателя."""
+        if self._remote is not None:
+            return len(self._remote.ring)
+        return len(self._q)
+
+    @property
+    def samplerate(self) -> int:
+        """Частота дискретизации аудио."""
+        return self._samplerate
+
+    @property
+    def muted(self) -> bool:
+        """Отбрасывается ли сейчас звук источника."""
+        return perf_counter() < self._muted_until
+
+    @property
+    def preprocessor(self) -> Optional[AudioPreprocessor]:
+        """Предобработка звука (None — устройство отдаёт звук в формате распознавателя)."""
+        return self._preprocessor
+
+    @property
+    def history(self) -> Optional[PcmHistory]:
+        """История звука источника (None — звук не сохраняется)."""
+        return self._history
+
+    @property
+    def grammar(self) -> Optional[Grammar]:
+        """Грамматика командного режима (None — полный словарь модели)."""
+        if self._next_grammar is not None:
+            return self._next_grammar[0]
+        return self._grammar
+
+    def _new_recognizer(
+        self,
+        grammar: Optional[Grammar] = None,
+        model: Optional[vosk.Model] = None,
+        grammars: Optional[GrammarRegistry] = None,
+    ) -> vosk.KaldiRecognizer:
+        if grammar is None:
+            rec = vosk.KaldiRecognizer(model or self._model, self._samplerate)
+        else:
+            rec = (grammars or self._grammars).recognizer(grammar, self._samplerate)
+        if self._speaker_id is not None:
+            rec.SetSpkModel(self._speaker_id.spk_model)
+        if self._words:
+            rec.SetWords(True)
+            rec.SetPartialWords(True)
+        return rec
+
+    def _observe(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage].observe(seconds)
+        self._stage_last[stage] = seconds
+
+    def observe_delivery(self, seconds: float) -> None:
+        """
+        Учитывает время передачи фразы из потока прослушивания в цикл событий.
+
+        :param seconds: время от выдачи фразы генератором `listen` до её публикации
+        """
+        self._observe("deliver", seconds)
+        timings = self.last_phrase_timings
+        if timings is not None:
+            timings["deliver"] = seconds
+
+    def _new_spotter(self, model: Optional[vosk.Model] = None) -> vosk.KaldiRecognizer:
+        return vosk.KaldiRecognizer(model or self._model, self._samplerate, self._wake.grammar.spec)
+
+    def set_grammar(self, grammar: Optional[Grammar]) -> None:
+        """
+        Переключает источник в командный режим или обратно на полный словарь.
+        Переключение выполняет поток прослушивания перед следующим блоком;
+        незаконченная фраза при этом отбрасывается.
+
+        :param grammar: грамматика или None для полного словаря
+        """
+        if grammar is not None and self._grammars is None:
+            raise ValueError("Командный режим недоступен: не задан реестр грамматик")
+        self._next_grammar = (grammar,)
+
+    def _apply_grammar(self) -> None:
+        """Применяет запрошенное переключение грамматики (в потоке прослушивания)."""
+        (grammar,), self._next_grammar = self._next_grammar, None
+        if self._remote is not None:
+            self._backend.set_grammar(self._remote, grammar.spec if grammar is not None else None)
+        elif grammar is None:
+            rec = self._full_rec
+        else:
+            rec = self._grammar_recs.get(grammar.digest)
+            if rec is None:
+                rec = self._grammar_recs[grammar.digest] = self._new_recognizer(grammar)
+        if self._remote is None:
+            self._rec.Reset()
+            self._rec = rec
+        self._grammar = grammar
+        self._in_speech = False
+        self._phrase_start = None
+        self._log.info(
+            "Источник [%s]: %s", self._source_id,
+            f"командный режим «{grammar.name}»" if grammar else "полный словарь",
+        )
+
+    def swap_model(
+        self,
+        model: vosk.Model,
+        grammars: Optional[GrammarRegistry] = None,
+        timeout: float = 10.0,
+    ) -> None:
+        """
+        Готовит распознаватели новой модели и передаёт их потоку прослушивания.
+
+        Распознаватели собираются в вызывающем потоке, а поток прослушивания
+        только подменяет ссылку на границе фразы: когда Kaldi или VAD закрыли
+        фразу, когда аудио нет или, если речь не прерывается, через `timeout`
+        секунд (тогда текущая фраза закрывается принудительно). Захват при
+        этом не останавливается: блоки копятся в кольцевом буфере и
+        распознаются прежней моделью до замены, новой — после.
+
+        :param model: новая модель Vosk
+        :param grammars: реестр грамматик, собранный для новой модели
+        :param timeout: сколько секунд ждать естественной границы фразы
+        """
+        full_rec = self._new_recognizer(model=model)
+        grammar_recs = {}
+        grammar = self.grammar
+        if grammar is not None and grammars is not None and grammar.name in grammars.names:
+            grammar_recs[grammar.digest] = self._new_recognizer(grammar, model, grammars)
+        spotter = self._new_spotter(model) if self._wake is not None else None
+        self._swap_deadline = perf_counter() + timeout
+        self._next_model = (model, grammars, full_rec, grammar_recs, spotter)
+
+    def _apply_model(self) -> None:
+        """Переключает распознаватель на новую модель (в потоке прослушивания)."""
+        (model, grammars, full_rec, grammar_recs, spotter), self._next_model = self._next_model, None
+        self._model = model
+        self._grammars = grammars
+        self._full_rec = full_rec
+        self._grammar_recs = grammar_recs
+        if self._grammar is None:
+            self._rec = full_rec
+        else:
+            rec = grammar_recs.get(self._grammar.digest)
+            if rec is None:
+                rec = grammar_recs[self._grammar.digest] = self._new_recognizer(self._grammar)
+            self._rec = rec
+        self._in_speech = False
+        if self._vad is not None:
+            self._vad.reset()
+        if self._wake is not None:
+            self._wake.bind(spotter)
+        self.model_swaps_total += 1
+        self._log.info("Источник [%s]: распознаватель переключён на новую модель", self._source_id)
+
+    def _at_phrase_boundary(self) -> bool:
+        """Можно ли сейчас заменить распознаватель, не разрывая фразу."""
+        if self._vad is not None and not self._in_speech:
+            return True
+        return perf_counter() >= self._swap_deadline
 
     def q_clear(self) -> None:
         """Очищает внутреннюю очередь аудиоданных."""
-        with self._q.mutex:
-            self._q.queue.clear()
+        self._q.clear()
 
     def q_callback(self, indata, frames, time, status) -> None:
         """
@@ -62,56 +349,360 @@ class Speech2Text:
         :param status: статус потока (предупреждения/ошибки)
         """
         if status:
-            self._log.warning(status)
-        self._q.put(bytes(indata))
+            if status.input_overflow:
+                self._input_overflows += 1
+            # Прореживается фильтром логгера (STT_LOG_SAMPLING): при перегрузке предупреждения идут каждый блок
+            self._log.warning("Источник [%s]: %s", self._source_id, status)
+        started = perf_counter()
+        if self._muted_until:
+            if started < self._muted_until:
+                self._muted_blocks += 1
+                return
+            # Время заглушения истекло
+            self._muted_until = 0.0
+        # Копируем буфер PortAudio сразу в заранее выделенный слот
+        # (в режиме процессов — в разделяемую память рабочего процесса)
+        target = self._remote if self._remote is not None else self._q
+        if self._preprocessor is not None:
+            # Родной формат устройства → моно 16 бит с частотой распознавателя
+            block = self._preprocessor.process(indata)
+        elif self._channel:
+            # Из чередующихся сэмплов берём только свой канал (срез без копирования)
+            block = np.frombuffer(indata, dtype=np.int16)[self._channel::self._channel + 1]
+        else:
+            block = indata
+        if self._history is not None:
+            # До очереди: момент записи в историю не позже момента поступления в очередь
+            self._history.write(block)
+        target.put(block)
+        self._observe("callback", perf_counter() - started)
 
-    def pause(self) -> None:
-        """Приостанавливает прослушивание."""
-        self._is_active = False
+    def pause(self, seconds: Optional[float] = None) -> None:
+        """
+        Заглушает источник (например, пока говорит синтезатор речи).
+
+        Входной поток остаётся открытым, а аудио-коллбэк сразу отбрасывает
+        новые блоки, поэтому возобновление не переоткрывает устройство.
+        Звук, записанный до заглушения, распознаётся, и его фраза закрывается,
+        чтобы не склеиться с речью после возобновления.
+
+        :param seconds: через сколько секунд возобновить прослушивание
+                        (None — до вызова `continue_listen`)
+        """
+        self._muted_until = perf_counter() + seconds if seconds is not None else float("inf")
+        if self._remote is not None:
+            self._backend.end_phrase(self._remote)
+        else:
+            self._close_phrase = True
+        self._log.info(
+            "Источник [%s]: заглушён%s", self._source_id, f" на {seconds:g} с" if seconds is not None else "",
+        )
 
     def continue_listen(self) -> None:
+        """Возобновляет прослушивание заглушённого источника."""
+        self._muted_until = 0.0
+        self._log.info("Источник [%s]: прослушивание возобновлено", self._source_id)
+
+    def _phrase_result(self, flush: bool = False) -> Dict[str, Any]:
         """
-        Пропускает накопленные данные и возобновляет прослушивание.
+        Забирает результат фразы у распознавателя, учитывая время этапов.
+
+        :param flush: закрыть фразу принудительно (FinalResult), а не по решению Kaldi
+        :return: результат Vosk
         """
-        result = json.loads(self._rec.Result())
-        self._log.info("Пропущено: %s", result.get("text", ""))
-        self.q_clear()
-        self._is_active = True
+        started = perf_counter()
+        raw = self._rec.FinalResult() if flush else self._rec.Result()
+        finalized = perf_counter()
+        result = json.loads(raw)
+        self._observe("finalize", finalized - started)
+        self._observe("parse", perf_counter() - finalized)
+        return result
+
+    def _recognize(self, data: memoryview) -> Optional[Dict[str, Any]]:
+        """
+        Передаёт блок аудио распознавателю, пропуская тишину через VAD.
+
+        :param data: блок PCM (слот кольцевого буфера)
+        :return: результат Vosk для завершённой фразы или None
+        """
+        if self._vad is not None:
+            if not self._vad.is_speech(data):
+                if not self._in_speech:
+                    return None
+                # Речь закончилась — закрываем фразу, не дожидаясь паузы в Kaldi
+                self._in_speech = False
+                self._vad.reset()
+                return self._phrase_result(flush=True)
+            self._in_speech = True
+
+        if self._wake is not None and not self._wake.awake:
+            # Полный словарь спит: звук слушает только распознаватель слова активации
+            preroll = self._wake.listen(data)
+            if preroll is None:
+                return None
+            self._log.info("Источник [%s]: услышано слово активации", self._source_id)
+            data = preroll
+
+        if self._phrase_start is None:
+            self._phrase_start = self._q.held_timestamp
+        started = perf_counter()
+        is_final = self._rec.AcceptWaveform(as_waveform(data))
+        accepted = perf_counter() - started
+        self.accept_seconds.observe(accepted)
+        self._stage_last["accept"] = accepted
+        if self._wake is not None and self._wake.elapse(data):
+            # Окно после слова активации закончилось — закрываем фразу
+            self._in_speech = False
+            if self._vad is not None:
+                self._vad.reset()
+            return self._phrase_result(flush=not is_final)
+        if is_final:
+            return self._phrase_result()
+        return None
+
+    def _make_result(self, result: Dict[str, Any]) -> Optional[SttResult]:
+        """
+        Собирает результат фразы из ответа Vosk.
+
+        :param result: результат Vosk
+        :return: фраза с метаданными или None, если текст пустой
+        """
+        text = result.get("text", "")
+        if self._grammar is not None:
+            text = strip_unknown(text)
+        if not text.strip():
+            return None
+
+        words = confidence = None
+        if self._words and "result" in result:
+            words = [SttWord.from_vosk(item) for item in result["result"] if item["word"] != UNKNOWN_WORD]
+            if words:
+                confidence = sum(word.conf for word in words) / len(words)
+                # Отсекаем шум до опознавания говорящего и разбора времени
+                if confidence < self._min_confidence:
+                    self.low_confidence_total += 1
+                    self._log.debug("Источник [%s]: фраза отброшена (%.2f): %s", self._source_id, confidence, text)
+                    return None
+
+        stt_result = SttResult(
+            text,
+            source=self._source_id,
+            grammar=self._grammar.name if self._grammar is not None else None,
+            confidence=confidence,
+            words=words,
+        )
+        if self._speaker_id is not None:
+            stt_result.speaker, stt_result.speaker_score = self._speaker_id.identify(result.get("spk"))
+        if self._time_parser is not None:
+            stt_result.time, stt_result.duration = self._time_parser.parse(text)
+        return stt_result
+
+    def _end_phrase(self, stamp: float) -> float:
+        """
+        Закрывает отсчёт звука фразы.
+
+        :param stamp: момент поступления блока, завершившего фразу
+        :return: момент поступления первого блока фразы
+        """
+        start, self._phrase_start = self._phrase_start, None
+        return start if start is not None else stamp
+
+    def _local_results(self, stream: Any) -> Generator[Tuple[Dict[str, Any], float, float], None, None]:
+        """
+        Распознаёт блоки из очереди в этом потоке.
+
+        :param stream: открытый входной поток
+        :yields: тройки (результат Vosk, моменты поступления блока, завершившего фразу,
+                 и первого блока фразы)
+        """
+        while self._is_active:
+            if self._next_grammar is not None:
+                self._apply_grammar()
+            if self._close_phrase and not len(self._q):
+                # Звук до заглушения разобран: закрываем его фразу
+                self._close_phrase = False
+                self._in_speech = False
+                if self._vad is not None:
+                    self._vad.reset()
+                stamp = perf_counter()
+                result = json.loads(self._rec.FinalResult())
+                yield result, stamp, self._end_phrase(stamp)
+            data = self._q.get(timeout=0.5)
+            if data is not None:
+                self._observe("queue_wait", perf_counter() - self._q.held_timestamp)
+            if data is None and getattr(stream, "error", None) is not None:
+                # Чтение источника упало: прослушивание откроет его заново
+                raise stream.error
+            if data is None and getattr(stream, "finished", False):
+                # Источник закончился (конец файла): закрываем фразу и завершаем прослушивание
+                self._is_active = False
+                stamp = perf_counter()
+                yield json.loads(self._rec.FinalResult()), stamp, self._end_phrase(stamp)
+                return
+            result = self._recognize(data) if data is not None else None
+            if self._next_model is not None and (
+                data is None or result is not None or self._at_phrase_boundary()
+            ):
+                if result is None:
+                    # Закрываем фразу прежней моделью, чтобы не потерять её аудио
+                    result = json.loads(self._rec.FinalResult())
+                self._apply_model()
+            if result:
+                stamp = self._q.held_timestamp if data is not None else perf_counter()
+                yield result, stamp, self._end_phrase(stamp)
+
+    def _remote_results(self, stream: Any) -> Generator[Tuple[Dict[str, Any], float, float], None, None]:
+        """
+        Забирает результаты рабочего процесса, которому аудио-коллбэк передаёт блоки.
+
+        :param stream: открытый входной поток
+        :yields: тройки (результат Vosk, моменты поступления блока, завершившего фразу,
+                 и первого блока фразы)
+        """
+        while self._is_active:
+            if self._next_grammar is not None:
+                self._apply_grammar()
+            if self._next_model is not None:
+                # Границу фразы для замены модели выбирает рабочий процесс
+                self._apply_model()
+            try:
+                payload, stamp, start = self._remote.results.get(timeout=0.5)
+            except queue.Empty:
+                if getattr(stream, "error", None) is not None and not len(self._remote.ring):
+                    raise stream.error
+                if getattr(stream, "finished", False) and not len(self._remote.ring):
+                    # Источник закончился и рабочий процесс разобрал всё аудио
+                    self._is_active = False
+                continue
+            parse_started = perf_counter()
+            result = json.loads(payload)
+            self._observe("parse", perf_counter() - parse_started)
+            yield result, stamp, start
 
-    def listen(self) -> Generator[str, None, None]:
+    def listen(self) -> Generator[SttResult, None, None]:
         """
         Генератор: возвращает распознанные фразы по мере их появления.
 
-        :yields: текстовые строки
+        :yields: результаты распознавания
         """
+        input_stream = self._input_stream or sd.RawInputStream
+        if self._preprocessor is not None:
+            samplerate = self._preprocessor.input_rate
+            blocksize = self._preprocessor.block_frames
+            channels = self._preprocessor.channels
+        else:
+            samplerate, blocksize, channels = self._samplerate, self._blocksize, self._channel + 1
+        if self._backend is not None and self._remote is None:
+            self._remote = self._backend.open_stream(
+                self._source_id,
+                self._samplerate,
+                block_bytes=self._blocksize * 2,
+                capacity=self._q.capacity,
+                vad=self._vad,
+                wake=self._wake,
+            )
         while self._is_active:
             try:
-                with sd.RawInputStream(
-                    samplerate=self._samplerate,
-                    blocksize=16000,
+                with input_stream(
+                    samplerate=samplerate,
+                    blocksize=blocksize,
                     device=self._sound_device_index,
                     dtype="int16",
-                    channels=1,
+                    channels=channels,
                     callback=self.q_callback,
-                ):
-                    while self._is_active:
-                        data = self._q.get()
-                        if self._rec.AcceptWaveform(data):
-                            text = json.loads(self._rec.Result())["text"]
-                            if text.strip():
-                                self._log.info(f"STT module detected text: {text}")
-                                yield text
+                ) as stream:
+                    results = self._remote_results(stream) if self._remote is not None else self._local_results(stream)
+                    for result, stamp, start in results:
+                        started = perf_counter()
+                        stt_result = self._make_result(result)
+                        if stt_result is not None:
+                            self._observe("postprocess", perf_counter() - started)
+                            if self._history is not None:
+                                # Переводим в номера сэмплов сразу, пока блоки фразы в индексе истории
+                                span = self._history.span(start, stamp)
+                                if span is not None:
+                                    stt_result.audio_start, stt_result.audio_end = span
+                            self.phrases_total += 1
+                            latency = perf_counter() - stamp
+                            self.latency_seconds.observe(latency)
+                            # Разбивка задержки фразы (в режиме процессов этапы распознавателя не видны)
+                            timings = {
+                                stage: self._stage_last[stage]
+                                for stage in ("queue_wait", "accept", "finalize", "parse", "postprocess")
+                                if self._stage_last[stage] is not None
+                            }
+                            timings["total"] = latency
+                            self.last_phrase_timings = timings
+                            self._log.info("STT module [%s] detected text: %s", self._source_id, stt_result.text)
+                            yield stt_result
             except Exception as e:
                 self._log.exception("Ошибка в процессе распознавания: %s", e)
                 self._healthcheck = "BAD"
+                self.restarts_total += 1
                 sleep(1)
 
+        if self._remote is not None:
+            self._backend.close_stream(self._remote)
+            self._remote = None
+
+    def phrase_audio(self, start: int, end: int) -> Optional[np.ndarray]:
+        """
+        Возвращает звук фразы из истории источника.
+
+        :param start: номер первого сэмпла (audio_start результата)
+        :param end: номер сэмпла после конца фразы (audio_end результата)
+        :return: сэмплы int16 с частотой распознавателя или None, если звук уже вытеснен
+        """
+        if self._history is None:
+            return None
+        return self._history.read(start, end)
+
     def close(self) -> None:
         """Останавливает прослушивание и освобождает ресурсы."""
         self._is_active = False
         self._healthcheck = "BAD"
         self._log.info("STT module CLOSED")
 
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики работы движка.
+
+        :return: словарь со статистикой
+        """
+        remote = self._remote
+        stats: Dict[str, Any] = {
+            "audio_queue": {
+                **(remote.ring.stats() if remote is not None else self._q.stats()),
+                "blocksize_ms": self._blocksize * 1000 / self._samplerate,
+                "input_overflows": self._input_overflows,
+            },
+            "phrases": self.phrases_total,
+            "low_confidence_dropped": self.low_confidence_total,
+            "restarts": self.restarts_total,
+            "model_swaps": self.model_swaps_total,
+            "grammar": self._grammar.name if self._grammar is not None else None,
+            "muted": self.muted,
+            "muted_blocks": self._muted_blocks,
+            "last_phrase_timings": self.last_phrase_timings,
+        }
+        if self._preprocessor is not None:
+            stats["preprocess"] = self._preprocessor.stats()
+        if self._history is not None:
+            stats["audio_history"] = self._history.stats()
+        if remote is not None:
+            # Детектор речи и распознаватель работают в рабочем процессе
+            stats["worker"] = remote.worker
+            if "vad" in remote.remote_stats:
+                stats["vad"] = remote.remote_stats["vad"]
+            if "wake" in remote.remote_stats:
+                stats["wake"] = remote.remote_stats["wake"]
+        else:
+            if self._vad is not None:
+                stats["vad"] = self._vad.stats()
+            if self._wake is not None:
+                stats["wake"] = self._wake.stats()
+        return stats
+
     def healthcheck(self) -> str:
         """
         Возвращает состояние сервиса.
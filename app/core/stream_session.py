@@ -0,0 +1,209 @@
+"""
+Потоковое распознавание речи через WebSocket.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+import vosk
+from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.grammar import Grammar, GrammarRegistry
+from app.core.logger import get_logger
+
+
+class StreamSession:
+    """
+    Сеанс распознавания для одного WebSocket-соединения.
+
+    Клиент присылает бинарные кадры PCM (int16, mono), сервер отвечает JSON
+    от Vosk: `{"partial": ...}` по ходу фразы и `{"text": ...}` в её конце.
+    Текстовое сообщение `{"eof": 1}` завершает поток, а `{"grammar": "имя"}`
+    (или `null`) переключает командный режим: текущая фраза закрывается,
+    и следующие кадры распознаются по новой грамматике.
+
+    У каждого соединения свой распознаватель поверх общей модели и свои
+    ограниченные очереди: медленный клиент тормозит только себя. Все вызовы
+    Vosk, включая создание распознавателей и сборку графа грамматики,
+    выполняются в пуле потоков, а не в цикле событий.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        model: vosk.Model,
+        samplerate: int = 16000,
+        queue_size: int = 32,
+        grammars: Optional[GrammarRegistry] = None,
+        grammar: Optional[Grammar] = None,
+    ) -> None:
+        """
+        Инициализация сеанса.
+
+        :param model: загруженная модель Vosk (общая для всех соединений)
+        :param samplerate: частота дискретизации входящего аудио
+        :param queue_size: максимальное число кадров в очереди соединения
+        :param grammars: реестр грамматик для командного режима
+        :param grammar: начальная грамматика (None — полный словарь)
+        """
+        self._model = model
+        self._samplerate = samplerate
+        self._grammars = grammars
+        self._grammar: Optional[Grammar] = None
+        self._initial_grammar = grammar
+        # Распознаватели создаются в `run`, в пуле потоков
+        self._rec: Any = None
+        self._full_rec: Any = None
+        # Кадры аудио и управляющие сообщения идут в одной очереди, чтобы сохранить порядок
+        self._incoming: asyncio.Queue[Union[bytes, Dict[str, Any], None]] = asyncio.Queue(maxsize=queue_size)
+        self._outgoing: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=queue_size)
+        self._last_partial = ""
+        # Последний вызов распознавателя в пуле потоков: отмена задачи его не прерывает
+        self._busy: Optional[asyncio.Future] = None
+        self.dropped_partials = 0
+
+    async def run(self, websocket: WebSocket) -> None:
+        """
+        Обслуживает соединение до его закрытия клиентом.
+
+        :param websocket: принятое WebSocket-соединение
+        """
+        tasks = []
+        try:
+            # Сборка графа грамматики может занять заметное время — не в цикле событий
+            await self._call(self._open)
+            tasks = [
+                asyncio.create_task(self._receive(websocket)),
+                asyncio.create_task(self._decode()),
+                asyncio.create_task(self._send(websocket)),
+            ]
+            done, _ = await asyncio.wait(tasks[1:], return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    self._log.warning("Ошибка потокового распознавания: %s", error)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Освобождение доводится до конца, даже если сам `run` отменён
+            await asyncio.shield(self._release())
+            if self.dropped_partials:
+                self._log.info("Пропущено промежуточных результатов: %d", self.dropped_partials)
+
+    async def _receive(self, websocket: WebSocket) -> None:
+        """
+        Читает кадры из сокета. Когда очередь полна, чтение приостанавливается,
+        и клиент упирается в TCP-окно — это и есть обратное давление.
+        """
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    await self._incoming.put(message["bytes"])
+                elif message.get("text"):
+                    control = json.loads(message["text"])
+                    if not isinstance(control, dict):
+                        raise ValueError("Управляющее сообщение должно быть JSON-объектом")
+                    if control.get("eof"):
+                        break
+                    if "grammar" in control:
+                        await self._incoming.put(control)
+        except (WebSocketDisconnect, ValueError) as e:
+            self._log.warning("Соединение закрыто с ошибкой: %s", e)
+        finally:
+            await self._incoming.put(None)
+
+    async def _decode(self) -> None:
+        """
+        Подаёт кадры в распознаватель в пуле потоков и ставит результаты на отправку.
+        """
+        while True:
+            data = await self._incoming.get()
+            if data is None:
+                await self._outgoing.put(await self._call(self._rec.FinalResult))
+                await self._outgoing.put(None)
+                return
+
+            if isinstance(data, dict):
+                # Закрываем текущую фразу по старой грамматике и переключаемся
+                await self._outgoing.put(await self._call(self._rec.FinalResult))
+                self._last_partial = ""
+                name = data["grammar"]
+                if name and (self._grammars is None or name not in self._grammars.names):
+                    error = f"Неизвестная грамматика: {name}"
+                    await self._outgoing.put(json.dumps({"error": error}, ensure_ascii=False))
+                    continue
+                grammar = self._grammars.get(name) if name else None
+                await self._call(self._switch_grammar, grammar)
+                continue
+
+            if await self._call(self._rec.AcceptWaveform, data):
+                self._last_partial = ""
+                # Итоговые фразы не теряем: ждём, пока отправитель освободит место
+                await self._outgoing.put(await self._call(self._rec.Result))
+                continue
+
+            partial = await self._call(self._rec.PartialResult)
+            if partial == self._last_partial:
+                continue
+            self._last_partial = partial
+            try:
+                # Промежуточный результат устаревает быстро — если клиент не
+                # успевает читать, просто пропускаем его
+                self._outgoing.put_nowait(partial)
+            except asyncio.QueueFull:
+                self.dropped_partials += 1
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет блокирующий вызов распознавателя в пуле потоков.
+
+        :param method: метод распознавателя (или `_switch_grammar`)
+        :param args: аргументы вызова
+        :return: результат вызова
+        """
+        self._busy = asyncio.get_running_loop().run_in_executor(None, method, *args)
+        # shield: при отмене задачи `_busy` остаётся незавершённым, пока поток не закончит вызов
+        return await asyncio.shield(self._busy)
+
+    async def _release(self) -> None:
+        """Возвращает грамматический распознаватель в общий пул, когда поток его отпустил."""
+        if self._busy is not None:
+            await asyncio.wait({self._busy})
+        await self._call(self._switch_grammar, None)
+
+    def _open(self) -> None:
+        """Создаёт распознаватель полного словаря и, если задана, берёт начальную грамматику."""
+        self._rec = self._full_rec = vosk.KaldiRecognizer(self._model, self._samplerate)
+        if self._initial_grammar is not None:
+            self._switch_grammar(self._initial_grammar)
+
+    def _switch_grammar(self, grammar: Optional[Grammar]) -> None:
+        """
+        Меняет распознаватель: грамматический берётся из пула реестра, прежний возвращается туда.
+
+        :param grammar: грамматика или None для полного словаря
+        """
+        if self._grammar is not None:
+            self._grammars.release(self._grammar, self._samplerate, self._rec)
+        if grammar is None:
+            self._rec = self._full_rec
+        else:
+            self._rec = self._grammars.recognizer(grammar, self._samplerate)
+        self._grammar = grammar
+
+    async def _send(self, websocket: WebSocket) -> None:
+        """Отправляет результаты клиенту, пока не встретит маркер конца."""
+        while True:
+            message = await self._outgoing.get()
+            if message is None:
+                await websocket.close()
+                return
+            await websocket.send_text(message)
@@ -0,0 +1,122 @@
+"""
+Результат распознавания одной фразы.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+
+class SttWord:
+    """
+    Слово фразы: время относительно начала потока распознавателя и уверенность Vosk.
+    """
+
+    __slots__ = ("word", "start", "end", "conf")
+
+    def __init__(self, word: str, start: float, end: float, conf: float) -> None:
+        """
+        Инициализация слова.
+
+        :param word: слово
+        :param start: начало слова в секундах
+        :param end: конец слова в секундах
+        :param conf: уверенность распознавания (0..1)
+        """
+        self.word = word
+        self.start = start
+        self.end = end
+        self.conf = conf
+
+    @classmethod
+    def from_vosk(cls, item: Dict[str, Any]) -> "SttWord":
+        """
+        Создаёт слово из элемента списка `result` ответа Vosk.
+
+        :param item: словарь с ключами word, start, end, conf
+        :return: слово
+        """
+        return cls(item["word"], item["start"], item["end"], item.get("conf", 1.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Возвращает поля слова.
+
+        :return: словарь {word, start, end, conf}
+        """
+        return {"word": self.word, "start": self.start, "end": self.end, "conf": self.conf}
+
+    def __repr__(self) -> str:
+        return f"SttWord({self.word!r}, {self.start:.2f}-{self.end:.2f}, conf={self.conf:.2f})"
+
+
+class SttResult:
+    """
+    Распознанная фраза с метаданными (источник, говорящий, грамматика,
+    найденные в тексте время и длительность, слова с таймингами и уверенность,
+    положение звука фразы в истории источника).
+    """
+
+    __slots__ = (
+        "text", "source", "speaker", "speaker_score", "grammar", "time", "duration", "confidence", "words",
+        "audio_start", "audio_end",
+    )
+
+    def __init__(
+        self,
+        text: str,
+        source: Optional[str] = None,
+        speaker: Optional[str] = None,
+        speaker_score: Optional[float] = None,
+        grammar: Optional[str] = None,
+        time: Optional[str] = None,
+        duration: Optional[int] = None,
+        confidence: Optional[float] = None,
+        words: Optional[List[SttWord]] = None,
+        audio_start: Optional[int] = None,
+        audio_end: Optional[int] = None,
+    ) -> None:
+        """
+        Инициализация результата.
+
+        :param text: распознанный текст
+        :param source: идентификатор источника звука
+        :param speaker: имя опознанного говорящего
+        :param speaker_score: косинусная близость к образцу голоса говорящего
+        :param grammar: имя грамматики, если фраза распознана в командном режиме
+        :param time: время суток из текста ("ЧЧ:ММ")
+        :param duration: длительность из текста в секундах («через пять минут» → 300)
+        :param confidence: средняя уверенность по словам фразы
+        :param words: слова с таймингами и уверенностью
+        :param audio_start: номер первого сэмпла фразы в истории звука источника
+        :param audio_end: номер сэмпла после конца фразы в истории звука источника
+        """
+        self.text = text
+        self.source = source
+        self.speaker = speaker
+        self.speaker_score = speaker_score
+        self.grammar = grammar
+        self.time = time
+        self.duration = duration
+        self.confidence = confidence
+        self.words = words
+        self.audio_start = audio_start
+        self.audio_end = audio_end
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Возвращает заполненные поля результата.
+
+        :return: словарь без пустых полей
+        """
+        fields = {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if getattr(self, name) is not None
+        }
+        if self.words is not None:
+            fields["words"] = [word.to_dict() for word in self.words]
+        return fields
+
+    def __repr__(self) -> str:
+        return f"SttResult({self.to_dict()!r})"
@@ -0,0 +1,277 @@
+"""
+Разбор выражений времени в распознанных фразах («без десяти пять», «через двадцать минут»).
+"""
+
+from __future__ import annotations
+
+import json
+from array import array
+from typing import List, Optional, Tuple
+
+from app.core.logger import get_logger
+
+
+# Роли слов словаря
+OTHER = 0
+NUMBER = 1          # количественное числительное: value — число
+HOUR_UNIT = 2       # час, часа, часов...
+MINUTE_UNIT = 3     # минута, минут, минутку...
+AFTER = 4           # «через»
+LATER = 5           # «спустя»
+EXACT = 6           # «ровно»
+WITHOUT = 7         # «без»
+QUARTER = 8         # «четверть», «четверти»
+HALF = 9            # «пол» (отдельным словом)
+HALF_HOUR = 10      # «полчаса»
+ORDINAL = 11        # «одиннадцатого»: value — номер часа
+HALF_PAST = 12      # «полпятого»: value — минуты от полуночи
+FIXED_TIME = 13     # «полдень», «полночь»: value — минуты от полуночи
+
+# Значения слов; в таблицу попадают только слова, которые есть в словаре модели
+_WORD_ROLES = {
+    "ноль": (NUMBER, 0),
+    "один": (NUMBER, 1), "одну": (NUMBER, 1), "одной": (NUMBER, 1),
+    "два": (NUMBER, 2), "двух": (NUMBER, 2), "пару": (NUMBER, 2),
+    "три": (NUMBER, 3), "трех": (NUMBER, 3), "трёх": (NUMBER, 3), "тройку": (NUMBER, 3),
+    "четыре": (NUMBER, 4),
+    "пять": (NUMBER, 5), "пяти": (NUMBER, 5),
+    "шесть": (NUMBER, 6),
+    "семь": (NUMBER, 7),
+    "восемь": (NUMBER, 8),
+    "девять": (NUMBER, 9),
+    "десять": (NUMBER, 10), "десяти": (NUMBER, 10),
+    "одиннадцать": (NUMBER, 11),
+    "двенадцать": (NUMBER, 12),
+    "тринадцать": (NUMBER, 13),
+    "четырнадцать": (NUMBER, 14),
+    "пятнадцать": (NUMBER, 15), "пятнадцати": (NUMBER, 15),
+    "шестнадцать": (NUMBER, 16),
+    "семнадцать": (NUMBER, 17),
+    "восемнадцать": (NUMBER, 18),
+    "девятнадцать": (NUMBER, 19),
+    "двадцать": (NUMBER, 20), "двадцати": (NUMBER, 20),
+    "тридцать": (NUMBER, 30),
+    "сорок": (NUMBER, 40),
+    "пятьдесят": (NUMBER, 50),
+    "час": (HOUR_UNIT, 0), "часа": (HOUR_UNIT, 0), "часов": (HOUR_UNIT, 0),
+    "часик": (HOUR_UNIT, 0), "часика": (HOUR_UNIT, 0), "часиков": (HOUR_UNIT, 0), "часок": (HOUR_UNIT, 0),
+    "минута": (MINUTE_UNIT, 0), "минуты": (MINUTE_UNIT, 0), "минут": (MINUTE_UNIT, 0),
+    "минуту": (MINUTE_UNIT, 0), "минутка": (MINUTE_UNIT, 0), "минутку": (MINUTE_UNIT, 0),
+    "минутки": (MINUTE_UNIT, 0), "минуток": (MINUTE_UNIT, 0),
+    "через": (AFTER, 0),
+    "спустя": (LATER, 0),
+    "ровно": (EXACT, 0),
+    "без": (WITHOUT, 0),
+    "четверть": (QUARTER, 15), "четверти": (QUARTER, 15),
+    "пол": (HALF, 30),
+    "полчаса": (HALF_HOUR, 30),
+    "первого": (ORDINAL, 1), "второго": (ORDINAL, 2), "третьего": (ORDINAL, 3),
+    "четвертого": (ORDINAL, 4), "пятого": (ORDINAL, 5), "шестого": (ORDINAL, 6),
+    "седьмого": (ORDINAL, 7), "восьмого": (ORDINAL, 8), "девятого": (ORDINAL, 9),
+    "десятого": (ORDINAL, 10), "одиннадцатого": (ORDINAL, 11), "двенадцатого": (ORDINAL, 12),
+    "полдень": (FIXED_TIME, 12 * 60),
+    "полночь": (FIXED_TIME, 0),
+}
+
+# «полпервого» … «полдвенадцатого»: половина часа перед названным
+_HALF_PAST_PREFIX = "пол"
+_ORDINAL_HOURS = {word: value for word, (role, value) in _WORD_ROLES.items() if role == ORDINAL}
+
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _role(word: str) -> Tuple[int, int]:
+    known = _WORD_ROLES.get(word)
+    if known is not None:
+        return known
+    ordinal = word[len(_HALF_PAST_PREFIX):]
+    if word.startswith(_HALF_PAST_PREFIX) and ordinal in _ORDINAL_HOURS:
+        hour = _ORDINAL_HOURS[ordinal]
+        return HALF_PAST, ((hour - 1) * 60 + 30) % _MINUTES_PER_DAY
+    return OTHER, 0
+
+
+def format_time(minutes: int) -> str:
+    """
+    Форматирует время суток.
+
+    :param minutes: минуты от полуночи
+    :return: строка "ЧЧ:ММ"
+    """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TimeParser:
+    """
+    Находит в фразе время суток и длительность.
+
+    Словарь (`time_parser_stoi.json`: слово → номер) при загрузке
+    превращается в две плоские таблицы по номеру слова — роль и значение,
+    поэтому разбор фразы — это поиск слов в словаре и проход конечного
+    автомата по массиву ролей, без регулярных выражений и выделения
+    объектов. Слова вне словаря считаются `<unk>`.
+
+    Понимает, например: «двадцать часов тридцать минут» → 20:30,
+    «без десяти пять» → 04:50, «полпятого» → 04:30, «четверть одиннадцатого»
+    → 10:15, «полдень» → 12:00, «через двадцать минут» → 1200 с,
+    «через полчаса» → 1800 с, «через час тридцать» → 5400 с.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(self, vocabulary_path: str) -> None:
+        """
+        Загрузка словаря и построение таблиц.
+
+        :param vocabulary_path: путь к `time_parser_stoi.json`
+        """
+        with open(vocabulary_path, "r", encoding="utf-8") as f:
+            stoi = json.load(f)
+
+        self._stoi = stoi
+        self._unk = stoi.get("<unk>", 0)
+        size = max(stoi.values()) + 1
+        self._roles = bytearray(size)
+        self._values = array("h", bytes(2 * size))
+        for word, index in stoi.items():
+            self._roles[index], self._values[index] = _role(word)
+
+        # Фразы без единого значимого слова отсеиваются сразу
+        self._useful = frozenset(word for word, index in stoi.items() if self._roles[index] != OTHER)
+        self._log.info(
+            "Словарь разбора времени: %d слов, из них значимых: %d", len(stoi), len(self._useful)
+        )
+
+    def parse(self, text: str) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Разбирает фразу.
+
+        :param text: распознанный текст
+        :return: пара (время "ЧЧ:ММ" или None, длительность в секундах или None)
+        """
+        words = text.lower().split()
+        if not any(word in self._useful for word in words):
+            return None, None
+
+        stoi, unk = self._stoi, self._unk
+        ids = [stoi.get(word, unk) for word in words]
+        roles = [self._roles[i] for i in ids]
+        values = [self._values[i] for i in ids]
+
+        time: Optional[int] = None
+        duration: Optional[int] = None
+        pos = 0
+        while pos < len(roles):
+            role = roles[pos]
+            if role in (AFTER, LATER) and duration is None:
+                seconds, end = self._duration(roles, values, pos + 1)
+                if seconds:
+                    duration, pos = seconds, end
+                    continue
+            elif role in (NUMBER, HALF_HOUR, QUARTER, HALF, HOUR_UNIT, MINUTE_UNIT) and duration is None:
+                # «пять минут спустя»
+                seconds, end = self._duration(roles, values, pos)
+                if seconds and end < len(roles) and roles[end] == LATER:
+                    duration, pos = seconds, end + 1
+                    continue
+            if time is None:
+                minutes, end = self._time(roles, values, pos)
+                if minutes is not None:
+                    time, pos = minutes, end
+                    continue
+            pos += 1
+
+        return (format_time(time) if time is not None else None), duration
+
+    @staticmethod
+    def _number(roles: List[int], values: List[int], pos: int) -> Tuple[Optional[int], int]:
+        """Читает число («двадцать пять» → 25)."""
+        if pos >= len(roles) or roles[pos] != NUMBER:
+            return None, pos
+        value = values[pos]
+        pos += 1
+        if value in (20, 30, 40, 50) and pos < len(roles) and roles[pos] == NUMBER and values[pos] < 10:
+            value += values[pos]
+            pos += 1
+        return value, pos
+
+    def _duration(self, roles: List[int], values: List[int], pos: int) -> Tuple[int, int]:
+        """Читает длительность («два часа пятнадцать минут», «полчаса», «минутку»)."""
+        total = 0
+        while pos < len(roles):
+            role = roles[pos]
+            if role == HALF_HOUR:
+                total += 30 * 60
+                pos += 1
+                continue
+            if role in (QUARTER, HALF) and pos + 1 < len(roles) and roles[pos + 1] == HOUR_UNIT:
+                total += values[pos] * 60
+                pos += 2
+                continue
+
+            count, end = self._number(roles, values, pos)
+            unit = roles[end] if end < len(roles) else OTHER
+            if unit == HOUR_UNIT:
+                total += (1 if count is None else count) * 3600
+            elif unit == MINUTE_UNIT:
+                total += (1 if count is None else count) * 60
+            elif count is not None and total:
+                # «через час тридцать» — минуты без слова «минут»
+                total += count * 60
+                pos = end
+                break
+            else:
+                break
+            pos = end + 1
+        return total, pos
+
+    def _time(self, roles: List[int], values: List[int], pos: int) -> Tuple[Optional[int], int]:
+        """Читает время суток, начиная с позиции `pos`."""
+        if roles[pos] == EXACT:
+            pos += 1
+            if pos >= len(roles):
+                return None, pos
+        role = roles[pos]
+        nxt = roles[pos + 1] if pos + 1 < len(roles) else OTHER
+
+        if role in (FIXED_TIME, HALF_PAST):
+            return values[pos], pos + 1
+
+        if role in (HALF, QUARTER) and nxt == ORDINAL:
+            return ((values[pos + 1] - 1) * 60 + values[pos]) % _MINUTES_PER_DAY, pos + 2
+
+        if role == WITHOUT:
+            # «без десяти (минут) пять (часов)», «без четверти двенадцать»
+            if nxt == QUARTER:
+                before, end = values[pos + 1], pos + 2
+            else:
+                before, end = self._number(roles, values, pos + 1)
+            if before is None or before >= 60:
+                return None, pos
+            if end < len(roles) and roles[end] == MINUTE_UNIT:
+                end += 1
+            hour, end = self._number(roles, values, end)
+            if hour is None or hour > 24:
+                return None, pos
+            if end < len(roles) and roles[end] == HOUR_UNIT:
+                end += 1
+            return (hour * 60 - before) % _MINUTES_PER_DAY, end
+
+        hour, end = self._number(roles, values, pos)
+        if hour is None or hour > 24:
+            return None, pos
+        has_unit = end < len(roles) and roles[end] == HOUR_UNIT
+        if has_unit:
+            end += 1
+        minutes, after = self._number(roles, values, end)
+        minute_unit = after < len(roles) and roles[after] == MINUTE_UNIT
+        # Без «часов» число минут принимается только в форме «восемь тридцать»,
+        # иначе «три два один» превратилось бы во время
+        if minutes is not None and minutes < 60 and (has_unit or minute_unit or minutes >= 10):
+            end = after + 1 if minute_unit else after
+        elif not has_unit:
+            # Одиночное число без «часов» — не время
+            return None, pos
+        else:
+            minutes = 0
+        return (hour * 60 + minutes) % _MINUTES_PER_DAY, end
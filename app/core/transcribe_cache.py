@@ -0,0 +1,249 @@
+"""
+Кэш распознавания файлов и буферов по содержимому звука.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.logger import get_logger
+
+
+def model_fingerprint(path: str) -> str:
+    """
+    Отпечаток модели Vosk на диске: пути, размеры и время изменения её файлов.
+    Меняется при замене файлов модели, но не при перезапуске сервиса.
+
+    :param path: путь к каталогу модели
+    :return: шестнадцатеричный хэш
+    """
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8"))
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            rel = os.path.relpath(os.path.join(root, name), path)
+            digest.update(f"{rel}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscribeCache:
+    """
+    Результаты распознавания по хэшу PCM, частоте и модели.
+
+    Два уровня: LRU в памяти на `memory_items` результатов и, если задан
+    `disk_path`, каталог JSON-файлов не больше `disk_max_bytes` (при
+    переполнении удаляются файлы, к которым дольше всего не обращались).
+    Одинаковые запросы, пришедшие одновременно, распознаются один раз:
+    остальные ждут результата первого.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        memory_items: int = 256,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        """
+        Инициализация кэша.
+
+        :param memory_items: сколько результатов хранить в памяти
+        :param disk_path: каталог для результатов на диске (None — только память)
+        :param disk_max_bytes: предельный объём каталога на диске
+        """
+        self._memory_items = max(1, memory_items)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_path = disk_path
+        self._disk_max_bytes = disk_max_bytes
+        self._disk_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.skipped = 0
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @staticmethod
+    def key(pcm: bytes, samplerate: int, model: str) -> str:
+        """
+        Ключ результата.
+
+        :param pcm: аудиоданные (int16, mono)
+        :param samplerate: частота дискретизации
+        :param model: отпечаток модели (`model_fingerprint`)
+        :return: шестнадцатеричный хэш
+        """
+        digest = hashlib.sha256(f"{model}\n{samplerate}\n".encode("utf-8"))
+        digest.update(pcm)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._disk_path, key[:2], f"{key}.json")
+
+    def _disk_entries(self) -> Iterator[Tuple[str, int, float]]:
+        for root, _, files in os.walk(self._disk_path):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Ищет результат в памяти, затем на диске (найденный на диске поднимается в память).
+
+        :param key: ключ (`key`)
+        :return: результат распознавания или None
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+        if not self._disk_path:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            # Время изменения — время последнего обращения: по нему вытесняются старые файлы
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Сохраняет результат в памяти и на диске.
+
+        :param key: ключ (`key`)
+        :param result: результат распознавания
+        """
+        self._remember(key, result)
+        if not self._disk_path:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            self._log.warning("Не удалось сохранить результат в кэш %s: %s", path, e)
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            evict = self._disk_bytes > self._disk_max_bytes
+        if evict:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Удаляет самые давние файлы, пока каталог не станет меньше 90% предела."""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self._disk_max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        valid: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Возвращает результат из кэша или распознаёт и запоминает его.
+        Файлы читаются и пишутся в потоке, не блокируя цикл событий.
+
+        :param key: ключ (`key`)
+        :param compute: корутина-фабрика, распознающая звук
+        :param valid: проверка после распознавания; False — результат получен не той
+                      моделью, что в ключе, и не запоминается
+        :return: результат распознавания
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = self._inflight[key] = loop.create_future()
+        try:
+            result = await loop.run_in_executor(None, self.get, key) if self._disk_path else None
+            if result is None:
+                self.misses += 1
+                result = await compute()
+                if valid is not None and not valid():
+                    self.skipped += 1
+                elif self._disk_path:
+                    await loop.run_in_executor(None, self.put, key, result)
+                else:
+                    self.put(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ожидающих может не быть — не даём asyncio ругаться на непрочитанную ошибку
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики попаданий и заполненность кэша.
+
+        :return: словарь со счётчиками
+        """
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes if self._disk_path else None,
+        }
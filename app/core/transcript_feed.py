@@ -0,0 +1,108 @@
+"""
+Лента распознанных фраз с курсорами для множества подписчиков.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+
+class TranscriptFeed:
+    """
+    Ограниченный кольцевой буфер фраз с порядковыми номерами.
+
+    В отличие от очереди сообщений, чтение ничего не удаляет: каждый
+    подписчик хранит свой курсор (номер последней полученной фразы) и
+    читает в своём темпе. Старые фразы вытесняются по мере заполнения буфера.
+    Все методы вызываются из цикла событий.
+    """
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        """
+        Инициализация ленты.
+
+        :param maxlen: максимальное число хранимых фраз
+        """
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._seq = 0
+        self._waiters: Set[asyncio.Future] = set()
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последней опубликованной фразы (0 — фраз ещё не было)."""
+        return self._seq
+
+    @property
+    def first_seq(self) -> int:
+        """Номер самой старой фразы в буфере."""
+        return self._entries[0]["seq"] if self._entries else self._seq + 1
+
+    def publish(self, text: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Добавляет фразу в ленту и будит ожидающих подписчиков.
+
+        :param text: распознанный текст
+        :param fields: дополнительные поля записи
+        :return: добавленная запись
+        """
+        self._seq += 1
+        entry = {"seq": self._seq, "ts": time.time(), "text": text, **fields}
+        self._entries.append(entry)
+
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+        return entry
+
+    def since(self, cursor: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Возвращает фразы с номером больше курсора.
+
+        :param cursor: номер последней полученной подписчиком фразы
+        :param limit: максимальное число фраз в ответе
+        :return: список записей в порядке публикации
+        """
+        if cursor >= self._seq or not self._entries:
+            return []
+        # Номера идут подряд, поэтому позицию в буфере можно вычислить
+        start = max(0, cursor + 1 - self.first_seq)
+        end = len(self._entries) if limit is None else min(len(self._entries), start + limit)
+        return [self._entries[i] for i in range(start, end)]
+
+    def missed(self, cursor: int) -> int:
+        """
+        Сколько фраз подписчик пропустил, потому что они уже вытеснены из буфера.
+
+        :param cursor: курсор подписчика
+        :return: число потерянных фраз
+        """
+        return max(0, self.first_seq - cursor - 1)
+
+    async def wait(
+        self,
+        cursor: int,
+        timeout: float,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Долгий опрос: ждёт новых фраз после курсора не дольше `timeout` секунд.
+
+        :param cursor: номер последней полученной подписчиком фразы
+        :param timeout: максимальное время ожидания
+        :param limit: максимальное число фраз в ответе
+        :return: список новых записей (пустой по таймауту)
+        """
+        if cursor >= self._seq and timeout > 0:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters.discard(waiter)
+        return self.since(cursor, limit)
@@ -0,0 +1,262 @@
+"""
+Постоянное хранилище распознанных фраз с поиском по времени и по словам.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.logger import get_logger
+from app.core.transcript_feed import TranscriptFeed
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT,
+    text TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_ts ON transcripts (ts);
+"""
+
+# Полнотекстовый индекс только ссылается на строки transcripts (external content)
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5 (
+    text, content='transcripts', content_rowid='id', tokenize='unicode61'
+);
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class TranscriptStore:
+    """
+    Журнал фраз в SQLite: только добавление, индекс по времени и
+    инвертированный индекс слов (FTS5).
+
+    Фразы забираются из `TranscriptFeed` по курсору, как любым подписчиком,
+    и записываются пачками раз в `batch_window` секунд одной транзакцией
+    в отдельном потоке, поэтому ни поток распознавания, ни цикл событий
+    не ждут диска. Запросы выполняются в своём потоке по отдельному
+    соединению: в режиме WAL чтение не блокируется записью. Пачка, которую
+    не удалось записать, остаётся в очереди и повторяется при следующей
+    записи (не больше `max_pending` фраз; сверх этого старые теряются).
+
+    Если SQLite собран без FTS5, поиск по словам выполняется через LIKE.
+    """
+
+    _log = get_logger(__name__)
+
+    def __init__(
+        self,
+        path: str,
+        feed: TranscriptFeed,
+        batch_window: float = 0.5,
+        batch_size: int = 500,
+        max_pending: int = 10000,
+    ) -> None:
+        """
+        Открывает (или создаёт) базу фраз.
+
+        :param path: путь к файлу базы SQLite
+        :param feed: лента распознанных фраз
+        :param batch_window: сколько секунд копить фразы перед записью
+        :param batch_size: максимальное число фраз в одной транзакции
+        :param max_pending: сколько незаписанных фраз хранить до повторной записи
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._path = path
+        self._feed = feed
+        self._batch_window = batch_window
+        self._batch_size = batch_size
+        self._max_pending = max(batch_size, max_pending)
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        # Запись и чтение в разных потоках: запросы не ждут в очереди за пачками
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-store")
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-store-query")
+        self._writer = self._connect()
+        self._reader = self._connect()
+        self._writer.executescript(_SCHEMA)
+        try:
+            self._writer.executescript(_FTS_SCHEMA)
+            self._fts = True
+        except sqlite3.OperationalError as e:
+            self._log.warning("FTS5 недоступен, поиск по словам через LIKE: %s", e)
+            self._fts = False
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    async def start(self) -> None:
+        """Запускает фоновую запись новых фраз ленты."""
+        self._task = asyncio.create_task(self._collect(self._feed.last_seq))
+        self._log.info("Журнал фраз: %s", self._path)
+
+    async def stop(self) -> None:
+        """Останавливает запись, дописывает накопленное и закрывает базу."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._flush()
+        if self._pending:
+            self._log.error("Не записано в журнал при остановке: %d фраз", len(self._pending))
+        self._executor.shutdown(wait=True)
+        self._query_executor.shutdown(wait=True)
+        self._writer.close()
+        self._reader.close()
+
+    async def _collect(self, cursor: int) -> None:
+        """Забирает новые фразы из ленты и записывает их пачками."""
+        while True:
+            items = await self._feed.wait(cursor, timeout=60)
+            if not items:
+                # Новых фраз нет — повторяем запись пачек, не записанных раньше
+                await self._flush()
+                continue
+            # Первая фраза открывает окно: всё, что придёт за окно, уйдёт одной транзакцией
+            self._pending.extend(items)
+            cursor = items[-1]["seq"]
+            await asyncio.sleep(self._batch_window)
+            items = self._feed.since(cursor)
+            if items:
+                self._pending.extend(items)
+                cursor = items[-1]["seq"]
+            await self._flush()
+
+    async def _flush(self) -> None:
+        overflow = len(self._pending) - self._max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            self._log.error("Журнал не успевает записывать, потеряно фраз: %d", overflow)
+        while self._pending:
+            batch = self._pending[:self._batch_size]
+            del self._pending[:self._batch_size]
+            if not await asyncio.get_running_loop().run_in_executor(self._executor, self._write, batch):
+                # Пачка вернётся в начало очереди и будет записана при следующей попытке
+                self._pending[:0] = batch
+                self.failed_batches += 1
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        """
+        Записывает пачку фраз одной транзакцией (в потоке базы).
+
+        :param batch: записи ленты
+        :return: False, если транзакция не удалась
+        """
+        rows = [
+            (item["ts"], item.get("source"), item["text"], json.dumps(item, ensure_ascii=False))
+            for item in batch
+        ]
+        db = self._writer
+        try:
+            db.execute("BEGIN")
+            last_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM transcripts").fetchone()[0]
+            db.executemany("INSERT INTO transcripts (ts, source, text, data) VALUES (?, ?, ?, ?)", rows)
+            if self._fts:
+                db.execute(
+                    "INSERT INTO transcripts_fts (rowid, text) SELECT id, text FROM transcripts WHERE id > ?",
+                    (last_id,),
+                )
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            self._log.exception("Не удалось записать %d фраз в журнал", len(rows))
+            return False
+        self.written += len(rows)
+        self.batches += 1
+        return True
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        text: Optional[str] = None,
+        source: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ищет фразы за интервал времени, содержащие все слова запроса.
+
+        :param start: начало интервала (unix-время, включительно)
+        :param end: конец интервала (unix-время, включительно)
+        :param text: слова, которые должны встретиться во фразе
+        :param source: идентификатор источника звука
+        :param limit: максимальное число фраз в ответе
+        :return: записи ленты, от новых к старым
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("t.ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("t.ts <= ?")
+            params.append(end)
+        if source is not None:
+            conditions.append("t.source = ?")
+            params.append(source)
+
+        words = _WORD.findall(text or "")
+        tables = "transcripts t"
+        if words and self._fts:
+            tables += " JOIN transcripts_fts f ON f.rowid = t.id"
+            conditions.append("transcripts_fts MATCH ?")
+            # Каждое слово в кавычках: операторы FTS5 в запросе пользователя не действуют
+            params.append(" ".join(f'"{word}"' for word in words))
+        else:
+            for word in words:
+                conditions.append("t.text LIKE ?")
+                params.append(f"%{word}%")
+
+        sql = f"SELECT t.id, t.data FROM {tables}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY t.ts DESC LIMIT ?"
+        params.append(max(0, limit))
+
+        rows = self._reader.execute(sql, params).fetchall()
+        return [{**json.loads(data), "id": row_id} for row_id, data in rows]
+
+    async def query_async(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        """
+        Выполняет `query` в потоке чтения, не блокируя цикл событий и не дожидаясь записи пачек.
+
+        :param kwargs: аргументы `query`
+        :return: результат `query`
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._query_executor, lambda: self.query(**kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики журнала.
+
+        :return: словарь со счётчиками
+        """
+        return {
+            "path": self._path,
+            "fts": self._fts,
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+        }
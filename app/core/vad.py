@@ -0,0 +1,117 @@
+"""
+Детекторы голосовой активности (VAD): отсекают тишину перед распознавателем.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """
+    Базовый класс детектора голосовой активности.
+
+    Наследники реализуют `_detect`, а базовый класс добавляет «хвост»
+    (hangover) после окончания речи и считает пропущенное аудио.
+    """
+
+    def __init__(self, samplerate: int = 16000, hangover_ms: int = 300) -> None:
+        """
+        Инициализация детектора.
+
+        :param samplerate: частота дискретизации аудио
+        :param hangover_ms: сколько миллисекунд считать речью после её окончания
+        """
+        self._samplerate = samplerate
+        self._hangover = samplerate * hangover_ms // 1000
+        self._silence_run = self._hangover
+        self.samples_total = 0
+        self.samples_skipped = 0
+
+    def _detect(self, samples: np.ndarray) -> bool:
+        """
+        Решает, есть ли речь в блоке.
+
+        :param samples: сэмплы блока (int16)
+        :return: True, если в блоке есть речь
+        """
+        raise NotImplementedError
+
+    def is_speech(self, data: memoryview) -> bool:
+        """
+        Проверяет блок аудио с учётом хвоста после окончания речи.
+
+        :param data: блок PCM (int16, mono), читается без копирования
+        :return: True, если блок нужно передать распознавателю
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        self.samples_total += len(samples)
+
+        if len(samples) and self._detect(samples):
+            self._silence_run = 0
+            return True
+
+        in_hangover = self._silence_run < self._hangover
+        self._silence_run += len(samples)
+        if not in_hangover:
+            self.samples_skipped += len(samples)
+        return in_hangover
+
+    def reset(self) -> None:
+        """Сбрасывает состояние на границе фразы."""
+        self._silence_run = self._hangover
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики обработанного и пропущенного аудио.
+
+        :return: словарь со счётчиками
+        """
+        return {
+            "seconds_total": self.samples_total / self._samplerate,
+            "seconds_skipped": self.samples_skipped / self._samplerate,
+            "skipped_ratio": self.samples_skipped / self.samples_total if self.samples_total else 0.0,
+        }
+
+
+class EnergyVad(VoiceActivityDetector):
+    """
+    Детектор по энергии и частоте переходов через ноль (ZCR).
+
+    Блок считается речью, если его громкость (RMS) выше порога, а ZCR не
+    слишком велик — у фонового шума ZCR высокий. Очень громкие блоки
+    проходят при любом ZCR, чтобы не терять шипящие звуки.
+    """
+
+    def __init__(
+        self,
+        energy_threshold: float = 300.0,
+        zcr_threshold: float = 0.35,
+        samplerate: int = 16000,
+        hangover_ms: int = 300,
+    ) -> None:
+        """
+        Инициализация детектора.
+
+        :param energy_threshold: порог RMS в единицах int16
+        :param zcr_threshold: максимальная доля переходов через ноль для речи
+        :param samplerate: частота дискретизации аудио
+        :param hangover_ms: сколько миллисекунд считать речью после её окончания
+        """
+        super().__init__(samplerate, hangover_ms)
+        self._energy_threshold = energy_threshold
+        self._zcr_threshold = zcr_threshold
+
+    def _detect(self, samples: np.ndarray) -> bool:
+        """Сравнивает RMS и ZCR блока с порогами."""
+        frame = samples.astype(np.float32)
+        rms = float(np.sqrt(np.dot(frame, frame) / len(frame)))
+        if rms < self._energy_threshold:
+            return False
+        if rms >= 2 * self._energy_threshold:
+            return True
+        signs = np.signbit(samples)
+        zcr = np.count_nonzero(signs[1:] != signs[:-1]) / len(samples)
+        return zcr <= self._zcr_threshold
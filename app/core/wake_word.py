@@ -0,0 +1,166 @@
+"""
+Слово активации: дешёвый поиск ключевой фразы перед полным распознаванием.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.core.audio_buffer import as_waveform
+from app.core.grammar import UNKNOWN_WORD, Grammar
+
+
+class WakeWordGate:
+    """
+    Двухступенчатое распознавание: пока слово активации не услышано, звук
+    слушает только распознаватель с крошечной грамматикой (слово активации
+    и "[unk]"), а полный словарь модели не работает. После слова активации
+    полный распознаватель получает звук `window_ms` миллисекунд, начиная
+    с последних `preroll_ms` миллисекунд перед срабатыванием, чтобы первые
+    слова команды не потерялись.
+
+    Распознаватель слова активации создаёт владелец (`bind`): в основном
+    процессе — движок, в рабочем процессе — сам процесс на своей модели.
+    Объект без распознавателя передаётся в рабочий процесс как есть.
+    """
+
+    def __init__(
+        self,
+        phrases: Sequence[str],
+        samplerate: int = 16000,
+        window_ms: int = 8000,
+        preroll_ms: int = 1000,
+    ) -> None:
+        """
+        Инициализация.
+
+        :param phrases: варианты слова (фразы) активации, например ["сова"]
+        :param samplerate: частота дискретизации аудио
+        :param window_ms: сколько миллисекунд работает полный распознаватель после слова активации
+        :param preroll_ms: сколько миллисекунд звука до срабатывания отдать полному распознавателю
+        """
+        self.grammar = Grammar("wake", phrases)
+        self._phrases = [f" {phrase} " for phrase in self.grammar.phrases if phrase != UNKNOWN_WORD]
+        if not self._phrases:
+            raise ValueError("Не задано слово активации")
+        self._samplerate = samplerate
+        self._window = samplerate * window_ms // 1000
+        self._remaining = 0
+        # Последние звуки до срабатывания: кольцо, выделенное один раз
+        self._preroll = np.zeros(max(1, samplerate * preroll_ms // 1000), dtype=np.int16)
+        self._preroll_pos = 0
+        self._preroll_full = False
+        self._spotter: Any = None
+        # Сэмплы предзаписи, уже учтённые `listen`: `elapse` не считает их повторно
+        self._counted = 0
+        self.wakeups_total = 0
+        self.samples_total = 0
+        self.samples_awake = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Распознаватель Vosk не сериализуется: в рабочем процессе он создаётся заново
+        state = self.__dict__.copy()
+        state["_spotter"] = None
+        return state
+
+    def bind(self, spotter: Any) -> None:
+        """
+        Задаёт распознаватель слова активации (при запуске и после замены модели).
+
+        :param spotter: KaldiRecognizer с грамматикой `grammar.spec`
+        """
+        self._spotter = spotter
+
+    @property
+    def awake(self) -> bool:
+        """Работает ли сейчас полный распознаватель."""
+        return self._remaining > 0
+
+    def _remember(self, samples: np.ndarray) -> None:
+        size = len(self._preroll)
+        if len(samples) >= size:
+            self._preroll[:] = samples[-size:]
+            self._preroll_pos = 0
+            self._preroll_full = True
+            return
+        first = min(len(samples), size - self._preroll_pos)
+        self._preroll[self._preroll_pos:self._preroll_pos + first] = samples[:first]
+        self._preroll[:len(samples) - first] = samples[first:]
+        end = self._preroll_pos + len(samples)
+        self._preroll_full = self._preroll_full or end >= size
+        self._preroll_pos = end % size
+
+    def _recent(self) -> np.ndarray:
+        if not self._preroll_full:
+            return self._preroll[:self._preroll_pos].copy()
+        return np.concatenate((self._preroll[self._preroll_pos:], self._preroll[:self._preroll_pos]))
+
+    def listen(self, data: Any) -> Optional[np.ndarray]:
+        """
+        Передаёт блок распознавателю слова активации (пока полный распознаватель спит).
+
+        :param data: блок PCM (int16, mono)
+        :return: звук последних `preroll_ms` миллисекунд вместе с этим блоком, если
+                 слово активации услышано, иначе None
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        self.samples_total += len(samples)
+        self._remember(samples)
+        # Частичный результат: слово активации обычно произносят без паузы перед командой
+        if self._spotter.AcceptWaveform(as_waveform(data)):
+            text = json.loads(self._spotter.Result()).get("text", "")
+        else:
+            text = json.loads(self._spotter.PartialResult()).get("partial", "")
+        text = f" {text} "
+        if not any(phrase in text for phrase in self._phrases):
+            return None
+        self._spotter.Reset()
+        self._remaining = self._window
+        self.wakeups_total += 1
+        preroll = self._recent()
+        self._counted = len(preroll)
+        self._preroll_pos = 0
+        self._preroll_full = False
+        return preroll
+
+    def elapse(self, data: Any) -> bool:
+        """
+        Учитывает звук, переданный полному распознавателю.
+
+        :param data: блок PCM, переданный полному распознавателю
+        :return: True, если окно после слова активации закончилось
+        """
+        count = np.frombuffer(data, dtype=np.int16).size
+        # Предзапись уже учтена в samples_total, когда её слушал распознаватель слова активации
+        fresh = count - min(count, self._counted)
+        self._counted = 0
+        self.samples_total += fresh
+        self.samples_awake += fresh
+        self._remaining -= count
+        if self._remaining > 0:
+            return False
+        self.sleep()
+        return True
+
+    def sleep(self) -> None:
+        """Возвращается к ожиданию слова активации."""
+        self._remaining = 0
+        self._counted = 0
+        if self._spotter is not None:
+            self._spotter.Reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики срабатываний и доли звука, прошедшего через полный распознаватель.
+
+        :return: словарь со счётчиками
+        """
+        return {
+            "phrases": [phrase.strip() for phrase in self._phrases],
+            "awake": self.awake,
+            "wakeups": self.wakeups_total,
+            "awake_ratio": self.samples_awake / self.samples_total if self.samples_total else 0.0,
+        }
@@ -6,9 +6,9 @@
 import asyncio
 import uvicorn
 
-from app.core.httpd import app, stt_engine, message_queue
+from app.core.httpd import app
 from app.config.config import STT_HOST, STT_PORT, STT_LOG_LEVEL
-from app.utils.stt_utils import start_listening, set_event_loop
+from app.utils.stt_utils import set_event_loop
 
 
 if __name__ == "__main__":
@@ -18,10 +18,8 @@ if __name__ == "__main__":
     asyncio.set_event_loop(loop)
     set_event_loop(loop)
 
-    # Запускаем прослушивание
-    start_listening(stt_engine, message_queue)
-
-    # Запускаем сервер
+    # Запускаем сервер: модель загрузится в фоне, после чего начнётся прослушивание
+    # (по потоку на каждый источник звука)
     config = uvicorn.Config(app=app, host=STT_HOST, port=STT_PORT, log_level=STT_LOG_LEVEL, loop=loop)
     server = uvicorn.Server(config)
     loop.run_until_complete(server.serve())
\ No newline at end of file
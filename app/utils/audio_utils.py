@@ -0,0 +1,85 @@
+"""
+Утилиты для работы с аудиоданными: разбор WAV-файлов и сырого PCM.
+"""
+
+from __future__ import annotations
+
+import io
+import wave
+from typing import Tuple
+
+
+# Формат, который понимает распознаватель: 16-битный моно PCM
+SAMPLE_WIDTH = 2
+
+# Допустимые частоты дискретизации входящего аудио
+MIN_SAMPLERATE = 8000
+MAX_SAMPLERATE = 48000
+
+
+def is_wav(data: bytes) -> bool:
+    """
+    Проверяет, является ли буфер WAV-файлом (по заголовку RIFF/WAVE).
+
+    :param data: содержимое файла или буфера.
+    :return: True, если это WAV.
+    """
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def check_samplerate(samplerate: int) -> int:
+    """
+    Проверяет частоту дискретизации, присланную клиентом.
+
+    :param samplerate: частота дискретизации.
+    :return: та же частота.
+    :raises ValueError: если частота вне допустимого диапазона.
+    """
+    if not MIN_SAMPLERATE <= samplerate <= MAX_SAMPLERATE:
+        raise ValueError(f"Частота дискретизации должна быть от {MIN_SAMPLERATE} до {MAX_SAMPLERATE} Гц")
+    return samplerate
+
+
+def decode_audio(data: bytes, samplerate: int = 16000) -> Tuple[bytes, int]:
+    """
+    Извлекает из буфера 16-битный моно PCM и его частоту дискретизации.
+
+    WAV-файлы разбираются по заголовку, всё остальное считается сырым PCM
+    с частотой `samplerate`.
+
+    :param data: WAV-файл или сырой PCM (int16, mono).
+    :param samplerate: частота дискретизации для сырого PCM.
+    :return: кортеж (PCM-данные, частота дискретизации).
+    :raises ValueError: если формат аудио или частота дискретизации не поддерживаются.
+    """
+    if not is_wav(data):
+        if len(data) % SAMPLE_WIDTH:
+            raise ValueError("Длина сырого PCM должна быть кратна 2 байтам (int16)")
+        return data, check_samplerate(samplerate)
+
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError("Поддерживается только 16-битный WAV")
+            if wav.getnchannels() != 1:
+                raise ValueError("Поддерживается только моно WAV")
+            return wav.readframes(wav.getnframes()), check_samplerate(wav.getframerate())
+    except wave.Error as e:
+        raise ValueError(f"Некорректный WAV-файл: {e}") from e
+
+
+def encode_wav(pcm: bytes, samplerate: int = 16000) -> bytes:
+    """
+    Упаковывает 16-битный моно PCM в WAV-файл.
+
+    :param pcm: PCM-данные (int16, mono).
+    :param samplerate: частота дискретизации.
+    :return: содержимое WAV-файла.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(samplerate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
@@ -7,13 +7,16 @@ from __future__ import annotations
 import asyncio
 import threading
 from asyncio import Queue
-from typing import Callable, Dict, Optional
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Set
 
 from app.core.speech_to_text import Speech2Text
+from app.core.transcript_feed import TranscriptFeed
 
 
 # Глобальные переменные
 listening_active = False
+active_sources: Set[str] = set()  # Источники звука, для которых запущен поток прослушивания
 latest_transcript = ""
 main_loop: asyncio.AbstractEventLoop | None = None  # Будет установлен из основного потока
 
@@ -27,20 +30,51 @@ def is_listening_active() -> bool:
     return listening_active
 
 
-async def push_message(text: str, message_queue: Queue) -> None:
+async def push_message(
+    text: str,
+    message_queue: Queue,
+    feed: Optional[TranscriptFeed] = None,
+    **fields: Any
+) -> None:
     """
     Добавляет сообщение в очередь распознанных фраз и обновляет последний текст.
 
     :param text: распознанный текст.
     :param message_queue: асинхронная очередь для хранения сообщений.
+    :param feed: опциональная лента фраз для подписчиков.
+    :param fields: метаданные фразы для ленты (источник, говорящий и т.д.).
     """
     if not text.strip():
         return
     await message_queue.put(text.strip())
+    if feed is not None:
+        feed.publish(text.strip(), **fields)
     global latest_transcript
     latest_transcript = text.strip()
 
 
+async def deliver_message(
+    stt_engine: Speech2Text,
+    queued_at: float,
+    text: str,
+    message_queue: Queue,
+    feed: Optional[TranscriptFeed] = None,
+    **fields: Any
+) -> None:
+    """
+    Публикует фразу из потока прослушивания, учитывая время перехода в цикл событий.
+
+    :param stt_engine: движок, распознавший фразу.
+    :param queued_at: момент передачи фразы в цикл событий (time.perf_counter).
+    :param text: распознанный текст.
+    :param message_queue: асинхронная очередь для хранения сообщений.
+    :param feed: опциональная лента фраз для подписчиков.
+    :param fields: метаданные фразы для ленты.
+    """
+    stt_engine.observe_delivery(perf_counter() - queued_at)
+    await push_message(text, message_queue, feed, **fields)
+
+
 async def pop_all_messages(message_queue: Queue) -> str:
     """
     Вычитывает все накопленные сообщения из очереди и возвращает их одной строкой.
@@ -72,7 +106,8 @@ def set_event_loop(loop: asyncio.AbstractEventLoop) -> None:
 def run_stt_listener(
     stt_engine: Speech2Text,
     queue: Queue,
-    callback: Optional[Callable[[str], None]]
+    callback: Optional[Callable[[str], None]],
+    feed: Optional[TranscriptFeed] = None
 ) -> None:
     """
     Фоновая функция, запускающая прослушивание микрофона.
@@ -80,10 +115,12 @@ def run_stt_listener(
     :param stt_engine: экземпляр движка распознавания речи.
     :param queue: очередь для добавления распознанных фраз.
     :param callback: опциональная функция обратного вызова при распознавании.
+    :param feed: опциональная лента фраз для подписчиков.
     """
     global listening_active, main_loop
     listening_active = True
-    print("🎙️ Запуск прослушивания микрофона...")
+    source = stt_engine.source_id
+    print(f"🎙️ Запуск прослушивания микрофона {source}...")
 
     # Убедимся, что в потоке есть event loop (необходимо для Windows/uvicorn)
     try:
@@ -92,41 +129,50 @@ def run_stt_listener(
         asyncio.set_event_loop(asyncio.new_event_loop())
 
     try:
-        for text in stt_engine.listen():
+        for result in stt_engine.listen():
             if not listening_active:
                 break
+            fields = result.to_dict()
+            text = fields.pop("text")
             if main_loop is not None:
-                asyncio.run_coroutine_threadsafe(push_message(text, queue), main_loop)
+                asyncio.run_coroutine_threadsafe(
+                    deliver_message(stt_engine, perf_counter(), text, queue, feed, **fields), main_loop,
+                )
             else:
                 print(f"⚠️ Event loop не установлен. Сообщение пропущено: {text}")
             if callback is not None and callable(callback):
                 callback(text)
     except Exception as e:
-        print(f"❌ Ошибка в фоновом потоке STT: {e}")
+        print(f"❌ Ошибка в фоновом потоке STT {source}: {e}")
     finally:
-        listening_active = False
+        active_sources.discard(source)
+        listening_active = bool(active_sources)
 
 
 def start_listening(
     stt_engine: Speech2Text,
     queue: Queue,
-    on_result_callback: Optional[Callable[[str], None]] = None
+    on_result_callback: Optional[Callable[[str], None]] = None,
+    feed: Optional[TranscriptFeed] = None
 ) -> Dict[str, str]:
     """
     Запускает фоновое прослушивание микрофона в отдельном потоке.
+    Для каждого источника звука (движка) запускается свой поток.
 
     :param stt_engine: движок распознавания речи.
     :param queue: очередь для сохранения текста.
     :param on_result_callback: опциональный callback на каждое распознанное сообщение.
+    :param feed: опциональная лента фраз для подписчиков.
     :return: статус операции.
     """
-    global listening_active
-    if listening_active:
+    if stt_engine.source_id in active_sources:
         return {"status": "already_running"}
+    active_sources.add(stt_engine.source_id)
 
     thread = threading.Thread(
         target=run_stt_listener,
-        args=(stt_engine, queue, on_result_callback),
+        args=(stt_engine, queue, on_result_callback, feed),
+        name=f"stt-listener-{stt_engine.source_id}",
         daemon=True,
     )
     thread.start()